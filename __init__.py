@@ -41,3 +41,15 @@ def register():
 
 def unregister():
     Registry.unregister()
+
+    # Release inotify watches held for live reloading shaders
+    from shaders.watcher import FILE_WATCHER
+    FILE_WATCHER.stop()
+
+    # Stop decoding textures in the background
+    from shaders.textures import TEXTURE_MANAGER
+    TEXTURE_MANAGER.shutdown()
+
+    # Stop the worker processes preprocessing shader sources
+    from shaders.glsl.preprocess_pool import PREPROCESS_POOL
+    PREPROCESS_POOL.shutdown()
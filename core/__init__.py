@@ -1,26 +1,44 @@
 
 if 'bpy' in locals():
     import importlib
+    importlib.reload(transforms)
     importlib.reload(driver)
     importlib.reload(passes)
+    importlib.reload(framebuffer)
+    importlib.reload(gbuffer)
+    importlib.reload(animation)
+    importlib.reload(offscreen)
+    importlib.reload(ubo)
+    importlib.reload(clusters)
+    importlib.reload(interaction)
     importlib.reload(engine)
     importlib.reload(lights)
     importlib.reload(mesh_data)
     importlib.reload(operators)
     importlib.reload(panels)
     importlib.reload(properties)
+    importlib.reload(render_queue)
     importlib.reload(renderables)
     importlib.reload(vao)
     importlib.reload(render_data)
 else:
+    from . import transforms
     from . import driver
     from . import passes 
+    from . import framebuffer
+    from . import gbuffer
+    from . import animation
+    from . import offscreen
+    from . import ubo
+    from . import clusters
+    from . import interaction
     from . import engine 
     from . import lights 
     from . import mesh_data
     from . import operators 
     from . import panels 
     from . import properties
+    from . import render_queue
     from . import renderables
     from . import vao
     from . import render_data
@@ -0,0 +1,410 @@
+
+import os
+import struct
+import threading
+import zlib
+from queue import Queue
+from time import perf_counter
+
+import numpy as np
+import bgl
+from bgl import *
+
+from .framebuffer import Framebuffer
+from .offscreen import OffscreenTarget, get_max_framebuffer_size
+
+# Sync object enums, not exported by every bgl version
+GL_SYNC_GPU_COMMANDS_COMPLETE = 0x9117
+GL_SYNC_FLUSH_COMMANDS_BIT = 0x00000001
+GL_ALREADY_SIGNALED = 0x911A
+GL_CONDITION_SATISFIED = 0x911C
+GL_WAIT_FAILED = 0x911D
+
+# Nanoseconds to wait on a fence before checking again
+FENCE_WAIT_TIMEOUT = 1000000
+
+def linear_to_srgb(pixels):
+    """Encode linear float RGBA pixels into 8-bit sRGB. Alpha stays linear.
+
+    Parameters:
+        pixels (np.ndarray): Float RGBA of shape (N, 4)
+
+    Returns:
+        np.ndarray: uint8 RGBA of shape (N, 4)
+    """
+    rgba = np.clip(pixels, 0.0, 1.0)
+    rgb = rgba[:, :3]
+    rgba[:, :3] = np.where(
+        rgb <= 0.0031308,
+        rgb * 12.92,
+        1.055 * np.power(rgb, 1.0 / 2.4) - 0.055
+    )
+    return (rgba * 255.0 + 0.5).astype(np.uint8)
+
+def encode_png(pixels, width: int, height: int, compress_level: int = 6) -> bytes:
+    """Encode bottom-up float RGBA pixels (as read from glReadPixels) into a PNG
+
+    Parameters:
+        pixels (np.ndarray):    Float RGBA of shape (width * height, 4)
+        width, height (int):    Image size in pixels
+        compress_level (int):   zlib compression level, 0-9
+
+    Returns:
+        bytes
+    """
+    rows = linear_to_srgb(pixels).reshape(height, width * 4)[::-1]
+
+    # Each scanline is prefixed with filter type 0 (None)
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rows
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+        )
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', header),
+        chunk(b'IDAT', zlib.compress(scanlines.tobytes(), compress_level)),
+        chunk(b'IEND', b'')
+    ))
+
+class StageTimings:
+    """Accumulated wall time per pipeline stage
+
+    Safe to add() from multiple threads.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = dict()
+        self.counts = dict()
+
+    def add(self, stage: str, duration: float):
+        with self.lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + duration
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def bottleneck(self) -> str:
+        """Stage with the highest total time"""
+        with self.lock:
+            return max(self.totals, key=self.totals.get) if self.totals else None
+
+    def summary(self) -> str:
+        with self.lock:
+            return ', '.join(
+                '{} {:.2f}ms'.format(stage, self.totals[stage] / self.counts[stage] * 1000.0)
+                for stage in self.totals
+            )
+
+class ImageWriter(threading.Thread):
+    """Background thread that encodes and writes frames to disk
+
+    Pixel buffers are recycled through a free queue so that readback
+    never allocates. zlib releases the GIL while compressing, so encoding
+    overlaps with drawing and readback on the main thread.
+    """
+    def __init__(self, width: int, height: int, timings: StageTimings, pool_size: int = 3):
+        super().__init__(name='ScratchpadImageWriter', daemon=True)
+        self.width = width
+        self.height = height
+        self.timings = timings
+        self.error = None
+
+        size = width * height * 4
+        self.buffers = [Buffer(GL_FLOAT, size) for _ in range(pool_size)]
+        self.views = [np.asarray(buf) for buf in self.buffers]
+
+        self.free = Queue()
+        for i in range(pool_size):
+            self.free.put(i)
+
+        self.pending = Queue()
+
+    def acquire(self) -> int:
+        """Block until a pixel buffer is free and return its index"""
+        return self.free.get()
+
+    def submit(self, index: int, filepath: str):
+        """Queue a filled pixel buffer to be encoded and written"""
+        self.pending.put((index, filepath))
+
+    def finish(self):
+        """Write any remaining frames and stop the thread, if still running"""
+        if self.is_alive():
+            self.pending.put(None)
+            self.join()
+
+    def run(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+
+            index, filepath = job
+            try:
+                start = perf_counter()
+                pixels = self.views[index].reshape(-1, 4)
+                data = encode_png(pixels, self.width, self.height)
+                self.timings.add('encode', perf_counter() - start)
+
+                start = perf_counter()
+                directory = os.path.dirname(filepath)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                with open(filepath, 'wb') as f:
+                    f.write(data)
+                self.timings.add('write', perf_counter() - start)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.free.put(index)
+
+class PixelPackBuffer:
+    """GL_PIXEL_PACK_BUFFER that glReadPixels writes into without waiting on the GPU
+
+    A fence is inserted after the read, where bgl supports sync objects,
+    so that copy_to() can tell when the transfer completed. Without one,
+    copy_to() still only waits for as long as the transfer takes.
+    """
+    def __init__(self, size: int):
+        """
+        Parameters:
+            size (int): Capacity in floats
+        """
+        self.size = size
+        self.sync = None
+
+        buf = Buffer(GL_INT, 1)
+        glGenBuffers(1, buf)
+        self.pbo_id = buf[0]
+
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbo_id)
+        glBufferData(GL_PIXEL_PACK_BUFFER, size * 4, 0, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def __repr__(self):
+        return '<PixelPackBuffer(size={}, pbo_id={}) object at {}>'.format(
+            self.size,
+            self.pbo_id,
+            id(self)
+        )
+
+    @property
+    def supports_fences(self) -> bool:
+        return hasattr(bgl, 'glFenceSync') and hasattr(bgl, 'glClientWaitSync')
+
+    def read(self, fb: Framebuffer, width: int, height: int):
+        """Queue a read of a framebuffer's first color attachment. Framebuffer must be bound"""
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbo_id)
+
+        # With a pack buffer bound the pointer is an offset into it
+        fb.read_pixels(0, 0, 0, width, height, 0)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+        if self.supports_fences:
+            self.sync = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+    def wait(self):
+        """Block until the last read() completed on the GPU"""
+        if self.sync is None:
+            return
+
+        try:
+            while True:
+                status = glClientWaitSync(self.sync, GL_SYNC_FLUSH_COMMANDS_BIT, FENCE_WAIT_TIMEOUT)
+                if status == GL_ALREADY_SIGNALED or status == GL_CONDITION_SATISFIED:
+                    break
+                if status == GL_WAIT_FAILED:
+                    raise RuntimeError('Failed waiting on pixel readback')
+        finally:
+            glDeleteSync(self.sync)
+            self.sync = None
+
+    def copy_to(self, buffer):
+        """Copy the last read() into client memory, once complete
+
+        Parameters:
+            buffer (bgl.Buffer): Destination with room for `size` floats
+        """
+        self.wait()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbo_id)
+        glGetBufferSubData(GL_PIXEL_PACK_BUFFER, 0, self.size * 4, buffer)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def destroy(self):
+        if self.sync is not None:
+            glDeleteSync(self.sync)
+            self.sync = None
+
+        glDeleteBuffers(1, Buffer(GL_INT, 1, [self.pbo_id]))
+
+class AnimationPipeline:
+    """Overlaps drawing, readback and file output across consecutive frames
+
+    Each frame is read into one of two pixel pack buffers as soon as it is
+    drawn, which only queues the transfer on the GPU. The previous frame's
+    buffer is copied out once its transfer completed, while frame N is
+    still drawing, and frame N-1 is encoded and written on a background
+    thread.
+
+    Frames larger than the driver can render in one pass are drawn in
+    tiles through an OffscreenTarget instead. Tiles are read back as they
+    finish, so only encoding and writing overlap with later frames.
+
+    Usage:
+        pipeline = AnimationPipeline(1920, 1080)
+
+        try:
+            for frame in frames:
+                pipeline.begin_frame()
+                for x, y, w, h in pipeline.tiles():
+                    pipeline.begin_tile(w, h)
+                    # ... draw tile ...
+                    pipeline.end_tile(x, y, w, h)
+                pipeline.end_frame(filepath)
+
+            pipeline.finish()
+        finally:
+            pipeline.destroy()
+    """
+    def __init__(self, width: int, height: int, max_size: int = None):
+        """
+        Parameters:
+            width (int):    Output width in pixels
+            height (int):   Output height in pixels
+            max_size (int): Maximum framebuffer size. Defaults to the driver's limit
+        """
+        self.width = width
+        self.height = height
+        self.timings = StageTimings()
+
+        max_size = max_size or get_max_framebuffer_size()
+        self.target = None
+        self.framebuffer = None
+        self.pack_buffers = []
+
+        if width > max_size or height > max_size:
+            self.target = OffscreenTarget(width, height, max_size)
+        else:
+            self.framebuffer = Framebuffer(width, height)
+            self.pack_buffers = [PixelPackBuffer(width * height * 4) for _ in range(2)]
+
+        self.current = 0
+        self.previous = None # (PixelPackBuffer, filepath) waiting on readback
+        self.index = None # Writer buffer of a tiled frame being assembled
+
+        self.writer = ImageWriter(width, height, self.timings)
+        self.writer.start()
+
+        self.frame_start = 0
+
+    @property
+    def is_tiled(self) -> bool:
+        return self.target is not None
+
+    def tiles(self):
+        """Iterate (x, y, width, height) for each tile of the current frame"""
+        if self.is_tiled:
+            return self.target.tiles()
+
+        return iter(((0, 0, self.width, self.height),))
+
+    def begin_frame(self):
+        self.frame_start = perf_counter()
+
+        if self.is_tiled:
+            self.index = self.acquire()
+
+    def begin_tile(self, width: int, height: int):
+        if self.is_tiled:
+            self.target.bind(width, height)
+        else:
+            self.framebuffer.bind()
+
+    def end_tile(self, x: int, y: int, width: int, height: int):
+        """Finish drawing a tile and read it back if the frame is tiled"""
+        if not self.is_tiled:
+            return
+
+        start = perf_counter()
+        pixels = self.target.read(width, height)
+        self.target.unbind()
+
+        frame = self.writer.views[self.index].reshape(self.height, self.width, 4)
+        frame[y:y + height, x:x + width] = pixels.reshape(height, width, 4)
+        self.timings.add('readback', perf_counter() - start)
+
+    def end_frame(self, filepath: str):
+        """Finish drawing the current frame and advance the pipeline
+
+        Parameters:
+            filepath (str): Where the current frame is written once read back
+        """
+        if self.is_tiled:
+            self.timings.add('draw', perf_counter() - self.frame_start)
+            self.writer.submit(self.index, filepath)
+            self.index = None
+        else:
+            pack_buffer = self.pack_buffers[self.current]
+            pack_buffer.read(self.framebuffer, self.width, self.height)
+            self.framebuffer.unbind()
+            self.timings.add('draw', perf_counter() - self.frame_start)
+
+            # This frame's transfer is queued behind its draws,
+            # by which point the last one has likely completed
+            self.readback()
+
+            self.previous = (pack_buffer, filepath)
+            self.current = 1 - self.current
+
+        if self.writer.error:
+            raise self.writer.error
+
+    def acquire(self) -> int:
+        """Wait on the writer for a free pixel buffer"""
+        start = perf_counter()
+        index = self.writer.acquire()
+        self.timings.add('wait', perf_counter() - start)
+        return index
+
+    def readback(self):
+        """Copy the previous frame out of its pack buffer and queue it for writing"""
+        if not self.previous:
+            return
+
+        pack_buffer, filepath = self.previous
+        self.previous = None
+
+        index = self.acquire()
+
+        start = perf_counter()
+        pack_buffer.copy_to(self.writer.buffers[index])
+        self.timings.add('readback', perf_counter() - start)
+
+        self.writer.submit(index, filepath)
+
+    def finish(self):
+        """Flush the last frame through the pipeline and wait for all writes"""
+        self.readback()
+        self.writer.finish()
+
+        if self.writer.error:
+            raise self.writer.error
+
+    def destroy(self):
+        """Stop the writer, after frames already submitted, and free GPU resources"""
+        self.previous = None
+        self.writer.finish()
+
+        for pack_buffer in self.pack_buffers:
+            pack_buffer.destroy()
+
+        if self.framebuffer:
+            self.framebuffer.destroy()
+
+        if self.target:
+            self.target.destroy()
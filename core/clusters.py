@@ -0,0 +1,304 @@
+
+import numpy as np
+from bgl import *
+
+from shaders.base import SHARED_SAMPLER_UNITS
+
+class DataTexture:
+    """2D texture used to pass arrays of data to shaders through texelFetch()"""
+    def __init__(self, internal_format: int, data_format: int, data_type: int, components: int):
+        """
+        Parameters:
+            internal_format (int):  e.g. `GL_RGBA32F`
+            data_format (int):      e.g. `GL_RGBA`
+            data_type (int):        e.g. `GL_FLOAT`
+            components (int):       Components per texel in uploaded arrays
+        """
+        self.internal_format = internal_format
+        self.data_format = data_format
+        self.data_type = data_type
+        self.components = components
+        self.width = 0
+        self.height = 0
+
+        buf = Buffer(GL_INT, 1)
+        glGenTextures(1, buf)
+        self.texture_id = buf[0]
+
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def __repr__(self):
+        return '<DataTexture(texture_id={}, size={}x{}) object at {}>'.format(
+            self.texture_id,
+            self.width,
+            self.height,
+            id(self)
+        )
+
+    def upload(self, data, width: int, height: int):
+        """Copy an array of `width * height * components` values to the GPU
+
+        The texture is only reallocated when its size changes.
+        """
+        gl_type = GL_FLOAT if self.data_type == GL_FLOAT else GL_INT
+
+        # bgl only wraps arrays matching the Buffer's dimensions exactly
+        flat = np.ascontiguousarray(data).reshape(-1)
+        buffer = Buffer(gl_type, flat.size, flat)
+
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+        if width != self.width or height != self.height:
+            self.width = width
+            self.height = height
+            glTexImage2D(
+                GL_TEXTURE_2D, 0, self.internal_format, width, height, 0,
+                self.data_format, self.data_type, buffer
+            )
+        else:
+            glTexSubImage2D(
+                GL_TEXTURE_2D, 0, 0, 0, width, height,
+                self.data_format, self.data_type, buffer
+            )
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def bind(self, unit: int):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+
+    def destroy(self):
+        glDeleteTextures(1, Buffer(GL_INT, 1, [self.texture_id]))
+
+def get_cluster_bounds(projection, grid: tuple, near: float, far: float):
+    """View space AABBs of every cluster in a frustum divided into a 3D grid.
+
+    Depth slices are exponentially distributed between near and far so
+    that clusters stay roughly cube shaped with distance.
+
+    Parameters:
+        projection (np.ndarray):    4x4 projection matrix
+        grid (tuple(int, int, int)): Clusters along X, Y, and depth
+        near, far (float):          View space depth range to cluster
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): (mins, maxs) each of shape (X * Y * Z, 3)
+        ordered with X varying fastest, then Y, then depth
+    """
+    gx, gy, gz = grid
+    inv_projection = np.linalg.inv(projection)
+
+    # Unproject every tile corner on the near and far clip planes
+    x = np.linspace(-1.0, 1.0, gx + 1)
+    y = np.linspace(-1.0, 1.0, gy + 1)
+    cx, cy = np.meshgrid(x, y) # (gy + 1, gx + 1)
+    corners = np.stack([cx, cy], axis=-1).reshape(-1, 2)
+
+    def unproject(z):
+        ndc = np.hstack([corners, np.full((len(corners), 1), z), np.ones((len(corners), 1))])
+        p = ndc @ inv_projection.T
+        return p[:, :3] / p[:, 3:4]
+
+    a = unproject(-1.0)
+    b = unproject(1.0)
+
+    # Interpolate along each corner's ray to the slice depths.
+    # Works for both perspective and orthographic projections.
+    slices = near * (far / near) ** (np.arange(gz + 1) / gz)
+    da = -a[:, 2]
+    db = -b[:, 2]
+    t = (slices[:, None] - da[None, :]) / (db - da)[None, :] # (gz + 1, corners)
+    points = a[None, :, :] + (b - a)[None, :, :] * t[:, :, None]
+    points = points.reshape(gz + 1, gy + 1, gx + 1, 3)
+
+    # Each cluster is bounded by the 8 corners shared with its neighbours
+    stacked = np.stack([
+        points[dz:dz + gz, dy:dy + gy, dx:dx + gx]
+        for dz in (0, 1) for dy in (0, 1) for dx in (0, 1)
+    ]) # (8, gz, gy, gx, 3)
+
+    mins = stacked.min(axis=0).reshape(-1, 3)
+    maxs = stacked.max(axis=0).reshape(-1, 3)
+
+    return mins, maxs
+
+def get_projection_depth_range(projection) -> tuple:
+    """Near and far clip distances of a perspective or orthographic projection"""
+    p22 = projection[2, 2]
+    p23 = projection[2, 3]
+
+    if projection[3, 3] == 0:
+        near = p23 / (p22 - 1.0)
+        far = p23 / (p22 + 1.0)
+    else:
+        near = (p23 + 1.0) / p22
+        far = (p23 - 1.0) / p22
+
+    return near, far
+
+class LightClusters:
+    """Clustered forward lighting for the additional lights of a LightTable.
+
+    The view frustum is split into a 3D grid of clusters and every light is
+    assigned to the clusters its range overlaps, in one vectorized pass per
+    frame. Shaders look up the cluster of each fragment and only loop over
+    the lights in that cluster.
+
+    Results are uploaded to three textures bound to fixed units:
+
+        _ClusterGrid            RG32I (X * Y, Z):       (offset, count) into the index list
+        _ClusterLightIndices    R32I  (INDEX_WIDTH, n): Light rows, grouped by cluster
+        _ClusterLightData       RGBA32F (4, lights):    position, color, spot direction,
+                                                        and attenuation of each light
+
+    Usage:
+        clusters = LightClusters()
+
+        # Per frame, after lights and camera are updated
+        clusters.update(lighting.additional_lights, view_matrix, projection_matrix, viewport)
+        clusters.bind()
+    """
+
+    GRID = (16, 9, 24)
+
+    # Texels per row of the light index texture
+    INDEX_WIDTH = 1024
+
+    # Lights tested against every cluster at once. Limits temporary memory.
+    BATCH_SIZE = 64
+
+    # Clamp for the near plane so the exponential depth slices stay usable
+    MIN_NEAR = 0.05
+
+    def __init__(self):
+        self.grid_texture = DataTexture(GL_RG32I, GL_RG_INTEGER, GL_INT, 2)
+        self.index_texture = DataTexture(GL_R32I, GL_RED_INTEGER, GL_INT, 1)
+        self.light_texture = DataTexture(GL_RGBA32F, GL_RGBA, GL_FLOAT, 4)
+
+        self.projection = None
+        self.mins = None
+        self.maxs = None
+        self.near = self.MIN_NEAR
+        self.far = 1.0
+        self.viewport = (0, 0, 1, 1)
+
+        self.total_indices = 0
+
+    def update_bounds(self, projection):
+        """Recompute cluster AABBs if the projection changed since the last frame"""
+        if self.projection is not None and np.array_equal(projection, self.projection):
+            return
+
+        near, far = get_projection_depth_range(projection)
+        self.near = max(near, self.MIN_NEAR)
+        self.far = max(far, self.near * 2.0)
+        self.projection = projection
+        self.mins, self.maxs = get_cluster_bounds(projection, self.GRID, self.near, self.far)
+
+    def assign(self, centers, radii):
+        """Assign light spheres to every cluster they overlap
+
+        Parameters:
+            centers (np.ndarray):   View space light positions, shape (N, 3)
+            radii (np.ndarray):     Light ranges, shape (N,)
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): Per-cluster (offset, count) of
+            shape (clusters, 2) and the flat list of light rows
+        """
+        clusters = len(self.mins)
+        mask = np.zeros((len(centers), clusters), dtype=bool)
+
+        for start in range(0, len(centers), self.BATCH_SIZE):
+            c = centers[start:start + self.BATCH_SIZE, None, :]
+            r = radii[start:start + self.BATCH_SIZE, None]
+
+            # Squared distance from each sphere center to the nearest point of each AABB
+            nearest = np.clip(c, self.mins[None, :, :], self.maxs[None, :, :])
+            dist_sqr = ((nearest - c) ** 2).sum(axis=2)
+            mask[start:start + self.BATCH_SIZE] = dist_sqr <= r * r
+
+        counts = mask.sum(axis=0)
+        offsets = np.zeros(clusters, dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+
+        # Light rows ordered by cluster, then by row
+        _, lights = np.nonzero(mask.T)
+
+        grid = np.stack([offsets, counts], axis=1).astype(np.int32)
+        return grid, lights.astype(np.int32)
+
+    def update(self, table, view_matrix, projection_matrix, viewport: tuple):
+        """Rebuild and upload cluster light lists for the current frame
+
+        Parameters:
+            table (LightTable):                     Additional lights in the scene
+            view_matrix (mathutils.Matrix)
+            projection_matrix (mathutils.Matrix)
+            viewport (tuple(int, int, int, int)):   (x, y, width, height) in pixels
+        """
+        self.viewport = viewport
+        view = np.array(view_matrix, dtype=np.float32)
+        projection = np.array(projection_matrix, dtype=np.float64)
+        self.update_bounds(projection)
+
+        count = table.count
+        positions = table.positions[:count]
+        attenuations = table.attenuations[:count]
+
+        # Empty rows of removed lights have no range
+        rows = np.nonzero(attenuations[:, 0] > 0)[0]
+        centers = positions[rows, :3] @ view[:3, :3].T + view[:3, 3]
+        radii = 1.0 / np.sqrt(attenuations[rows, 0])
+
+        grid, lights = self.assign(centers, radii)
+        indices = rows[lights].astype(np.int32)
+
+        gx, gy, gz = self.GRID
+        self.grid_texture.upload(np.ascontiguousarray(grid), gx * gy, gz)
+
+        # Pad the index list out to whole rows. Always at least one texel.
+        self.total_indices = len(indices)
+        width = self.INDEX_WIDTH
+        height = max(1, -(-len(indices) // width))
+        padded = np.zeros(width * height, dtype=np.int32)
+        padded[:len(indices)] = indices
+        self.index_texture.upload(padded, width, height)
+
+        light_data = np.zeros((max(count, 1), 4, 4), dtype=np.float32)
+        light_data[:count, 0] = positions
+        light_data[:count, 1] = table.colors[:count]
+        light_data[:count, 2] = table.directions[:count]
+        light_data[:count, 3] = attenuations
+        self.light_texture.upload(light_data, 4, len(light_data))
+
+    def get_depth_params(self) -> tuple:
+        """Scale and bias to map log(view depth) to a depth slice in shaders
+
+        Returns:
+            tuple(float, float, float, float): (near, far, scale, bias)
+        """
+        gz = self.GRID[2]
+        log_range = np.log(self.far / self.near)
+        scale = gz / log_range
+        bias = -gz * np.log(self.near) / log_range
+
+        return (self.near, self.far, scale, bias)
+
+    def bind(self):
+        """Bind cluster textures to their shared texture units"""
+        self.grid_texture.bind(SHARED_SAMPLER_UNITS['_ClusterGrid'])
+        self.index_texture.bind(SHARED_SAMPLER_UNITS['_ClusterLightIndices'])
+        self.light_texture.bind(SHARED_SAMPLER_UNITS['_ClusterLightData'])
+        glActiveTexture(GL_TEXTURE0)
+
+    def destroy(self):
+        self.grid_texture.destroy()
+        self.index_texture.destroy()
+        self.light_texture.destroy()
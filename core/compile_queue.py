@@ -0,0 +1,254 @@
+
+import time
+from concurrent.futures import wait
+
+from shaders.glsl.preprocess_pool import PREPROCESS_POOL
+
+class CompileQueue:
+    """Material shader compiles running on the driver without blocking the UI
+
+    Stages of every dirty material are first preprocessed in parallel by
+    the PREPROCESS_POOL, where supported. As each material's stages finish,
+    poll() hands them to compile_async() so that they go to the driver
+    up front. poll() then swaps in each program once the driver reports
+    it as complete (see PendingProgram). Until then, materials keep drawing
+    their previous program, or the fallback shader if they never had one.
+
+    Keyword variants requested by BaseShader.select_variant() or prewarm()
+    go through the same steps after submit_variants(). Shaders draw their
+    base variant in place of each until it's ready.
+
+    Polling queries GL and must run with the draw context bound, while
+    writing results back to material settings must happen outside of
+    drawing. These are split into poll() and sync_settings().
+
+    Usage:
+        queue = CompileQueue()
+        queue.submit(mat, shader)
+
+        # After drawing
+        queue.submit_variants(shader)
+
+        # In view_draw
+        if queue.poll():
+            # ... re-record draws with new programs ...
+
+        # From a timer
+        queue.sync_settings()
+    """
+
+    # Seconds between checks of pending compiles
+    POLL_INTERVAL = 0.1
+
+    # Seconds a batch may spend in the PREPROCESS_POOL before the pool is
+    # assumed to be stuck and its shaders are preprocessed in-process
+    PREPROCESS_TIMEOUT = 30.0
+
+    def __init__(self):
+        self.preprocessing = [] # (ScratchpadMaterial, BaseShader, dict of Future, submit time) still preprocessing
+        self.pending = [] # (ScratchpadMaterial, BaseShader) still compiling
+        self.results = {} # ScratchpadMaterial -> (progress, error) to sync to settings
+        self.preprocessing_variants = [] # (BaseShader, key, dict of Future, submit time, generation)
+        self.variant_shaders = [] # BaseShader with pending_variants
+
+    def __len__(self):
+        return len(self.preprocessing) + len(self.pending) + len(self.variant_shaders)
+
+    def submit(self, mat, shader):
+        """Start compiling a material's shader
+
+        Errors while preprocessing sources are raised immediately, unless
+        preprocessing is handed to the PREPROCESS_POOL. Those are reported
+        by poll() instead.
+
+        Parameters:
+            mat (ScratchpadMaterial)
+            shader (BaseShader):        Shader that will be assigned to `mat`
+        """
+        # A newer submit replaces any compile still in flight
+        self.preprocessing = [p for p in self.preprocessing if p[0] is not mat]
+        self.pending = [p for p in self.pending if p[0] is not mat]
+
+        jobs = shader.get_preprocess_jobs()
+        if jobs and PREPROCESS_POOL.is_supported:
+            # Superseded by the new sources. Anything written after the
+            # pool reads them is flagged again by the FILE_WATCHER
+            shader.cancel_compile()
+            shader.clear_file_changes()
+            futures = PREPROCESS_POOL.submit(jobs)
+            self.preprocessing.append((mat, shader, futures, time.monotonic()))
+            self.results[mat] = (0.0, None)
+            return
+
+        self.compile_async(mat, shader)
+
+    def submit_variants(self, shader):
+        """Start compiling every keyword variant a shader requested
+
+        Parameters:
+            shader (BaseShader)
+        """
+        for key in shader.take_requested_variants():
+            jobs = shader.get_preprocess_jobs(key)
+            if jobs and PREPROCESS_POOL.is_supported:
+                futures = PREPROCESS_POOL.submit(jobs)
+                self.preprocessing_variants.append(
+                    (shader, key, futures, time.monotonic(), shader.variant_generation)
+                )
+            else:
+                shader.compile_variant_async(key)
+
+        if shader.pending_variants and shader not in self.variant_shaders:
+            self.variant_shaders.append(shader)
+
+    def is_queued(self, mat, shader) -> bool:
+        """Whether a material's shader is still preprocessing or compiling"""
+        return any(p[0] is mat and p[1] is shader for p in self.preprocessing) \
+            or any(p[0] is mat and p[1] is shader for p in self.pending)
+
+    def compile_async(self, mat, shader, preprocessed: dict = None):
+        """Hand a shader's sources to the driver"""
+        shader.compile_async(preprocessed)
+        if shader.is_compiling:
+            self.pending.append((mat, shader))
+
+        self.results[mat] = (shader.get_compile_progress(), None)
+
+    def poll(self, block: bool = False) -> bool:
+        """Swap in programs the driver finished compiling
+
+        Parameters:
+            block (bool): Wait for every pending compile, e.g. for final renders
+
+        Returns:
+            bool: True if any material's program changed
+        """
+        changed = False
+        still_preprocessing = []
+
+        for mat, shader, futures, started in self.preprocessing:
+            if not self.is_preprocessed(futures, started, block):
+                still_preprocessing.append((mat, shader, futures, started))
+                continue
+
+            try:
+                preprocessed = self.get_preprocessed(futures)
+                self.compile_async(mat, shader, preprocessed)
+            except Exception as e:
+                print('SHADER ERROR', type(e))
+                print(e)
+                shader.last_error = str(e)
+                self.results[mat] = (1.0, str(e))
+                changed = True
+
+        self.preprocessing = still_preprocessing
+        still_pending = []
+
+        for mat, shader in self.pending:
+            error = None
+            try:
+                if shader.poll_compile(block):
+                    changed = True
+                    if mat.material.scratchpad.prewarm_variants:
+                        shader.prewarm()
+                        self.submit_variants(shader)
+            except Exception as e:
+                print('SHADER ERROR', type(e))
+                print(e)
+                error = str(e)
+                shader.last_error = error
+                changed = True
+
+            if shader.is_compiling:
+                still_pending.append((mat, shader))
+
+            self.results[mat] = (shader.get_compile_progress(), error)
+
+        self.pending = still_pending
+        self.poll_variants(block)
+        return changed
+
+    def poll_variants(self, block: bool):
+        """Hand preprocessed variants to the driver and cache those it completed
+
+        Variants don't need draws to be re-recorded. Shaders pick them up
+        the next time they bind.
+        """
+        still_preprocessing = []
+
+        for shader, key, futures, started, generation in self.preprocessing_variants:
+            if not self.is_preprocessed(futures, started, block):
+                still_preprocessing.append((shader, key, futures, started, generation))
+                continue
+
+            # Shader recompiled since, which discarded every pending variant
+            if generation != shader.variant_generation:
+                continue
+
+            try:
+                shader.compile_variant_async(key, self.get_preprocessed(futures))
+            except Exception as e:
+                shader.fail_variant(key, e)
+
+        self.preprocessing_variants = still_preprocessing
+
+        for shader in self.variant_shaders:
+            shader.poll_variants(block)
+
+        self.variant_shaders = [s for s in self.variant_shaders if s.pending_variants]
+
+    def is_preprocessed(self, futures: dict, started: float, block: bool) -> bool:
+        """Whether a batch from the PREPROCESS_POOL is ready for get_preprocessed()
+
+        Batches that outlive PREPROCESS_TIMEOUT disable the pool.
+
+        Parameters:
+            futures (dict):     Batch returned by PREPROCESS_POOL.submit()
+            started (float):    time.monotonic() when the batch was submitted
+            block (bool):       Wait on the batch, up to the timeout
+        """
+        remaining = started + self.PREPROCESS_TIMEOUT - time.monotonic()
+        if block:
+            wait(futures.values(), timeout=max(remaining, 0))
+
+        if all(f.done() for f in futures.values()):
+            return True
+
+        if remaining > 0 and not block:
+            return False
+
+        # Workers are stuck. Every other batch is waiting on them too
+        if not PREPROCESS_POOL.is_disabled:
+            PREPROCESS_POOL.disable()
+
+        return True
+
+    def get_preprocessed(self, futures: dict) -> dict:
+        """Results of a batch, raising the first error while preprocessing
+
+        Returns:
+            dict: PreprocessedStage per job, or empty to preprocess in-process
+                  if the batch was cut off by disabling the pool
+        """
+        if PREPROCESS_POOL.is_disabled:
+            return {}
+
+        return { job: f.result() for job, f in futures.items() }
+
+    def sync_settings(self):
+        """Copy compile progress and errors to each material's settings"""
+        for mat, (progress, error) in self.results.items():
+            try:
+                settings = mat.material.scratchpad
+                settings.compile_progress = progress
+                if error is not None:
+                    settings.last_shader_error = error
+            except ReferenceError:
+                # Material was deleted mid-compile
+                pass
+
+        # Keep reporting progress of compiles still in flight
+        pending = set(p[0] for p in self.pending)
+        self.results = {
+            mat: result for mat, result in self.results.items() if mat in pending
+        }
@@ -5,8 +5,12 @@ In a perfect world - this'll make it easier to upgrade once Blender
 moves onward to Vulkan/Metal/whatever they choose.
 """
 
+import numpy as np
 from bgl import *
 
+from ..transforms import ObjectTransforms
+from shaders.textures import TEXTURE_MANAGER
+
 class Graphics:
     @staticmethod
     def compile_program():
@@ -20,6 +24,13 @@ class Graphics:
         if depth_test:
             glEnable(GL_DEPTH_TEST)
 
+    @staticmethod
+    def disable_features(depth_test: bool):
+        """Disable specific driver features
+        """
+        if depth_test:
+            glDisable(GL_DEPTH_TEST)
+
     @staticmethod
     def clear_render_target(clear_depth: bool, clear_color: bool, background_color: tuple, depth: float = 1.0):
         """Clear the current render target
@@ -27,55 +38,214 @@ class Graphics:
         glClearColor(background_color[0], background_color[1], background_color[2], depth)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
+    @staticmethod
+    def get_viewport() -> tuple:
+        """Current viewport as (x, y, width, height) in pixels
+        """
+        viewport = Buffer(GL_INT, 4)
+        glGetIntegerv(GL_VIEWPORT, viewport)
+        return tuple(viewport)
+
+    # Empty VAO for attribute-less draws, created on first use
+    fullscreen_vao = None
+
+    @staticmethod
+    def draw_fullscreen_triangle():
+        """Draw a single triangle covering the viewport
+
+        Vertex shaders generate positions from gl_VertexID, but a VAO 
+        must still be bound to draw in a core profile context.
+        """
+        if Graphics.fullscreen_vao is None:
+            buf = Buffer(GL_INT, 1)
+            glGenVertexArrays(1, buf)
+            Graphics.fullscreen_vao = buf[0]
+
+        glBindVertexArray(Graphics.fullscreen_vao)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+        glBindVertexArray(0)
+
 class CommandBuffer:
-    pass
-    # TODO: Eventually will be buffered. 
-    # For now, we treat this as an immediate mode.
+    """Recorded list of draw commands that can be replayed across frames.
+
+    Commands are recorded once into flat integer arrays of (opcode, arg0, arg1)
+    with shaders, VAOs and objects referenced by index into resource tables.
+    As long as the scene hasn't structurally changed, the same buffer is 
+    replayed every frame and only the dynamic uniforms (camera, lighting, 
+    per-object matrices) are patched in with their current values.
+    Per-object matrices for the whole buffer are computed in a single 
+    batch by ObjectTransforms before replay.
+
+    Usage:
+        buffer = CommandBuffer()
+
+        if buffer.version != data.structure_version:
+            buffer.clear()
+            buffer.bind_program(shader)
+            buffer.set_uniform_block(CommandBuffer.BLOCK_CAMERA)
+            buffer.bind_vao(vao)
+            buffer.set_uniform_block(CommandBuffer.BLOCK_OBJECT, buffer.add_object(renderable))
+            buffer.draw_range(0, vao.total_indices)
+            buffer.finish(data.structure_version)
+
+        buffer.execute(data, 'Main')
+    """
+
+    # Opcodes
+    BIND_PROGRAM = 0
+    SET_UNIFORM_BLOCK = 1
+    BIND_VAO = 2
+    DRAW_RANGE = 3
+
+    # Uniform blocks that are patched with current values on replay
+    BLOCK_CAMERA = 0
+    BLOCK_LIGHTING = 1
+    BLOCK_TEXTURES = 2
+    BLOCK_OBJECT = 3
+    BLOCK_MATERIAL = 4
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.ops)
+
+    def clear(self):
+        """Drop all recorded commands and resource references"""
+        self.recording = []
+        self.ops = np.empty((0, 3), dtype=np.int32)
+        self.shaders = []
+        self.vaos = []
+        self.objects = []
+        self.materials = []
+        self.keywords = []
+        self.indices = {} # (id(table), id(resource)) -> Index of a resource in its table
+        self.keyword_indices = {} # Keywords -> Index into self.keywords
+        self.transforms = ObjectTransforms()
+        self.version = None
+
+    def _resource(self, table: list, resource) -> int:
+        # Tables keep every resource alive, so ids are never reused while recorded
+        key = (id(table), id(resource))
+        index = self.indices.get(key)
+        if index is None:
+            index = len(table)
+            table.append(resource)
+            self.indices[key] = index
+
+        return index
+
+    def add_object(self, renderable) -> int:
+        """Track a renderable for per-object uniform patching
+
+        Returns:
+            int: Index to pass to set_uniform_block(BLOCK_OBJECT, ...)
+        """
+        self.objects.append(renderable)
+        return len(self.objects) - 1
 
-    # def clear_render_target(self, clear_depth: bool, clear_color: bool, background_color: tuple, depth: float = 1.0):
-    #     """Clear the current render target
-    #     """
-    #     glClearColor(background_color[0], background_color[1], background_color[2], depth)
-    #     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    def add_material(self, material) -> int:
+        """Track a material for per-material uniform patching
 
-    # def draw_renderables(self, renderables: dict, technique: str = 'Main'):
-    #     for mat in renderables:
-    #         shader = mat.shader
-            
-    #         if shader.last_error:
-    #             shader = fallback_shader # ???
+        Parameters:
+            material (bpy.types.Material)
 
-    #         shader.bind(technique)
-    #         shader.set_camera_matrices(
-    #             region3d.view_matrix, # ????
-    #             region3d.window_matrix
-    #         )
-            
-    #         shader.set_lighting(self.lighting) # ????
+        Returns:
+            int: Index to pass to set_uniform_block(BLOCK_MATERIAL, ...)
+        """
+        return self._resource(self.materials, material)
 
-    #         for r in renderables[mat]:
-    #             shader.set_object_matrices(r.model_matrix)
-    #             r.draw(shader)
+    def bind_program(self, shader, keywords: tuple = ()):
+        """
+        Parameters:
+            shader (BaseShader)
+            keywords (tuple(str)):  Keywords selecting the shader's program variant
+        """
+        index = self.keyword_indices.get(keywords)
+        if index is None:
+            index = len(self.keywords)
+            self.keywords.append(keywords)
+            self.keyword_indices[keywords] = index
 
-    #         shader.unbind()
+        self.recording.append((
+            self.BIND_PROGRAM, 
+            self._resource(self.shaders, shader), 
+            index
+        ))
 
-# VAO/EBO/VBO needs to be here as well I guess.
-# Unity has Mesh.UploadMeshData
-# and Mesh.SetVertexBuffer
+    def set_uniform_block(self, block: int, index: int = 0):
+        self.recording.append((self.SET_UNIFORM_BLOCK, block, index))
 
+    def bind_vao(self, vao):
+        self.recording.append((self.BIND_VAO, self._resource(self.vaos, vao), 0))
 
-    # add static fallback shader 
+    def draw_range(self, first: int, count: int):
+        self.recording.append((self.DRAW_RANGE, first, count))
 
-# Unity property block applies a set of crap to a material
-# per-instance of mesh using it. 
+    def finish(self, version):
+        """Pack recorded commands into flat arrays for replay
 
-# I assume a command buffer is a:
-# 1. bind shader program used to render a material
-# execute everything in the buffer for that program (set glUniform etc)
-# and draw geometry.
+        Parameters:
+            version (any): Structure version this recording is valid for
+        """
+        self.ops = np.array(self.recording, dtype=np.int32).reshape(-1, 3)
+        self.recording = []
+        self.version = version
 
-# they also have a "attach command buffers to stages of camera" stuff
-# so that the camera sets up view matrices, then draws, etc. 
-# so, presumably, for each material program under a camera ... somehow...
-# all those buffers are executed. 
+    def execute(self, data, render_pass: str):
+        """Replay recorded commands against the current frame's data
 
+        Parameters:
+            data (RenderData):  Current camera, lighting, and frame stats
+            render_pass (str):  Pass name to bind shaders with. E.g. `Main`
+        """
+        camera = data.camera
+        stats = data.stats
+        shaders = self.shaders
+        vaos = self.vaos
+        objects = self.objects
+        materials = self.materials
+        keywords = self.keywords
+
+        shader = None
+        vao = None
+
+        # Compute every object's matrices up front in one batch
+        self.transforms.update(objects, camera.view_matrix, camera.projection_matrix)
+        matrices = self.transforms.buffer
+
+        for op, a, b in self.ops.tolist():
+            if op == self.DRAW_RANGE:
+                glDrawElements(GL_TRIANGLES, b, GL_UNSIGNED_INT, a * 4)
+                stats.draw_calls += 1
+            elif op == self.SET_UNIFORM_BLOCK:
+                if a == self.BLOCK_OBJECT:
+                    shader.set_object_matrix_buffer(matrices[b])
+                elif a == self.BLOCK_CAMERA:
+                    shader.set_camera_matrices(camera.view_matrix, camera.projection_matrix)
+                elif a == self.BLOCK_LIGHTING:
+                    shader.set_lighting(data.lights)
+                elif a == self.BLOCK_TEXTURES:
+                    # Index is nonzero when the texture set differs from the last bound set
+                    shader.bind_textures()
+                    stats.texture_switches += b
+                elif a == self.BLOCK_MATERIAL:
+                    shader.set_material(materials[b])
+            elif op == self.BIND_VAO:
+                vao = vaos[a]
+                vao.bind(shader.program)
+                stats.vao_switches += 1
+            elif op == self.BIND_PROGRAM:
+                if shader: 
+                    shader.unbind()
+                shader = shaders[a]
+                shader.bind(render_pass, keywords[b])
+                stats.program_switches += 1
+
+        if vao:
+            vao.unbind()
+
+        if shader:
+            shader.unbind()
+
+        TEXTURE_MANAGER.unbind_samplers()
@@ -1,4 +1,5 @@
 
+import os
 import uuid
 from collections import OrderedDict
 import bpy
@@ -9,16 +10,36 @@ from .driver import (
     CommandBuffer,
 )
 
-from .lights import (
-    MainLight,
-    SpotLight,
-    PointLight
-)
-
 from .render_data import (
     RenderData
 )
 
+from .animation import (
+    AnimationPipeline
+)
+
+from .ubo import (
+    CameraUniformBuffer,
+    LightUniformBuffer
+)
+
+from .clusters import (
+    LightClusters
+)
+
+from .compile_queue import (
+    CompileQueue
+)
+
+from .interaction import (
+    InteractionScheduler
+)
+
+from .offscreen import (
+    OffscreenTarget,
+    tile_projection_matrix
+)
+
 from .renderables import (
     ScratchpadMaterial,
     ScratchpadMesh
@@ -33,15 +54,33 @@ from .properties import (
 from .passes import (
     MainLightShadowCasterPass,
     AdditionalLightsShadowCasterPass,
-    DrawObjectsPass
+    DrawObjectsPass,
+    GBufferPass,
+    DeferredLightingPass,
+    DeferredCompositePass
 )
 
 from shaders.fallback import FallbackShader
+from shaders.watcher import FILE_WATCHER, FileWatcher
+from shaders.textures import TEXTURE_MANAGER
 from shaders import SUPPORTED_SHADERS 
 
-from libs.debug import debug
+from libs.debug import debug, init_log, log, op_log
 from libs.registry import autoregister
 
+def get_png_frame_path(scene, frame: int) -> str:
+    """Output path of a frame, with a .png extension if extensions are enabled
+
+    Parameters:
+        scene (bpy.types.Scene)
+        frame (int)
+    """
+    path = scene.render.frame_path(frame=frame)
+    if scene.render.use_file_extension:
+        path = os.path.splitext(path)[0] + '.png'
+
+    return path
+
 def sort_by_draw_order(arr):
     """Sort a list of ScratchpadMaterial instances by Scratchpad draw priority
     
@@ -54,6 +93,41 @@ def sort_by_draw_order(arr):
     """
     return OrderedDict(sorted(arr.items(), key=lambda m: m[0].material.scratchpad.priority))
 
+def get_render_structure(renderables) -> list:
+    """Snapshot of the scene structure that recorded command buffers depend on
+
+    Parameters:
+        renderables ({ ScratchpadMaterial, list(Renderable) })
+
+    Returns:
+        list: Comparable snapshot. If two snapshots differ, buffers need to be re-recorded
+    """
+    structure = []
+    for mat, objs in renderables.items():
+        shader = mat.shader
+        structure.append((
+            id(mat),
+            mat.material.scratchpad.priority,
+            shader.program,
+            bool(shader.last_error),
+            shader.get_textures(),
+            tuple(id(r) for r in objs)
+        ))
+
+    return structure
+
+def get_render_size(scene) -> tuple:
+    """Final render resolution in pixels, after resolution percentage scaling
+
+    Returns:
+        tuple(int, int)
+    """
+    scale = scene.render.resolution_percentage / 100.0
+    return (
+        int(scene.render.resolution_x * scale),
+        int(scene.render.resolution_y * scale)
+    )
+
 def generate_unique_key() -> str:
     return 'scratchpad_dynamic_' + uuid.uuid4().hex
 
@@ -62,6 +136,7 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
     bl_idname = "scratchpad_renderer"
     bl_label = "Scratchpad"
     bl_use_preview = True
+    bl_use_gpu_context = True
 
     # Statically available instance for use in render passes/etc 
     fallback_shader = FallbackShader()
@@ -86,12 +161,39 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
         self.materials = dict() # Material -> ScratchpadMaterial cache
 
         self.render_data = RenderData()
-
-        self.passes = [
-            MainLightShadowCasterPass(),
-            AdditionalLightsShadowCasterPass(),
-            DrawObjectsPass()
-        ]
+        self.render_data.fallback_shader = ScratchpadRenderEngine.fallback_shader
+        self.render_structure = None
+
+        # Shared per-frame uniform blocks, created on first draw
+        self.camera_buffer = None
+        self.light_buffer = None
+        self.light_clusters = None
+
+        self.scheduler = InteractionScheduler()
+        self.render_data.scheduler = self.scheduler
+        self.is_settle_timer_registered = False
+
+        self.compile_queue = CompileQueue()
+        self.is_compile_timer_registered = False
+        self.is_watch_timer_registered = False
+        self.watch_generation = 0
+
+        # Passes per pipeline, selectable in the scene render settings
+        self.pipelines = {
+            'FORWARD': [
+                MainLightShadowCasterPass(),
+                AdditionalLightsShadowCasterPass(),
+                DrawObjectsPass()
+            ],
+            'DEFERRED': [
+                MainLightShadowCasterPass(),
+                AdditionalLightsShadowCasterPass(),
+                GBufferPass(),
+                DeferredLightingPass(),
+                DeferredCompositePass(),
+                DrawObjectsPass(skip_deferred = True)
+            ]
+        }
 
         self.setup_passes()
 
@@ -103,13 +205,15 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
     def setup_passes(self):
         """Execute setup() on all registered render passes"""
-        for p in self.passes:
-            p.setup()
+        for passes in self.pipelines.values():
+            for p in passes:
+                p.setup()
 
     def cleanup_passes(self):
         """Execute cleanup() on all registered render passes"""
-        for p in self.passes:
-            p.cleanup()
+        for passes in self.pipelines.values():
+            for p in passes:
+                p.cleanup()
 
     def configure_passes(self):
         """Execute configure() on all registered render passes"""
@@ -119,53 +223,251 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
         #     p.configure(???)
 
     def render(self, depsgraph):
-        """Handle final render (F12) and material preview window renders"""
-        pass
-        # TODO: Implement? Should be the same as view_draw.
-        # Not sure what the use case for this is - since this is a 
-        # realtime viewport renderer. Material preview windows maybe?
-
-        # scene = depsgraph.scene
-        # scale = scene.render.resolution_percentage / 100.0
-        # self.size_x = int(scene.render.resolution_x * scale)
-        # self.size_y = int(scene.render.resolution_y * scale)
-
-        # # Fill the render result with a flat color. The framebuffer is
-        # # defined as a list of pixels, each pixel itself being a list of
-        # # R,G,B,A values.
-        # if self.is_preview:
-        #     color = [0.1, 0.2, 0.1, 1.0]
-        # else:
-        #     color = [0.2, 0.1, 0.1, 1.0]
-
-        # pixel_count = self.size_x * self.size_y
-        # rect = [color] * pixel_count
-
-        # # Here we write the pixel values to the RenderResult
-        # result = self.begin_result(0, 0, self.size_x, self.size_y)
-        # layer = result.layers[0].passes["Combined"]
-        # layer.rect = rect
-        # self.end_result(result)
+        """Handle final render (F12) and material preview window renders
+
+        Renders the same passes as view_draw() into an offscreen framebuffer
+        and copies the result into the render result. Resolutions larger
+        than the driver's maximum framebuffer size are rendered in tiles.
+        """
+        scene = depsgraph.scene
+
+        # Flag shaders with settled file changes, in case 
+        # this is a final render without a watch timer
+        FILE_WATCHER.dispatch()
+        width, height = get_render_size(scene)
+
+        camera = scene.camera
+        if not camera:
+            self.report({'ERROR'}, 'Scene has no active camera')
+            return
+
+        # Set by SCRATCHPAD_OT_render_animation on the scene it renders,
+        # so material previews (with their own scene) never consume it
+        if not self.is_preview and scene.scratchpad.animation_requested:
+            scene.scratchpad.animation_requested = False
+            self.render_animation(depsgraph)
+            return
+
+        self.update_scene(depsgraph)
+        ScratchpadRenderEngine.check_fallback_shader()
+
+        # Final renders wait on every shader rather than drawing fallbacks
+        self.compile_queue.poll(block=True)
+        self.compile_queue.sync_settings()
+        self.compile_variants(scene)
+        self.scheduler.begin_frame()
+
+        view_matrix, projection_matrix = self.get_camera_matrices(depsgraph, width, height)
+
+        init_log('Render {}x{}'.format(width, height))
+        target = OffscreenTarget(width, height)
+        log('Allocate {}'.format(target))
+
+        try:
+            for x, y, w, h in target.tiles():
+                if self.test_break():
+                    break
+
+                target.bind(w, h)
+                self.draw_frame(
+                    scene, 
+                    view_matrix, 
+                    tile_projection_matrix(projection_matrix, x, y, w, h, width, height)
+                )
+                pixels = target.read(w, h)
+                target.unbind()
+                log('Draw and read tile ({}, {}, {}, {})'.format(x, y, w, h))
+
+                result = self.begin_result(x, y, w, h)
+                result.layers[0].passes['Combined'].rect = pixels
+                self.end_result(result)
+                log('Write tile to render result')
+        finally:
+            target.destroy()
+
+        op_log('Total render time')
+
+    def render_animation(self, depsgraph):
+        """Render the scene frame range with pipelined GPU draw, readback and file output
+
+        Frames are written as PNGs to the scene output path by a background
+        thread while later frames are still drawing. The output file format
+        setting is ignored, but a .png extension is used in its place.
+        """
+        scene = depsgraph.scene
+        width, height = get_render_size(scene)
+        frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+        frame_current = scene.frame_current
+
+        init_log('Render animation {}x{} ({} frames)'.format(width, height, len(frames)))
+        pipeline = AnimationPipeline(width, height)
+
+        try:
+            for i, frame in enumerate(frames):
+                if self.test_break():
+                    break
+
+                self.frame_set(frame, 0.0)
+                self.update_scene(depsgraph)
+                ScratchpadRenderEngine.check_fallback_shader()
+                self.compile_queue.poll(block=True)
+                self.compile_queue.sync_settings()
+                self.compile_variants(scene)
+                self.scheduler.begin_frame()
+
+                view_matrix, projection_matrix = self.get_camera_matrices(depsgraph, width, height)
+
+                # Frames over the driver's framebuffer size are drawn in tiles
+                pipeline.begin_frame()
+                for x, y, w, h in pipeline.tiles():
+                    pipeline.begin_tile(w, h)
+                    self.draw_frame(
+                        scene,
+                        view_matrix,
+                        tile_projection_matrix(projection_matrix, x, y, w, h, width, height)
+                    )
+                    pipeline.end_tile(x, y, w, h)
+                pipeline.end_frame(get_png_frame_path(scene, frame))
+
+                self.update_stats('', 'Frame {} | {}'.format(frame, pipeline.timings.summary()))
+                self.update_progress((i + 1) / len(frames))
+
+            pipeline.finish()
+        finally:
+            pipeline.destroy()
+            self.frame_set(frame_current, 0.0)
+
+        op_log('Total animation render time')
+
+        summary = 'Average per frame: {} (bottleneck: {})'.format(
+            pipeline.timings.summary(),
+            pipeline.timings.bottleneck()
+        )
+        debug(summary)
+        self.report({'INFO'}, summary)
+
+    def get_camera_matrices(self, depsgraph, width: int, height: int):
+        """Get the view and projection matrices of the scene camera
+
+        Returns:
+            tuple(mathutils.Matrix, mathutils.Matrix)
+        """
+        scene = depsgraph.scene
+        camera = scene.camera
+
+        view_matrix = camera.matrix_world.inverted()
+        projection_matrix = camera.calc_matrix_camera(
+            depsgraph,
+            x=width,
+            y=height,
+            scale_x=scene.render.pixel_aspect_x,
+            scale_y=scene.render.pixel_aspect_y
+        )
+
+        return view_matrix, projection_matrix
 
     def view_update(self, context, depsgraph):
         """Called when a scene or 3D viewport changes"""
         # region = context.region
         # view3d = context.space_data
+        self.update_scene(depsgraph, True)
+
+        # Nothing else may update once an edit stops, so poll for it 
+        if self.scheduler.is_active and not self.is_settle_timer_registered:
+            self.is_settle_timer_registered = True
+            bpy.app.timers.register(
+                self.check_settled_meshes, 
+                first_interval=InteractionScheduler.SETTLE_TIME
+            )
+
+        # Shader sources are watched off the UI thread, so all 
+        # that's left here is to pick up changes once they settle
+        if not self.is_watch_timer_registered:
+            self.is_watch_timer_registered = True
+            bpy.app.timers.register(
+                self.check_watched_files,
+                first_interval=FileWatcher.DEBOUNCE_TIME
+            )
+
+    def check_settled_meshes(self):
+        """Timer callback to request a view_update() once interactive meshes settle
+
+        Returns:
+            float|None: Seconds until the next check, or None to unregister
+        """
+        try:
+            if self.scheduler.has_settled():
+                self.tag_update()
+        except ReferenceError:
+            # Engine was freed while the timer was still registered
+            return None
+
+        if not self.scheduler.is_active:
+            self.is_settle_timer_registered = False
+            return None
+
+        return InteractionScheduler.SETTLE_TIME
+
+    def check_watched_files(self):
+        """Timer callback to request a view_update() once shader source files change
+
+        Returns:
+            float|None: Seconds until the next check, or None to unregister
+        """
+        try:
+            # Dispatch is shared between engines, so check for
+            # flagged shaders whenever any engine dispatched changes
+            FILE_WATCHER.dispatch()
+            if self.watch_generation != FILE_WATCHER.generation:
+                self.watch_generation = FILE_WATCHER.generation
+                if any(m.shader and m.shader.has_file_changes for m in self.materials.values()):
+                    self.tag_update()
+        except ReferenceError:
+            # Engine was freed while the timer was still registered
+            return None
+
+        return FileWatcher.DEBOUNCE_TIME
+
+    def update_scene(self, depsgraph, interactive: bool = False):
+        """Sync meshes, lights and materials from the depsgraph
+
+        Parameters:
+            depsgraph (bpy.types.Depsgraph)
+            interactive (bool): Throttle rebuilds of meshes that are being 
+                                continuously edited. Viewport only.
+        """
         scene = depsgraph.scene
 
         # self.updated_meshes = dict()
         self.updated_renderables = dict()
         self.updated_materials = dict() # bpy.types.Material -> ScratchpadMaterial
-        self.updated_additional_lights = dict()
+        self.updated_lights = set() # Names of light objects with modified transform or data
+        self.visible_lights = set()
         self.updated_geometries = []
+        self.interactive_geometries = set()
+        self.rebuilt_geometry = False
 
         # Check for any updated mesh geometry to rebuild GPU buffers
         # Note that (de)selecting components still counts as updating geometry. 
+        updated_light_data = set()
         for update in depsgraph.updates:
             name = update.id.name
-            if type(update.id) == bpy.types.Object:
+            if isinstance(update.id, bpy.types.Light):
+                updated_light_data.add(name)
+            elif type(update.id) == bpy.types.Image:
+                TEXTURE_MANAGER.invalidate(update.id)
+            elif type(update.id) == bpy.types.Object:
+                self.updated_lights.add(name)
+
                 if update.is_updated_geometry: # and name in self.meshes:
                     self.updated_geometries.append(name)
+
+                    if interactive and self.scheduler.touch(name):
+                        self.interactive_geometries.add(name)
+
+        # Edits that have stopped get one last full quality rebuild
+        if interactive:
+            self.updated_geometries += self.scheduler.pop_settled()
         
         # Aggregate everything visible in the scene that we care about
         # and update meshes, lighting, materials, etc.
@@ -176,17 +478,29 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
             if obj.type == 'MESH':
                 self.update_mesh(obj, depsgraph)
             elif obj.type == 'LIGHT':
+                if obj.data.name in updated_light_data:
+                    self.updated_lights.add(obj.name)
                 self.update_light(obj)
             else:
                 debug('Unhandled scene object type', obj.type)
         
         # Replace old aggregates of tracked scene data
         self.render_data.renderables = sort_by_draw_order(self.updated_renderables)
-        self.render_data.lights.additional_lights = self.updated_additional_lights
+
+        # Free slots of lights that were deleted or hidden
+        additional_lights = self.render_data.lights.additional_lights
+        for name in additional_lights.names() - self.visible_lights:
+            additional_lights.remove(name)
 
         # Drop any materials no longer used
         self.materials = self.updated_materials
 
+        # Invalidate recorded draw commands if anything structural changed
+        structure = get_render_structure(self.render_data.renderables)
+        if self.rebuilt_geometry or structure != self.render_structure:
+            self.render_structure = structure
+            self.render_data.structure_version += 1
+
     def update_mesh(self, obj, depsgraph):
         """Track a mesh still used in the scene and updated geometry on the GPU if needed
         
@@ -212,7 +526,11 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
         # Copy updated vertex data to the GPU, if modified since last render
         if rebuild_geometry:
-            mesh.rebuild(obj.evaluated_get(depsgraph))
+            mesh.rebuild(
+                obj.evaluated_get(depsgraph), 
+                obj.name in self.interactive_geometries
+            )
+            self.rebuilt_geometry = True
 
     def update_material(self, mat, obj):
         """Track a material still used by an object in the scene
@@ -251,10 +569,8 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
         if light_type == 'SUN':
             self.update_main_light(obj)
-        elif light_type == 'POINT':
-            self.update_point_light(obj)
-        elif light_type == 'SPOT':
-            self.update_spot_light(obj)
+        elif light_type in ('POINT', 'SPOT'):
+            self.update_additional_light(obj)
         # TODO: AREA
         
     def update_main_light(self, obj):
@@ -263,37 +579,22 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
         Parameters:
             obj (bpy.types.Object)
         """
-        self.render_data.lighting.main_light.update(obj)
+        self.render_data.lights.main_light.update(obj)
 
-    def update_point_light(self, obj):
-        """Track an updated point light in the scene
-        
-        Parameters:
-            obj (bpy.types.Object)
-        """
-        additional_lights = self.render_data.lights.additional_lights
-        if obj.name not in additional_lights:
-            light = PointLight()
-        else:
-            light = additional_lights[obj.name]
-        
-        light.update(obj)
-        self.updated_additional_lights[obj.name] = light
-    
-    def update_spot_light(self, obj):
-        """Track an updated spot light in the scene
+    def update_additional_light(self, obj):
+        """Track a point or spot light still in the scene
+
+        The light's row in the light table is only rewritten if
+        it's new or was reported as modified by the depsgraph.
         
         Parameters:
             obj (bpy.types.Object)
         """
+        self.visible_lights.add(obj.name)
+
         additional_lights = self.render_data.lights.additional_lights
-        if obj.name not in additional_lights:
-            light = SpotLight()
-        else:
-            light = additional_lights[obj.name]
-        
-        light.update(obj)
-        self.updated_additional_lights[obj.name] = light
+        if obj.name in self.updated_lights or obj.name not in additional_lights:
+            additional_lights.update(obj)
     
     def update_material_shader(self, mat):
         """ Send updated user data to the shader attached to     
@@ -350,6 +651,11 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
             needs_recompile = active_shader.needs_recompile()
 
+            # A compile still in flight already has everything but files
+            # changed since it was submitted. Resubmitting would restart it
+            if self.compile_queue.is_queued(mat, active_shader):
+                needs_recompile = active_shader.has_file_changes
+
             debug('--- Active shader', active_shader)
             debug('--- Force reload', settings.force_reload)
             debug('--- Live reload', settings.live_reload)
@@ -360,8 +666,11 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
             if settings.force_reload or (settings.live_reload and needs_recompile):
                 settings.force_reload = False
                 
-                active_shader.compile()
+                # Drivers finish the program in the background while 
+                # the material keeps drawing with its previous program
+                self.compile_queue.submit(mat, active_shader)
                 settings.last_shader_error = ''
+                self.register_compile_timer()
                 
                 # Load new dynamic material properties into context
                 unregister_dynamic_property_group(material_group_key)
@@ -374,6 +683,12 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
                         material_group_key
                     )
 
+            # Draws are recorded per keyword variant
+            keywords = tuple(settings.keywords.split())
+            if keywords != mat.keywords:
+                mat.keywords = keywords
+                self.render_data.structure_version += 1
+
             # This needs to happen after compilation, in case we switch back 
             # to a shader format that we're already storing data for 
             props = getattr(mat.material, material_group_key, None)
@@ -387,6 +702,66 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
         mat.shader = active_shader
         
+    def compile_variants(self, scene):
+        """Compile every keyword variant the scene's pipeline draws with, waiting on each
+
+        Final renders can't draw base variants in their place like the viewport.
+
+        Parameters:
+            scene (bpy.types.Scene)
+        """
+        for mat in self.render_data.renderables:
+            for p in self.pipelines[scene.scratchpad.pipeline]:
+                mat.shader.request_variant(p.keywords + mat.keywords)
+
+            self.compile_queue.submit_variants(mat.shader)
+
+        self.compile_queue.poll(block=True)
+
+    def submit_requested_variants(self):
+        """Compile variants that the last frame's draws requested"""
+        for mat in self.render_data.renderables:
+            if mat.shader.requested_variants:
+                self.compile_queue.submit_variants(mat.shader)
+                self.register_compile_timer()
+
+    def register_compile_timer(self):
+        """Start polling shader compiles submitted to the CompileQueue"""
+        if not self.is_compile_timer_registered:
+            self.is_compile_timer_registered = True
+            bpy.app.timers.register(
+                self.check_compile_queue,
+                first_interval=CompileQueue.POLL_INTERVAL
+            )
+
+    def check_compile_queue(self):
+        """Timer callback to report compile progress and redraw until compiles finish
+
+        Programs are swapped in by view_draw(), where the GL context is bound.
+
+        Returns:
+            float|None: Seconds until the next check, or None to unregister
+        """
+        try:
+            self.compile_queue.sync_settings()
+            if len(self.compile_queue) > 0:
+                self.tag_redraw()
+        except ReferenceError:
+            # Engine was freed while the timer was still registered
+            return None
+
+        # Update progress shown in material panels
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'PROPERTIES':
+                    area.tag_redraw()
+
+        if len(self.compile_queue) < 1:
+            self.is_compile_timer_registered = False
+            return None
+
+        return CompileQueue.POLL_INTERVAL
+
     @staticmethod
     def check_fallback_shader():
         """Make sure the fallback shader is compiled and ready to use"""
@@ -410,11 +785,52 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
 
         # Begin frame rendering
         ScratchpadRenderEngine.check_fallback_shader()
+        if self.compile_queue.poll():
+            self.render_data.structure_version += 1
+        self.scheduler.begin_frame(scene.scratchpad.frame_time_budget / 1000.0)
         self.bind_display_space_shader(scene)
 
+        self.draw_frame(scene, region3d.view_matrix, region3d.window_matrix)
+        
+        # End frame rendering
+        self.unbind_display_space_shader()
+        self.submit_requested_variants()
+        debug('Frame stats', self.render_data.stats)
+
+        # Continue any mesh or texture uploads that didn't fit within this frame
+        if self.scheduler.deferred or TEXTURE_MANAGER.is_streaming:
+            self.tag_redraw()
+
+    def draw_frame(self, scene, view_matrix, projection_matrix):
+        """Run all render passes for a single camera into the current render target
+
+        Parameters:
+            scene (bpy.types.Scene)
+            view_matrix (mathutils.Matrix)
+            projection_matrix (mathutils.Matrix)
+        """
         # Camera Loop 
-        self.render_data.camera.view_matrix = region3d.view_matrix
-        self.render_data.camera.projection_matrix = region3d.window_matrix
+        self.render_data.camera.view_matrix = view_matrix
+        self.render_data.camera.projection_matrix = projection_matrix
+
+        # Upload camera and lighting once for every program to share
+        if not self.camera_buffer:
+            self.camera_buffer = CameraUniformBuffer()
+            self.light_buffer = LightUniformBuffer()
+            self.light_clusters = LightClusters()
+
+        # Assign additional lights to clusters of the view frustum so that
+        # shaders only loop over the lights that can reach each fragment
+        self.light_clusters.update(
+            self.render_data.lights.additional_lights,
+            view_matrix,
+            projection_matrix,
+            Graphics.get_viewport()
+        )
+        self.light_clusters.bind()
+
+        self.camera_buffer.update(self.render_data.camera)
+        self.light_buffer.update(self.render_data.lights, self.light_clusters)
 
         Graphics.enable_features(depth_test = True)
         Graphics.clear_render_target(
@@ -423,9 +839,18 @@ class ScratchpadRenderEngine(bpy.types.RenderEngine):
             background_color = scene.world.color
         )
 
-        # Run draw passes
-        for p in self.passes:
+        # Run draw passes of the selected pipeline
+        self.render_data.stats.reset()
+
+        # Textures stream in over several viewport frames, but
+        # final renders (without a frame budget) wait on each upload
+        upload_budget = None
+        if self.scheduler.budget is not None:
+            upload_budget = int(scene.scratchpad.texture_upload_budget * 1024 * 1024)
+
+        TEXTURE_MANAGER.begin_frame(scene.scratchpad.texture_budget * 1024 * 1024, upload_budget)
+        for p in self.pipelines[scene.scratchpad.pipeline]:
             p.execute(self.render_data)
-        
-        # End frame rendering
-        self.unbind_display_space_shader()
+
+        # Free textures that weren't drawn if this frame went over budget
+        TEXTURE_MANAGER.evict()
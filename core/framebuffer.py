@@ -0,0 +1,124 @@
+
+from bgl import *
+
+class Framebuffer:
+    """Abstraction for managing an offscreen framebuffer object
+
+    Each color attachment is a texture so that later passes can sample
+    from it. Depth is stored in a depth texture for the same reason.
+
+    Usage:
+        fb = Framebuffer(1920, 1080)
+
+        fb.bind()
+        # ... draw calls ...
+        fb.read_pixels(0, 0, 0, 1920, 1080, buffer)
+        fb.unbind()
+
+        fb.destroy()
+    """
+    def __init__(self, width: int, height: int, color_formats: tuple = (GL_RGBA32F,)):
+        """Create a new Framebuffer
+
+        Parameters:
+            width (int):            Width in pixels
+            height (int):           Height in pixels
+            color_formats (tuple):  Internal format per color attachment, e.g. `GL_RGBA32F`
+        """
+        self.width = width
+        self.height = height
+        self.color_formats = color_formats
+
+        buf = Buffer(GL_INT, 1)
+        glGenFramebuffers(1, buf)
+        self.fbo_id = buf[0]
+
+        self.color_textures = [self._create_texture(fmt, GL_RGBA, GL_FLOAT) for fmt in color_formats]
+        self.depth_texture = self._create_texture(GL_DEPTH_COMPONENT32F, GL_DEPTH_COMPONENT, GL_FLOAT)
+
+        # Previous bindings to restore on unbind()
+        self.prev_fbo = Buffer(GL_INT, 1)
+        self.prev_viewport = Buffer(GL_INT, 4)
+
+        glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING, self.prev_fbo)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo_id)
+
+        for i, tex in enumerate(self.color_textures):
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0 + i, GL_TEXTURE_2D, tex, 0)
+
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.depth_texture, 0)
+
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.prev_fbo[0])
+
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            self.destroy()
+            raise Exception('Incomplete framebuffer ({}x{}): status {}'.format(width, height, status))
+
+        self.draw_buffers = Buffer(GL_INT, len(color_formats), [
+            GL_COLOR_ATTACHMENT0 + i for i in range(len(color_formats))
+        ])
+
+    def __repr__(self):
+        return '<Framebuffer(fbo_id={}, size={}x{}, attachments={}) object at {}>'.format(
+            self.fbo_id,
+            self.width,
+            self.height,
+            len(self.color_textures),
+            id(self)
+        )
+
+    def _create_texture(self, internal_format: int, data_format: int, data_type: int) -> int:
+        buf = Buffer(GL_INT, 1)
+        glGenTextures(1, buf)
+        tex = buf[0]
+
+        glBindTexture(GL_TEXTURE_2D, tex)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, internal_format, self.width, self.height, 0, data_format, data_type, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        return tex
+
+    def bind(self, width: int = None, height: int = None):
+        """Bind as the current draw target.
+
+        Parameters:
+            width (int):    Viewport width to render into. Defaults to the full width
+            height (int):   Viewport height to render into. Defaults to the full height
+        """
+        glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING, self.prev_fbo)
+        glGetIntegerv(GL_VIEWPORT, self.prev_viewport)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo_id)
+        glDrawBuffers(len(self.color_textures), self.draw_buffers)
+        glViewport(0, 0, width or self.width, height or self.height)
+
+    def unbind(self):
+        """Restore the framebuffer and viewport that were bound before bind()"""
+        glBindFramebuffer(GL_FRAMEBUFFER, self.prev_fbo[0])
+
+        vp = self.prev_viewport
+        glViewport(vp[0], vp[1], vp[2], vp[3])
+
+    def read_pixels(self, attachment: int, x: int, y: int, width: int, height: int, buffer):
+        """Read RGBA float pixels from a color attachment into a preallocated buffer
+
+        Framebuffer must be bound.
+
+        Parameters:
+            attachment (int):       Color attachment index
+            x, y, width, height:    Region to read
+            buffer (bgl.Buffer):    Destination with room for `width * height * 4` floats
+        """
+        glReadBuffer(GL_COLOR_ATTACHMENT0 + attachment)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(x, y, width, height, GL_RGBA, GL_FLOAT, buffer)
+
+    def destroy(self):
+        textures = self.color_textures + [self.depth_texture]
+        glDeleteTextures(len(textures), Buffer(GL_INT, len(textures), textures))
+        glDeleteFramebuffers(1, Buffer(GL_INT, 1, [self.fbo_id]))
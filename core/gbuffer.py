@@ -0,0 +1,93 @@
+
+from bgl import *
+
+from .framebuffer import Framebuffer
+
+class GBuffer:
+    """Render targets shared by the passes of the deferred pipeline
+
+    Surface attributes are written by GBufferPass into one MRT framebuffer:
+
+        0 - Albedo      RGBA8:      (base color, coverage)
+        1 - Normal      RGBA16F:    (world space normal, 0)
+        2 - Material    RGBA8:      (roughness, metallic, specular, 0)
+        Depth           DEPTH32F
+
+    DeferredLightingPass writes lit HDR color into a separate accumulation
+    framebuffer that DeferredCompositePass resolves into the render target.
+
+    Usage:
+        gbuffer = GBuffer()
+        gbuffer.resize(width, height)
+
+        gbuffer.framebuffer.bind()
+        # ... draw surfaces ...
+        gbuffer.framebuffer.unbind()
+
+        gbuffer.bind_textures(shader)
+    """
+
+    ALBEDO = 0
+    NORMAL = 1
+    MATERIAL = 2
+
+    FORMATS = (GL_RGBA8, GL_RGBA16F, GL_RGBA8)
+
+    # Sampler uniform per attachment, in attachment order
+    SAMPLERS = ('_GBufferAlbedo', '_GBufferNormal', '_GBufferMaterial')
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        self.framebuffer = None
+        self.accumulation = None
+
+    def __repr__(self):
+        return '<GBuffer(size={}x{}) object at {}>'.format(
+            self.width,
+            self.height,
+            id(self)
+        )
+
+    def resize(self, width: int, height: int):
+        """Reallocate render targets if the size changed"""
+        if width == self.width and height == self.height and self.framebuffer:
+            return
+
+        self.destroy()
+        self.width = width
+        self.height = height
+        self.framebuffer = Framebuffer(width, height, self.FORMATS)
+        self.accumulation = Framebuffer(width, height, (GL_RGBA16F,))
+
+    def bind_textures(self, shader, first_unit: int = 0):
+        """Bind G-buffer attachments and depth to consecutive texture units
+
+        Parameters:
+            shader (BaseShader):    Bound shader to set `_GBuffer*` samplers on
+            first_unit (int):       Texture unit of the first attachment
+        """
+        textures = self.framebuffer.color_textures + [self.framebuffer.depth_texture]
+        samplers = self.SAMPLERS + ('_GBufferDepth',)
+
+        for i, (tex, sampler) in enumerate(zip(textures, samplers)):
+            glActiveTexture(GL_TEXTURE0 + first_unit + i)
+            glBindTexture(GL_TEXTURE_2D, tex)
+            shader.set_int(sampler, first_unit + i)
+
+        glActiveTexture(GL_TEXTURE0)
+
+    def bind_accumulation(self, shader, unit: int):
+        """Bind accumulated lighting to a texture unit as `_LightAccumulation`"""
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.accumulation.color_textures[0])
+        shader.set_int('_LightAccumulation', unit)
+        glActiveTexture(GL_TEXTURE0)
+
+    def destroy(self):
+        if self.framebuffer:
+            self.framebuffer.destroy()
+            self.accumulation.destroy()
+
+        self.framebuffer = None
+        self.accumulation = None
@@ -0,0 +1,151 @@
+
+from time import perf_counter
+
+class InteractionScheduler:
+    """Throttles mesh rebuilds while an object is being continuously edited
+
+    An object is considered interactive once it receives several geometry
+    updates in quick succession (e.g. sculpt strokes or dragging a gizmo).
+    Interactive meshes rebuild only their positions, at most INTERACTIVE_RATE
+    times per second. Once updates stop for SETTLE_TIME seconds the object
+    settles and gets a single full quality rebuild.
+
+    Rebuilds during a frame are also limited to a time budget. Meshes that
+    don't fit within the budget keep drawing their previous buffers and are
+    deferred to the next frame.
+
+    Usage:
+        scheduler = InteractionScheduler()
+
+        # On depsgraph updates
+        interactive = scheduler.touch(obj.name)
+        for name in scheduler.pop_settled():
+            # ... full rebuild of name ...
+
+        # On draw
+        scheduler.begin_frame(0.008)
+        if scheduler.can_rebuild(mesh):
+            start = perf_counter()
+            # ... upload mesh ...
+            scheduler.spend(mesh, perf_counter() - start)
+    """
+
+    # Updates closer together than this are part of the same edit
+    CONTINUOUS_INTERVAL = 0.2
+
+    # Number of consecutive quick updates before an object is interactive
+    CONTINUOUS_UPDATES = 3
+
+    # Seconds without updates before an interactive object settles
+    SETTLE_TIME = 0.3
+
+    # Maximum position-only rebuilds per second of an interactive mesh
+    INTERACTIVE_RATE = 30
+
+    def __init__(self):
+        self.last_update = dict() # Object name -> time of the last update
+        self.streak = dict() # Object name -> consecutive quick updates
+        self.interactive = set() # Object names currently being edited
+
+        self.budget = None
+        self.spent = 0.0
+        self.rebuilds = 0
+        self.deferred = False
+
+    @property
+    def is_active(self) -> bool:
+        """Whether any object is still mid-edit"""
+        return len(self.interactive) > 0
+
+    def touch(self, name: str, now: float = None) -> bool:
+        """Record a geometry update to an object
+
+        Parameters:
+            name (str): Object name
+            now (float): Current time in seconds, defaults to perf_counter()
+
+        Returns:
+            bool: True if the object is being continuously edited
+        """
+        now = perf_counter() if now is None else now
+        last = self.last_update.get(name)
+
+        if last is not None and now - last < self.CONTINUOUS_INTERVAL:
+            self.streak[name] = self.streak.get(name, 0) + 1
+        else:
+            self.streak[name] = 1
+
+        self.last_update[name] = now
+
+        if self.streak[name] >= self.CONTINUOUS_UPDATES:
+            self.interactive.add(name)
+
+        return name in self.interactive
+
+    def has_settled(self, now: float = None) -> bool:
+        """Whether any interactive object is ready to settle"""
+        now = perf_counter() if now is None else now
+        return any(
+            now - self.last_update[name] >= self.SETTLE_TIME
+            for name in self.interactive
+        )
+
+    def pop_settled(self, now: float = None) -> list:
+        """Remove and return interactive objects that haven't updated recently
+
+        Returns:
+            list(str): Object names that need a full quality rebuild
+        """
+        now = perf_counter() if now is None else now
+        settled = [
+            name for name in self.interactive
+            if now - self.last_update[name] >= self.SETTLE_TIME
+        ]
+
+        for name in settled:
+            self.interactive.discard(name)
+            self.streak[name] = 0
+
+        return settled
+
+    def begin_frame(self, budget: float = None):
+        """Reset the rebuild time budget for a new frame
+
+        Parameters:
+            budget (float): Seconds allowed for rebuilds this frame. None is unlimited
+        """
+        self.budget = budget
+        self.spent = 0.0
+        self.rebuilds = 0
+        self.deferred = False
+
+    def can_rebuild(self, mesh, now: float = None) -> bool:
+        """Check if a mesh with pending geometry may rebuild right now
+
+        At least one rebuild is always allowed per frame so that
+        meshes larger than the whole budget still make progress.
+
+        Parameters:
+            mesh (ScratchpadMesh)
+
+        Returns:
+            bool: False if the rebuild was deferred to a later frame
+        """
+        now = perf_counter() if now is None else now
+
+        allowed = True
+        if mesh.is_interactive and now - mesh.last_rebuild < 1.0 / self.INTERACTIVE_RATE:
+            allowed = False
+        elif self.budget is not None and self.rebuilds > 0 and self.spent >= self.budget:
+            allowed = False
+
+        if not allowed:
+            self.deferred = True
+
+        return allowed
+
+    def spend(self, mesh, duration: float, now: float = None):
+        """Record time spent rebuilding a mesh against this frame's budget"""
+        self.spent += duration
+        self.rebuilds += 1
+        mesh.last_rebuild = perf_counter() if now is None else now
@@ -1,4 +1,5 @@
 
+import numpy as np
 from bgl import *
 from mathutils import Vector
 from math import cos
@@ -21,73 +22,146 @@ class MainLight:
         self.color = (color[0], color[1], color[2], settings.intensity)
         
 
-class SpotLight:
-    def __init__(self):
-        self.position = (0, 0, 0, 1)
-        self.direction = (0, 1, 0, 0)
-        self.color = (1, 1, 1, 1)
-        self.attenuation = (0, 1, 0, 1)
+def get_range_attenuation(distance: float) -> tuple:
+    """Distance attenuation factors matching Unity's URP for forward lights
+
+    Returns:
+        tuple(float, float): (1 / range^2, -range^2 / fade_range^2)
+    """
+    light_range_sqr = distance * distance # TODO: Should be scale or something, so it matches the gizmo 
+    fade_start_distance_sqr = 0.8 * 0.8 * light_range_sqr
+    fade_range_sqr = fade_start_distance_sqr - light_range_sqr
+
+    return (1.0 / light_range_sqr, -light_range_sqr / fade_range_sqr)
+
+def get_spot_attenuation(spot_size: float, spot_blend: float) -> tuple:
+    """Convert spot size and blend (factor) to URP angle attenuation factors
+
+    Returns:
+        tuple(float, float): (1 / angle_range, -cos(outer) / angle_range)
+    """
+    spot_angle = spot_size
+    inner_spot_angle = spot_size * (1.0 - spot_blend)
+
+    cos_outer_angle = cos(spot_angle * 0.5)
+    cos_inner_angle = cos(inner_spot_angle * 0.5)
+    smooth_angle_range = max(0.001, cos_inner_angle - cos_outer_angle)
+    inv_angle_range = 1.0 / smooth_angle_range
+    add = -cos_outer_angle * inv_angle_range
+
+    return (inv_angle_range, add)
+
+class LightTable:
+    """Struct-of-arrays storage for additional (point and spot) lights
+
+    Each light owns a stable slot (row) in the position, direction, 
+    color, and attenuation arrays for as long as it's in the scene. 
+    Rows use the same vec4 packing as Unity's URP for forward lights.
+    
+    Removed lights leave a zeroed hole (zero color contributes no light)
+    that is reused by the next added light, so rows [0, count) can be 
+    handed to shaders directly as zero-copy slices.
+
+    Usage:
+        table = LightTable()
+        table.update(obj) # Only for new or modified lights
+        table.remove('Light.001')
+
+        positions = table.positions[:table.count]
+    """
+    def __init__(self, capacity: int = 16):
+        self.slots = dict() # Object name -> row
+        self.free = [] # Rows of removed lights
+        self.count = 0 # One past the highest used row
+
+        self.positions = np.zeros((capacity, 4), dtype=np.float32)
+        self.directions = np.zeros((capacity, 4), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.attenuations = np.zeros((capacity, 4), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, name: str):
+        return name in self.slots
+
+    def names(self) -> set:
+        return set(self.slots.keys())
+
+    def grow(self):
+        """Double the capacity of every array"""
+        capacity = len(self.positions) * 2
+        for attr in ('positions', 'directions', 'colors', 'attenuations'):
+            arr = np.zeros((capacity, 4), dtype=np.float32)
+            old = getattr(self, attr)
+            arr[:len(old)] = old
+            setattr(self, attr, arr)
+
+    def allocate(self, name: str) -> int:
+        """Get the row of a light, assigning a new one if it isn't tracked yet"""
+        slot = self.slots.get(name)
+        if slot is not None:
+            return slot
+
+        if self.free:
+            # Fill the lowest hole first to keep the used range compact
+            self.free.sort()
+            slot = self.free.pop(0)
+        else:
+            slot = self.count
+            if slot >= len(self.positions):
+                self.grow()
+
+        self.slots[name] = slot
+        self.count = max(self.count, slot + 1)
+        return slot
+
+    def remove(self, name: str):
+        slot = self.slots.pop(name, None)
+        if slot is None:
+            return
+
+        self.positions[slot] = 0
+        self.directions[slot] = 0
+        self.colors[slot] = 0
+        self.attenuations[slot] = 0
+        self.free.append(slot)
+
+        # Trim trailing holes so shaders iterate over fewer rows
+        while self.count > 0 and self.count - 1 in self.free:
+            self.count -= 1
+            self.free.remove(self.count)
+
+    def clear(self):
+        for name in list(self.slots.keys()):
+            self.remove(name)
 
     def update(self, obj):
-        settings = obj.data.scratchpad
-        
-        # Object data
-        position = obj.matrix_world.to_translation()
-        direction = obj.matrix_world.to_quaternion() @ Vector((0, 0, 1))
-        color = obj.data.color
-
-        # Convert spot size and blend (factor) to inner/outer angles
-        spot_angle = obj.data.spot_size
-        inner_spot_angle = obj.data.spot_size * (1.0 - obj.data.spot_blend)
-
-        # Vec4s that match Unity's URP for forward lights
-        self.position = (position[0], position[1], position[2], 1.0)
-        self.direction = (direction[0], direction[1], direction[2], 0)
-        self.color = (color[0], color[1], color[2], settings.intensity)
-        
-        # Range and attenuation settings
-        light_range_sqr = settings.distance * settings.distance # TODO: Should be scale or something, so it matches the gizmo 
-        fade_start_distance_sqr = 0.8 * 0.8 * light_range_sqr
-        fade_range_sqr = fade_start_distance_sqr - light_range_sqr
+        """Write the current state of a point or spot light into its row
 
-        self.attenuation = (1.0 / light_range_sqr, -light_range_sqr / fade_range_sqr, 0, 1)
+        Parameters:
+            obj (bpy.types.Object): Light object of type POINT or SPOT
+        """
+        slot = self.allocate(obj.name)
 
-        light_range_sqr = settings.distance * settings.distance # TODO: Should be scale or something, so it matches the gizmo 
-        fade_start_distance_sqr = 0.8 * 0.8 * light_range_sqr
-        fade_range_sqr = fade_start_distance_sqr - light_range_sqr
+        light = obj.data
+        settings = light.scratchpad
+        matrix = obj.matrix_world
 
-        cos_outer_angle = cos(spot_angle * 0.5)
-        cos_inner_angle = cos(inner_spot_angle * 0.5)
-        smooth_angle_range = max(0.001, cos_inner_angle - cos_outer_angle)
-        inv_angle_range = 1.0 / smooth_angle_range
-        add = -cos_outer_angle * inv_angle_range
+        position = matrix.to_translation()
+        direction = matrix.to_quaternion() @ Vector((0, 0, 1))
+        color = light.color
 
-        self.attenuation = (1.0 / light_range_sqr, -light_range_sqr / fade_range_sqr, inv_angle_range, add)
-
-
-class PointLight:
-    def __init__(self):
-        self.position = (0, 0, 0, 1)
-        self.direction = (0, 1, 0, 0)
-        self.color = (1, 1, 1, 1)
-        self.attenuation = (0, 1, 0, 1)
-
-    def update(self, obj):
-        settings = obj.data.scratchpad
-        
-        # Object data
-        position = obj.matrix_world.to_translation()
-        direction = obj.matrix_world.to_quaternion() @ Vector((0, 0, 1))
-        color = obj.data.color
-        
         # Vec4s that match Unity's URP for forward lights
-        self.position = (position[0], position[1], position[2], 1.0)
-        self.direction = (direction[0], direction[1], direction[2], 0)
-        self.color = (color[0], color[1], color[2], settings.intensity)
+        self.positions[slot] = (position[0], position[1], position[2], 1.0)
+        self.directions[slot] = (direction[0], direction[1], direction[2], 0)
+        self.colors[slot] = (color[0], color[1], color[2], settings.intensity)
         
         # Range and attenuation settings
-        light_range_sqr = settings.distance * settings.distance
-        fade_start_distance_sqr = 0.8 * 0.8 * light_range_sqr
-        fade_range_sqr = fade_start_distance_sqr - light_range_sqr
+        distance_attenuation = get_range_attenuation(settings.distance)
+        if light.type == 'SPOT':
+            angle_attenuation = get_spot_attenuation(light.spot_size, light.spot_blend)
+        else:
+            angle_attenuation = (0, 1)
 
-        self.attenuation = (1.0 / light_range_sqr, -light_range_sqr / fade_range_sqr, 0, 1)
+        self.attenuations[slot] = distance_attenuation + angle_attenuation
@@ -313,6 +313,25 @@ def assert_mesh_structs(mesh, c_mesh: Mesh):
     assert c_mesh.totloop == len(mesh.loops), 'totloop mismatch. Mesh(ctype.Structure) may be misaligned'
     # TODO: Assertions for CustomData (not sure what to compare with in bpy)
 
+def get_loop_positions(mesh):
+    """Read only vertex coordinates aligned with loops, as MeshData.co
+
+    Unlike MeshData, this doesn't need loop triangles or UV layers, for
+    cheap position-only updates of a mesh whose topology hasn't changed.
+
+    Parameters:
+        mesh (bpy.types.Mesh)
+
+    Returns:
+        Numpy array with shape (mloop_len, 3)
+    """
+    mvert = cast(mesh.vertices[0].as_pointer(), POINTER(MVert))
+    mloop = cast(mesh.loops[0].as_pointer(), POINTER(MLoop))
+
+    vertices = np.ctypeslib.as_array(mvert, shape=(len(mesh.vertices),))
+    loops = np.ctypeslib.as_array(mloop, shape=(len(mesh.loops),))
+    return vertices['co'][loops['v']]
+
 class MeshData:
     """Wrap a Mesh with a data accessor
 
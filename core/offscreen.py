@@ -0,0 +1,132 @@
+
+import numpy as np
+from bgl import *
+from mathutils import Matrix
+
+from .framebuffer import Framebuffer
+
+def get_max_framebuffer_size() -> int:
+    """Largest width/height the driver supports rendering into"""
+    buf = Buffer(GL_INT, 2)
+    glGetIntegerv(GL_MAX_VIEWPORT_DIMS, buf)
+    max_size = min(buf[0], buf[1])
+
+    glGetIntegerv(GL_MAX_TEXTURE_SIZE, buf)
+    return min(max_size, buf[0])
+
+def iter_tiles(width: int, height: int, tile_width: int, tile_height: int):
+    """Split an image into tiles no larger than tile_width x tile_height
+
+    Yields:
+        tuple(int, int, int, int): (x, y, width, height) of each tile
+    """
+    for y in range(0, height, tile_height):
+        for x in range(0, width, tile_width):
+            yield x, y, min(tile_width, width - x), min(tile_height, height - y)
+
+def tile_projection_matrix(projection_matrix, x: int, y: int, w: int, h: int, width: int, height: int):
+    """Crop a projection matrix down to a single tile of the full image
+
+    The tile's region in NDC is scaled and offset to fill [-1, 1] so that
+    rendering into a w x h viewport produces just that tile.
+
+    Parameters:
+        projection_matrix (mathutils.Matrix):   Projection for the full image
+        x, y, w, h (int):                       Tile region in pixels
+        width, height (int):                    Full image size in pixels
+
+    Returns:
+        mathutils.Matrix
+    """
+    if w == width and h == height:
+        return projection_matrix
+
+    sx = width / w
+    sy = height / h
+    tx = (width - 2 * x - w) / w
+    ty = (height - 2 * y - h) / h
+
+    crop = Matrix((
+        (sx, 0, 0, tx),
+        (0, sy, 0, ty),
+        (0, 0, 1, 0),
+        (0, 0, 0, 1)
+    ))
+
+    return crop @ projection_matrix
+
+class OffscreenTarget:
+    """Offscreen render target for final renders, split into tiles when
+    the output resolution exceeds what the driver can render in one pass.
+
+    Pixels are read back into a single preallocated float buffer that
+    is reused across tiles and exposed to Numpy without copying.
+
+    Usage:
+        target = OffscreenTarget(3840, 2160)
+
+        for x, y, w, h in target.tiles():
+            target.bind(w, h)
+            # ... draw the tile ...
+            pixels = target.read(w, h)
+            target.unbind()
+
+        target.destroy()
+    """
+    def __init__(self, width: int, height: int, max_size: int = None):
+        """
+        Parameters:
+            width (int):    Output width in pixels
+            height (int):   Output height in pixels
+            max_size (int): Maximum tile size. Defaults to the driver's limit
+        """
+        max_size = max_size or get_max_framebuffer_size()
+
+        self.width = width
+        self.height = height
+        self.tile_width = min(width, max_size)
+        self.tile_height = min(height, max_size)
+
+        self.framebuffer = Framebuffer(self.tile_width, self.tile_height)
+
+        size = self.tile_width * self.tile_height * 4
+        self.buffer = Buffer(GL_FLOAT, size)
+
+        # bgl.Buffer exposes the buffer protocol, so this is a view
+        # into the same memory that glReadPixels writes into.
+        self.pixels = np.asarray(self.buffer)
+
+    def __repr__(self):
+        return '<OffscreenTarget(size={}x{}, tile={}x{}) object at {}>'.format(
+            self.width,
+            self.height,
+            self.tile_width,
+            self.tile_height,
+            id(self)
+        )
+
+    @property
+    def is_tiled(self) -> bool:
+        return self.tile_width < self.width or self.tile_height < self.height
+
+    def tiles(self):
+        """Iterate (x, y, width, height) for each tile of the output"""
+        return iter_tiles(self.width, self.height, self.tile_width, self.tile_height)
+
+    def bind(self, width: int, height: int):
+        self.framebuffer.bind(width, height)
+
+    def unbind(self):
+        self.framebuffer.unbind()
+
+    def read(self, width: int, height: int):
+        """Read back the current tile. Target must be bound.
+
+        Returns:
+            np.ndarray: View of shape (width * height, 4), valid until the next read()
+        """
+        self.framebuffer.read_pixels(0, 0, 0, width, height, self.buffer)
+        return self.pixels[:width * height * 4].reshape(-1, 4)
+
+    def destroy(self):
+        self.framebuffer.destroy()
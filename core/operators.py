@@ -2,6 +2,7 @@
 import bpy
 from bpy.types import Operator
 
+from .engine import ScratchpadRenderEngine
 from libs.registry import autoregister
 
 @autoregister
@@ -15,3 +16,17 @@ class SCRATCHPAD_OT_reload_sources(Operator):
             mat.scratchpad.force_reload = True
 
         return {'FINISHED'}
+
+@autoregister
+class SCRATCHPAD_OT_render_animation(Operator):
+    """Render the frame range to PNGs, overlapping drawing, readback and file writes"""
+    bl_idname = 'scratchpad.render_animation'
+    bl_label = 'Render Pipelined Animation'
+
+    @classmethod
+    def poll(cls, context):
+        return context.engine == ScratchpadRenderEngine.bl_idname
+
+    def execute(self, context):
+        context.scene.scratchpad.animation_requested = True
+        return bpy.ops.render.render('INVOKE_DEFAULT')
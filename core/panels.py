@@ -33,7 +33,11 @@ class SCRATCHPAD_RENDER_PT_settings(BasePanel):
         # No controls at top level.
 
         col = layout.column()
-        col.label(text='TODO: Anything scene/render related')
+        col.prop(settings, 'pipeline')
+        col.prop(settings, 'frame_time_budget')
+        col.prop(settings, 'texture_budget')
+        col.prop(settings, 'texture_upload_budget')
+        col.operator('scratchpad.render_animation', icon='RENDER_ANIMATION')
 
 @autoregister
 class SCRATCHPAD_MATERIAL_PT_settings(BasePanel):
@@ -85,6 +89,12 @@ class SCRATCHPAD_MATERIAL_PT_settings_shader(BasePanel):
 
         layout.separator()
 
+        col = layout.column(align=True)
+        col.prop(settings, 'keywords')
+        col.prop(settings, 'prewarm_variants')
+
+        layout.separator()
+
         col = layout.column(align=True)
         row = col.row(align=True)
         row.prop(settings, "live_reload", text="Live Reload")
@@ -94,6 +104,14 @@ class SCRATCHPAD_MATERIAL_PT_settings_shader(BasePanel):
         # col.alignment = 'RIGHT'
         # col.label(text="Last reloaded N minutes ago")
         
+        # Shader is still compiling in the background
+        if settings.compile_progress < 1.0:
+            col = layout.column(align=True)
+            col.label(
+                text='Compiling... {:.0%}'.format(settings.compile_progress), 
+                icon='TIME'
+            )
+
         # Alert message and trace on compile errors
         col = layout.column(align=True)
         col.alert = True
@@ -5,10 +5,16 @@ if 'bpy' in locals():
     importlib.reload(additional_lights_shadow_caster_pass)
     importlib.reload(draw_objects_pass)
     importlib.reload(main_light_shadow_caster_pass)
+    importlib.reload(gbuffer_pass)
+    importlib.reload(deferred_lighting_pass)
+    importlib.reload(deferred_composite_pass)
 else:
     from .render_pass import *
     from .additional_lights_shadow_caster_pass import * 
     from .draw_objects_pass import * 
     from .main_light_shadow_caster_pass import * 
+    from .gbuffer_pass import *
+    from .deferred_lighting_pass import *
+    from .deferred_composite_pass import *
 
 import bpy
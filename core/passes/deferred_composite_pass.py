@@ -0,0 +1,31 @@
+
+from .render_pass import RenderPass
+from ..driver import Graphics
+from shaders.deferred import DeferredCompositeShader
+
+class DeferredCompositePass(RenderPass):
+    """Resolve accumulated deferred lighting and depth into the current render target"""
+    def setup(self):
+        self.shader = DeferredCompositeShader()
+
+    def execute(self, data):
+        """
+        Parameters:
+            data (RenderData)
+        """
+        gbuffer = data.gbuffer
+        if not gbuffer:
+            return
+
+        if not self.shader.is_compiled:
+            self.shader.compile()
+
+        shader = self.shader
+        shader.bind('Main')
+        gbuffer.bind_textures(shader)
+        gbuffer.bind_accumulation(shader, len(gbuffer.FORMATS) + 1)
+
+        Graphics.draw_fullscreen_triangle()
+        data.stats.draw_calls += 1
+
+        shader.unbind()
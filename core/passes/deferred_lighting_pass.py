@@ -0,0 +1,54 @@
+
+from .render_pass import RenderPass
+from ..driver import Graphics
+from ..ubo import LightUniformBuffer
+from ..clusters import LightClusters
+from shaders.deferred import DeferredLightingShader
+
+class DeferredLightingPass(RenderPass):
+    """Accumulate lighting for every G-buffer pixel in a single fullscreen draw
+
+    Additional lights are looked up through the same clusters as forward
+    shading, so the cost scales with screen area and lights per cluster
+    rather than with objects times lights.
+    """
+    def setup(self):
+        self.shader = DeferredLightingShader(
+            LightUniformBuffer.MAX_ADDITIONAL_LIGHTS,
+            LightClusters.INDEX_WIDTH
+        )
+
+    def execute(self, data):
+        """
+        Parameters:
+            data (RenderData)
+        """
+        gbuffer = data.gbuffer
+        if not gbuffer:
+            return
+
+        if not self.shader.is_compiled:
+            self.shader.compile()
+
+        camera = data.camera
+        inverse_view_projection = (camera.projection_matrix @ camera.view_matrix).inverted()
+
+        gbuffer.accumulation.bind()
+        Graphics.disable_features(depth_test = True)
+        Graphics.clear_render_target(
+            clear_depth = True,
+            clear_color = True,
+            background_color = (0, 0, 0)
+        )
+
+        shader = self.shader
+        shader.bind('Main')
+        shader.set_mat4('_InverseViewProjection', inverse_view_projection.transposed())
+        gbuffer.bind_textures(shader)
+
+        Graphics.draw_fullscreen_triangle()
+        data.stats.draw_calls += 1
+
+        shader.unbind()
+        Graphics.enable_features(depth_test = True)
+        gbuffer.accumulation.unbind()
@@ -1,30 +1,71 @@
 
 from .render_pass import RenderPass
+from ..render_queue import RenderQueue
+from ..driver import CommandBuffer
+from .gbuffer_pass import GBufferPass
 
 class DrawObjectsPass(RenderPass):
-    def execute(self, data):
+    def __init__(self, skip_deferred: bool = False):
         """
+        Parameters:
+            skip_deferred (bool):   Skip materials that GBufferPass draws, for the
+                                    forward draws of the deferred pipeline
+        """
+        self.skip_deferred = skip_deferred
+
+    def setup(self):
+        self.queue = RenderQueue()
+        self.commands = CommandBuffer()
+        self.view_matrix = None
+        self.has_deferred_uploads = False
+
+    def record(self, data):
+        """Rebuild the sorted draw list and record it into the command buffer
+
         Parameters:
             data (RenderData)
         """
-        camera = data.camera
-        lights = data.lights 
+        queue = self.queue
+        queue.clear()
 
         for mat in data.renderables:
             shader = mat.shader
             
-            if shader.last_error:
-                shader = ScratchpadRenderEngine.fallback_shader
-
-            shader.bind('Main')
-            shader.set_camera_matrices(
-                camera.view_matrix,
-                camera.projection_matrix
-            )
-            
-            shader.set_lighting(lights)
+            # Also covers shaders still compiling their first program
+            if shader.last_error or not shader.is_compiled:
+                shader = data.fallback_shader
+
+            if self.skip_deferred and GBufferPass.is_deferred(mat):
+                continue
+
+            priority = mat.material.scratchpad.priority
 
             for r in data.renderables[mat]:
-                r.draw(shader)
+                r.prepare(shader, data.scheduler)
+                queue.add(shader, r, priority, self.keywords + mat.keywords)
+
+        self.view_matrix = data.camera.view_matrix.copy()
+        queue.sort(self.view_matrix)
+
+        self.commands.clear()
+        queue.record(self.commands)
+        self.commands.finish(data.structure_version)
+
+        # Index counts of deferred meshes change once they finally upload
+        self.has_deferred_uploads = data.scheduler is not None and data.scheduler.deferred
+
+    def execute(self, data):
+        """
+        Parameters:
+            data (RenderData)
+        """
+        # Only re-record when the scene structure changes. Transparent
+        # draws also depend on the camera for their back to front order.
+        stale = self.commands.version != data.structure_version or self.has_deferred_uploads
+        if not stale and self.queue.has_transparent:
+            stale = self.view_matrix != data.camera.view_matrix
 
-            shader.unbind()
+        if stale:
+            self.record(data)
+        
+        self.commands.execute(data, 'Main')
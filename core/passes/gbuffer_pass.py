@@ -0,0 +1,124 @@
+
+from .render_pass import RenderPass
+from ..render_queue import RenderQueue
+from ..driver import Graphics, CommandBuffer
+from ..gbuffer import GBuffer
+from shaders.deferred import GBufferShader
+
+class GBufferPass(RenderPass):
+    """Write surface attributes of opaque objects into a G-buffer
+
+    Material shaders opt into deferred shading by declaring the GBUFFER
+    keyword, e.g. `#pragma multi_compile _ GBUFFER`. That variant writes
+    the attachments described in GBuffer instead of a lit color, and
+    DeferredLightingPass shades the result.
+
+    Every other material shader does its own lighting, which a G-buffer
+    can't represent. Those are left for the forward DrawObjectsPass after
+    compositing, along with transparent materials, and are still occluded
+    by deferred surfaces through the composited depth.
+
+    Materials without a working program yet are drawn with the built-in
+    GBufferShader, using their Blender material settings.
+    """
+
+    keywords = ('GBUFFER',)
+
+    def setup(self):
+        self.gbuffer = GBuffer()
+        self.shader = GBufferShader()
+        self.queue = RenderQueue()
+        self.commands = CommandBuffer()
+        self.has_deferred_uploads = False
+
+    @classmethod
+    def is_deferred(cls, mat) -> bool:
+        """Whether a material is drawn into the G-buffer rather than forward
+
+        Parameters:
+            mat (ScratchpadMaterial)
+        """
+        if mat.material.scratchpad.priority >= RenderQueue.TRANSPARENT_PRIORITY:
+            return False
+
+        shader = mat.shader
+        if shader.last_error or not shader.is_compiled:
+            return True
+
+        return cls.keywords[0] in shader.declared_keywords
+
+    def record(self, data):
+        """Record draws of every deferred renderable
+
+        Parameters:
+            data (RenderData)
+        """
+        commands = self.commands
+        commands.clear()
+
+        queue = self.queue
+        queue.clear()
+        builtin = []
+
+        for mat in data.renderables:
+            if not self.is_deferred(mat):
+                continue
+
+            shader = mat.shader
+            if shader.last_error or not shader.is_compiled:
+                builtin.append(mat)
+                continue
+
+            priority = mat.material.scratchpad.priority
+            for r in data.renderables[mat]:
+                r.prepare(shader, data.scheduler)
+                queue.add(shader, r, priority, self.keywords + mat.keywords)
+
+        queue.sort(data.camera.view_matrix)
+        queue.record(commands)
+
+        if builtin:
+            commands.bind_program(self.shader)
+            commands.set_uniform_block(commands.BLOCK_CAMERA)
+
+        for mat in builtin:
+            commands.set_uniform_block(commands.BLOCK_MATERIAL, commands.add_material(mat.material))
+
+            # Geometry is still uploaded against the fallback
+            # shader the forward pipeline would have used
+            for r in data.renderables[mat]:
+                r.prepare(data.fallback_shader, data.scheduler)
+                commands.bind_vao(r.vao)
+                commands.set_uniform_block(commands.BLOCK_OBJECT, commands.add_object(r))
+                commands.draw_range(0, r.vao.total_indices)
+
+        commands.finish(data.structure_version)
+        self.has_deferred_uploads = data.scheduler is not None and data.scheduler.deferred
+
+    def execute(self, data):
+        """
+        Parameters:
+            data (RenderData)
+        """
+        if not self.shader.is_compiled:
+            self.shader.compile()
+
+        x, y, width, height = Graphics.get_viewport()
+        self.gbuffer.resize(width, height)
+        data.gbuffer = self.gbuffer
+
+        if self.commands.version != data.structure_version or self.has_deferred_uploads:
+            self.record(data)
+
+        self.gbuffer.framebuffer.bind()
+        Graphics.clear_render_target(
+            clear_depth = True,
+            clear_color = True,
+            background_color = (0, 0, 0)
+        )
+
+        self.commands.execute(data, 'GBuffer')
+        self.gbuffer.framebuffer.unbind()
+
+    def cleanup(self):
+        self.gbuffer.destroy()
@@ -3,6 +3,11 @@ class RenderPass:
     """
     Base render pass. Implement this class for your passes.
     """
+
+    # Shader keywords requested by every draw in this pass, 
+    # in addition to the keywords of each material
+    keywords = ()
+
     def setup(self):
         """
         Allocate resources needed to render your pass.
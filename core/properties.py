@@ -27,7 +27,50 @@ LOADERS = [(s[0], s[0], s[1].__doc__, '', i) for i, s in enumerate(SUPPORTED_SHA
 
 @autoregister
 class ScratchpadProperties(PropertyGroup):
-    # TODO: Scene/render properties
+    frame_time_budget: FloatProperty(
+        name='Frame Time Budget',
+        default=8.0,
+        min=0.0,
+        soft_max=33.0,
+        description='Milliseconds per viewport frame that may be spent uploading '
+                    'mesh changes. Remaining uploads are deferred to later frames',
+    )
+
+    texture_budget: IntProperty(
+        name='Texture Memory',
+        default=1024,
+        min=16,
+        description='Megabytes of GPU memory for material textures. Least recently '
+                    'drawn textures are freed once exceeded',
+    )
+
+    texture_upload_budget: FloatProperty(
+        name='Texture Uploads',
+        default=16.0,
+        min=0.0,
+        soft_max=256.0,
+        description='Megabytes per viewport frame that may be spent uploading textures. '
+                    'Low resolution placeholders are drawn until the full texture is uploaded',
+    )
+
+    pipeline: EnumProperty(
+        name='Pipeline',
+        items=[
+            ('FORWARD', 'Forward', 'Shade every object with its material shader as it is drawn', '', 0),
+            ('DEFERRED', 'Deferred', 'Write surfaces to a G-buffer and light them once per pixel. '
+                                     'Transparent materials and shaders without a GBUFFER keyword '
+                                     'are still drawn forward', '', 1),
+        ],
+        default='FORWARD',
+        description='Rendering pipeline used for the viewport and final renders',
+    )
+
+    # Set by SCRATCHPAD_OT_render_animation so that the next final render
+    # of this scene renders the full frame range through an AnimationPipeline
+    animation_requested: BoolProperty(
+        name='Animation Requested',
+        options={'HIDDEN'}
+    )
 
     @classmethod
     def register(cls):
@@ -79,6 +122,20 @@ class ScratchpadMaterialProperties(PropertyGroup):
         description='color picker'
     )
     
+    keywords: StringProperty(
+        name='Keywords',
+        default='',
+        description='Space separated shader keywords to enable for this material. '
+                    'Shaders declare keywords with #pragma multi_compile'
+    )
+
+    prewarm_variants: BoolProperty(
+        name='Prewarm Variants',
+        default=False,
+        description='Compile every keyword variant after the shader compiles, '
+                    'instead of on first use'
+    )
+
     force_reload: BoolProperty(
         name='Force Reload'
     )
@@ -86,6 +143,14 @@ class ScratchpadMaterialProperties(PropertyGroup):
     last_shader_error: StringProperty(
         name='Last Shader Error'
     )
+
+    compile_progress: FloatProperty(
+        name='Compile Progress',
+        default=1.0,
+        min=0.0, max=1.0,
+        subtype='FACTOR',
+        description='Progress of the shader compile running in the background'
+    )
     
     @classmethod
     def register(cls):
@@ -1,13 +1,17 @@
 
 from .lights import (
-    MainLight
+    MainLight,
+    LightTable
 )
 
+from shaders.base import UNIFORM_STATS
+
 class LightData:
     """Current scene lighting information provided to shaders and passes"""
     def __init__(self):
         self.main_light = MainLight() 
-        self.additional_lights = {}
+        self.additional_lights = LightTable()
+        self.ambient_color = (0.15, 0.15, 0.15)
 
 class ShadowData:
     def __init__(self):
@@ -18,14 +22,42 @@ class CameraData:
         self.view_matrix = None
         self.projection_matrix = None 
 
+class FrameStats:
+    """Counters reported by render passes over a single frame"""
+    def __init__(self):
+        self.uniforms = UNIFORM_STATS
+        self.reset()
+
+    def reset(self):
+        self.draw_calls = 0
+        self.program_switches = 0
+        self.texture_switches = 0
+        self.vao_switches = 0
+        self.uniforms.reset()
+
+    def __repr__(self):
+        return '<FrameStats(draw_calls={}, program_switches={}, texture_switches={}, vao_switches={}, uniforms_issued={}, uniforms_skipped={})>'.format(
+            self.draw_calls,
+            self.program_switches,
+            self.texture_switches,
+            self.vao_switches,
+            self.uniforms.issued,
+            self.uniforms.skipped
+        )
+
 class RenderData:
     def __init__(self):
         self.lights = LightData()
         self.shadows = ShadowData()
         self.camera = CameraData()
+        self.stats = FrameStats()
         self.renderables = {}  # ScratchpadMaterial -> Renderable[]  
+        self.structure_version = 0 # Incremented whenever renderables structurally change
+        self.fallback_shader = None # BaseShader used in place of shaders with errors
+        self.scheduler = None # InteractionScheduler limiting mesh uploads per frame
+        self.gbuffer = None # GBuffer written by GBufferPass for the deferred pipeline
     
     def clear(self):
-        self.lights.additional_lights = {}
+        self.lights.additional_lights.clear()
         self.renderables = {}
     
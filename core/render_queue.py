@@ -0,0 +1,205 @@
+
+import numpy as np
+
+class DrawCommand:
+    """A single queued draw of a Renderable with a shader"""
+    __slots__ = ('shader', 'renderable', 'priority', 'textures', 'keywords')
+
+    def __init__(self, shader, renderable, priority: int, textures: tuple, keywords: tuple):
+        self.shader = shader
+        self.renderable = renderable
+        self.priority = priority
+        self.textures = textures
+        self.keywords = keywords
+
+class RenderQueue:
+    """Collects draws for a pass and orders them to minimize GPU state changes.
+
+    Each draw is assigned a 64-bit sort key built from (most significant first):
+
+        Opaque:         priority | program | texture set | VAO | depth (front to back)
+        Transparent:    priority | depth (back to front) | program | texture set | VAO
+
+    Sorting by key groups draws that share GPU state together so that
+    record() can skip redundant program, texture and VAO switches.
+    Transparent draws (priority >= TRANSPARENT_PRIORITY) sort on depth
+    first since their blending depends on draw order.
+
+    Usage:
+        queue = RenderQueue()
+        queue.clear()
+
+        for r in renderables:
+            queue.add(shader, r, priority)
+
+        queue.sort(view_matrix)
+        queue.record(command_buffer)
+    """
+
+    PRIORITY_BITS = 16
+    PROGRAM_BITS = 10
+    TEXTURE_BITS = 10
+    VAO_BITS = 14
+    DEPTH_BITS = 14
+
+    # Same threshold as Unity's Transparent render queue
+    TRANSPARENT_PRIORITY = 3000
+
+    def __init__(self):
+        self.commands = []
+        self.order = []
+        self.has_transparent = False
+
+    def __len__(self):
+        return len(self.commands)
+
+    def clear(self):
+        self.commands = []
+        self.order = []
+        self.has_transparent = False
+
+    def add(self, shader, renderable, priority: int, keywords: tuple = ()):
+        """Queue a renderable to be drawn with the given shader
+
+        Parameters:
+            shader (BaseShader):        Compiled shader to draw with
+            renderable (Renderable):    Geometry to draw
+            priority (int):             Material draw priority. Lowest are drawn first
+            keywords (tuple(str)):      Shader keywords selecting the program variant
+        """
+        self.commands.append(
+            DrawCommand(
+                shader, 
+                renderable, 
+                priority, 
+                shader.get_textures(), 
+                shader.get_variant_key(keywords)
+            )
+        )
+
+    def calculate_depths(self, view_matrix):
+        """Distance from the camera to the origin of every queued renderable
+
+        Parameters:
+            view_matrix (mathutils.Matrix)
+
+        Returns:
+            np.ndarray of shape (len(commands),)
+        """
+        positions = np.array(
+            [c.renderable.model_matrix.translation for c in self.commands],
+            dtype=np.float32
+        ).reshape(-1, 3)
+
+        view = np.array(view_matrix, dtype=np.float32)
+
+        # View space Z points away from what the camera is looking at
+        return -(positions @ view[2, :3] + view[2, 3])
+
+    def sort(self, view_matrix):
+        """Build sort keys for all queued draws and order them for record()
+
+        Parameters:
+            view_matrix (mathutils.Matrix): Camera view matrix for depth sorting
+        """
+        count = len(self.commands)
+        if count < 1:
+            self.order = []
+            return
+
+        # Resource IDs are remapped to small dense indices so that
+        # they fit within their bit ranges in the sort key
+        programs = {}
+        textures = {}
+        vaos = {}
+
+        priority = np.empty(count, dtype=np.uint64)
+        program = np.empty(count, dtype=np.uint64)
+        texture = np.empty(count, dtype=np.uint64)
+        vao = np.empty(count, dtype=np.uint64)
+
+        priority_mask = (1 << self.PRIORITY_BITS) - 1
+        priority_offset = 1 << (self.PRIORITY_BITS - 1)
+
+        for i, c in enumerate(self.commands):
+            priority[i] = min(max(c.priority + priority_offset, 0), priority_mask)
+            # Keyed on the base program since the active variant changes as shaders bind
+            program[i] = programs.setdefault((c.shader.base_program, c.keywords), len(programs))
+            texture[i] = textures.setdefault(c.textures, len(textures))
+            vao[i] = vaos.setdefault(c.renderable.vao.vao_id, len(vaos))
+
+        program &= np.uint64((1 << self.PROGRAM_BITS) - 1)
+        texture &= np.uint64((1 << self.TEXTURE_BITS) - 1)
+        vao &= np.uint64((1 << self.VAO_BITS) - 1)
+
+        # Quantize depth into the range of the current frame's draws
+        depth_max = (1 << self.DEPTH_BITS) - 1
+        depths = self.calculate_depths(view_matrix)
+        near = depths.min()
+        extent = max(float(depths.max() - near), 1e-6)
+        depth = ((depths - near) / extent * depth_max).astype(np.uint64)
+
+        transparent = priority >= np.uint64(self.TRANSPARENT_PRIORITY + priority_offset)
+        back_to_front = np.uint64(depth_max) - depth
+
+        u = np.uint64
+        state = (
+            (program << u(self.TEXTURE_BITS + self.VAO_BITS)) |
+            (texture << u(self.VAO_BITS)) |
+            vao
+        )
+        state_bits = self.PROGRAM_BITS + self.TEXTURE_BITS + self.VAO_BITS
+
+        opaque_keys = (
+            (priority << u(64 - self.PRIORITY_BITS)) |
+            (state << u(self.DEPTH_BITS)) |
+            depth
+        )
+        transparent_keys = (
+            (priority << u(64 - self.PRIORITY_BITS)) |
+            (back_to_front << u(state_bits)) |
+            state
+        )
+
+        self.has_transparent = bool(transparent.any())
+        keys = np.where(transparent, transparent_keys, opaque_keys)
+        self.order = np.argsort(keys, kind='stable').tolist()
+
+    def record(self, buffer):
+        """Record draws in sorted order into a CommandBuffer, skipping redundant state changes
+
+        Parameters:
+            buffer (CommandBuffer): Buffer to append commands to
+        """
+        current_program = None
+        current_keywords = None
+        current_textures = None
+        current_vao = None
+
+        for i in self.order:
+            c = self.commands[i]
+            shader = c.shader
+            renderable = c.renderable
+            vao = renderable.vao
+
+            # Each keyword variant is a separate program
+            program_changed = shader.base_program != current_program or c.keywords != current_keywords
+            if program_changed:
+                buffer.bind_program(shader, c.keywords)
+                buffer.set_uniform_block(buffer.BLOCK_CAMERA)
+                buffer.set_uniform_block(buffer.BLOCK_LIGHTING)
+                current_program = shader.base_program
+                current_keywords = c.keywords
+
+            # Texture units are global state, but sampler uniforms are per-program
+            textures_changed = c.textures != current_textures
+            if textures_changed or program_changed:
+                buffer.set_uniform_block(buffer.BLOCK_TEXTURES, int(textures_changed))
+                current_textures = c.textures
+
+            if vao is not current_vao:
+                buffer.bind_vao(vao)
+                current_vao = vao
+
+            buffer.set_uniform_block(buffer.BLOCK_OBJECT, buffer.add_object(renderable))
+            buffer.draw_range(0, vao.total_indices)
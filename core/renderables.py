@@ -1,8 +1,9 @@
 
 import bpy
+from time import perf_counter
 from bgl import *
 
-from .mesh_data import MeshData
+from .mesh_data import MeshData, get_loop_positions
 from libs.debug import init_log, log, op_log, debug, IS_DEBUG
 from .vao import (
     VAO,
@@ -14,8 +15,15 @@ class ScratchpadMaterial:
     def __init__(self):
         self.material = None # bpy.types.Material
         self.shader = None # BaseShader impl
+        self.keywords = () # Shader keywords enabled for this material
 
 class Renderable:
+    def prepare(self, shader, scheduler=None):
+        pass
+
+    def draw_elements(self, shader):
+        pass
+
     def draw(self, shader):
         pass
 
@@ -38,6 +46,15 @@ class ScratchpadMesh(Renderable):
     total_indices: int 
     total_vertices: int 
 
+    # Is the mesh being continuously edited, and should rebuild at reduced quality
+    is_interactive: bool
+
+    # perf_counter() time of the last GPU upload
+    last_rebuild: float
+
+    # (vertices, loops, polygons) counts of the last full rebuild
+    topology: tuple
+
     def __repr__(self):
         return '<ScratchpadMesh(name={}) at {}>'.format(
             self.obj.name if self.obj else '',
@@ -46,6 +63,9 @@ class ScratchpadMesh(Renderable):
 
     def __init__(self):
         self.is_backbuffer_ready = False
+        self.is_interactive = False
+        self.last_rebuild = 0.0
+        self.topology = None
         self.vao = VAO()
         self.vao_backbuffer = VAO()
 
@@ -53,11 +73,13 @@ class ScratchpadMesh(Renderable):
         self.obj = obj
         self.model_matrix = obj.matrix_world
 
-    def rebuild(self, eval_obj):
+    def rebuild(self, eval_obj, interactive: bool = False):
         """Prepare the mesh to be copied to the GPU the next time the render thread executes.
 
         Parameters:
-            eval_obj (bpy.types.Object): Object to convert to a temp `bpy.types.Mesh`
+            eval_obj (bpy.types.Object):    Object to convert to a temp `bpy.types.Mesh`
+            interactive (bool):             Rebuild only what's needed while the mesh is 
+                                            being continuously edited
         """
         init_log('Rebuild Mesh')
 
@@ -80,6 +102,7 @@ class ScratchpadMesh(Renderable):
         # this is the same as self.obj ?
         self.eval_obj = eval_obj 
         # self.eval_mesh = mesh 
+        self.is_interactive = interactive
         self.is_backbuffer_ready = True
 
     def rebuild_on_render(self, shader):
@@ -126,6 +149,10 @@ class ScratchpadMesh(Renderable):
         vao.upload(shader.program)
         op_log('Total VAO write time')
 
+        # Buffers are per vertex rather than per loop, so the next
+        # interactive rebuild can't update positions alone
+        self.topology = None
+
         # Cleanup
         self.eval_obj.to_mesh_clear()
         # mesh_owner.to_mesh_clear()
@@ -136,6 +163,12 @@ class ScratchpadMesh(Renderable):
 
         This unsafe version uses direct C struct access to fetch data.
 
+        While interactive, only positions are read and uploaded if the 
+        topology is unchanged. The mesh isn't triangulated and normals and 
+        UV layers are left as-is until the mesh settles and gets a full 
+        rebuild. A topology change always rebuilds every buffer, since 
+        stale attributes would no longer line up.
+
         Parameters:
             shader (BaseShader): Shader program that houses the VAO target
         """
@@ -157,6 +190,18 @@ class ScratchpadMesh(Renderable):
         mesh = self.eval_obj.to_mesh()
         log('to_mesh() from {}'.format(id(self.eval_obj)))
 
+        topology = (len(mesh.vertices), len(mesh.loops), len(mesh.polygons))
+        if self.is_interactive and topology == self.topology:
+            co = vao.get_vertex_buffer(VertexBuffer.POSITION)
+            co.set_data(get_loop_positions(mesh))
+            log('Upload co')
+
+            vao.upload(shader.program, (VertexBuffer.POSITION,))
+            op_log('Total VAO write time (positions only)')
+
+            self.eval_obj.to_mesh_clear()
+            return
+
         mesh.calc_loop_triangles()
         log('calc_loop_triangles()')
 
@@ -194,6 +239,7 @@ class ScratchpadMesh(Renderable):
         # Upload buffers to the GPU
         vao.upload(shader.program)
         op_log('Total VAO write time')
+        self.topology = topology
 
         # Cleanup
         self.eval_obj.to_mesh_clear()
@@ -201,14 +247,26 @@ class ScratchpadMesh(Renderable):
         op_log('Total Cleanup time')
 
 
-    def draw(self, shader):
-        debug('Draw', self)
+    def prepare(self, shader, scheduler=None):
+        """Upload any pending geometry before this mesh is drawn with the shader
 
+        Parameters:
+            shader (BaseShader):                Shader program that houses the VAO target
+            scheduler (InteractionScheduler):   Optional limiter for when uploads may happen.
+                                                Deferred meshes keep drawing their current VAO
+        """
         # Swap backbuffer with the active VAO 
         if self.is_backbuffer_ready:
+            if scheduler and not scheduler.can_rebuild(self):
+                return
+
+            start = perf_counter()
             self.is_backbuffer_ready = False
             self.rebuild_on_render_unsafe(shader)
 
+            if scheduler:
+                scheduler.spend(self, perf_counter() - start)
+
             # TODO: Backbuffer swap is unnecessary here (since we're
             # creating and filling and immediately swapping in one whole step)
             # but eventually I'd like to slowly fill the backbuffer over multiple
@@ -221,28 +279,41 @@ class ScratchpadMesh(Renderable):
             # self.vao_backbuffer = vao
             # print('Done with swap')
 
-        vao = self.vao
-        debug('Bind {}'.format(vao))
+    def draw_elements(self, shader):
+        """Issue the draw call for this mesh. 
+        
+        Assumes that the shader and this mesh's VAO are already bound.
 
-        vao.bind(shader.program)
+        Parameters:
+            shader (BaseShader): Bound shader to set per-object uniforms on
+        """
+        vao = self.vao
 
         shader.set_object_matrices(self.model_matrix)
 
-        # TODO: Texture stuff
-
         if not IS_DEBUG:
             # No validation check, assume stable
-            glDrawElements(GL_TRIANGLES, self.vao.total_indices, GL_UNSIGNED_INT, 0)
+            glDrawElements(GL_TRIANGLES, vao.total_indices, GL_UNSIGNED_INT, 0)
         else:
             debug_print_current_gl_bindings()
 
             if vao.is_valid():
-                glDrawElements(GL_TRIANGLES, self.vao.total_indices, GL_UNSIGNED_INT, 0)
+                glDrawElements(GL_TRIANGLES, vao.total_indices, GL_UNSIGNED_INT, 0)
             else:
                 debug('Invalid state for glDrawElements. Current bindings:')
                 debug_print_current_gl_bindings()
                 debug('\tBound VAO: {}'.format(vao))
 
+    def draw(self, shader):
+        debug('Draw', self)
+
+        self.prepare(shader)
+
+        vao = self.vao
+        debug('Bind {}'.format(vao))
+
+        vao.bind(shader.program)
+        self.draw_elements(shader)
         vao.unbind()
         debug('Done')
 
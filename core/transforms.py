@@ -0,0 +1,70 @@
+
+import numpy as np
+from bgl import *
+
+class ObjectTransforms:
+    """Per-frame transform stage for every object drawn by a CommandBuffer.
+
+    Model matrices are packed into a single (N, 4, 4) array and ModelView
+    and ModelViewProjection are computed for all objects with one batched
+    matmul. Results are stored pre-transposed (column major, as GL expects)
+    in a bgl.Buffer sharing memory with Numpy, so each draw can upload its
+    matrices straight from a slice without any conversions.
+
+    Usage:
+        transforms = ObjectTransforms()
+        transforms.update(renderables, view_matrix, projection_matrix)
+
+        # Per draw
+        shader.set_object_matrix_buffer(transforms.buffer[i])
+    """
+
+    # Matrices stored per object, in order
+    MODEL = 0
+    MODEL_VIEW = 1
+    MODEL_VIEW_PROJECTION = 2
+
+    def __init__(self):
+        self.count = 0
+        self.data = np.empty((0, 3, 16), dtype=np.float32)
+        self.buffer = None
+
+    def resize(self, count: int):
+        """Reallocate storage for `count` objects, if the count changed"""
+        if count == self.count and self.buffer is not None:
+            return
+
+        self.count = count
+        self.data = np.empty((count, 3, 16), dtype=np.float32)
+
+        # bgl only wraps arrays of exactly the same shape, so matrices
+        # are stored flattened. Indexing a multidimensional bgl.Buffer
+        # returns a view into its memory, so buffer[i] is the (3, 16)
+        # matrices of object i
+        self.buffer = Buffer(GL_FLOAT, [count, 3, 16], self.data) if count else None
+
+    def update(self, renderables: list, view_matrix, projection_matrix):
+        """Compute matrices for all renderables from their current model matrix
+
+        Parameters:
+            renderables (list(Renderable))
+            view_matrix (mathutils.Matrix)
+            projection_matrix (mathutils.Matrix)
+        """
+        count = len(renderables)
+        self.resize(count)
+        if count < 1:
+            return
+
+        models = np.array([r.model_matrix for r in renderables], dtype=np.float32)
+        view = np.array(view_matrix, dtype=np.float32)
+        projection = np.array(projection_matrix, dtype=np.float32)
+
+        model_view = np.matmul(view, models)
+        model_view_projection = np.matmul(projection, model_view)
+
+        # Transpose in place into column major order for glUniformMatrix4fv
+        data = self.data.reshape(count, 3, 4, 4)
+        data[:, self.MODEL] = models.transpose(0, 2, 1)
+        data[:, self.MODEL_VIEW] = model_view.transpose(0, 2, 1)
+        data[:, self.MODEL_VIEW_PROJECTION] = model_view_projection.transpose(0, 2, 1)
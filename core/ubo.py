@@ -0,0 +1,161 @@
+
+import numpy as np
+from bgl import *
+
+from shaders.base import UNIFORM_BLOCK_BINDINGS
+
+class UniformBuffer:
+    """Management for a single std140 UBO bound to a fixed binding point.
+
+    Data is staged in a Numpy array shared with a bgl.Buffer so that
+    it can be filled with vectorized writes and uploaded without copying.
+    Programs are connected to the same binding point by BaseShader
+    after linking, so the buffer only needs to be uploaded once per frame.
+    """
+    def __init__(self, block: str, size: int):
+        """Create a new UniformBuffer
+
+        Parameters:
+            block (str):    Uniform block name, one of `UNIFORM_BLOCK_BINDINGS`
+            size (int):     Number of 4 byte components in the block
+        """
+        self.block = block
+        self.binding = UNIFORM_BLOCK_BINDINGS[block]
+        self.size = size
+
+        self.data = np.zeros(size, dtype=np.float32)
+        self.buffer = Buffer(GL_FLOAT, size, self.data)
+
+        # Integer view into the same memory for int/bool members
+        self.data_int = self.data.view(np.int32)
+
+        buf = Buffer(GL_INT, 1)
+        glGenBuffers(1, buf)
+        self.ubo_id = buf[0]
+
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo_id)
+        glBufferData(GL_UNIFORM_BUFFER, size * 4, self.buffer, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def __repr__(self):
+        return '<UniformBuffer(block={}, binding={}, ubo_id={}) object at {}>'.format(
+            self.block,
+            self.binding,
+            self.ubo_id,
+            id(self)
+        )
+
+    def upload(self):
+        """Copy staged data to the GPU and bind to the block's binding point"""
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo_id)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, self.size * 4, self.buffer)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+        glBindBufferBase(GL_UNIFORM_BUFFER, self.binding, self.ubo_id)
+
+    def destroy(self):
+        glDeleteBuffers(1, Buffer(GL_INT, 1, [self.ubo_id]))
+
+class CameraUniformBuffer(UniformBuffer):
+    """UBO matching the std140 layout of:
+
+        layout(std140) uniform CameraData {
+            mat4 ViewMatrix;
+            mat4 ProjectionMatrix;
+            mat4 CameraMatrix;
+        };
+    """
+    def __init__(self):
+        super(CameraUniformBuffer, self).__init__('CameraData', 16 * 3)
+
+    def update(self, camera):
+        """
+        Parameters:
+            camera (CameraData)
+        """
+        view = np.array(camera.view_matrix, dtype=np.float32)
+        projection = np.array(camera.projection_matrix, dtype=np.float32)
+
+        # GLSL matrices are column major, so each is stored transposed
+        data = self.data.reshape(3, 4, 4)
+        data[0] = view.T
+        data[1] = projection.T
+        data[2] = np.linalg.inv(view).T
+
+        self.upload()
+
+class LightUniformBuffer(UniformBuffer):
+    """UBO matching the std140 layout of:
+
+        layout(std140) uniform LightData {
+            vec4 _MainLightDirection;
+            vec4 _MainLightColor;
+            vec3 _AmbientColor;
+            int _AdditionalLightsCount;
+            vec4 _AdditionalLightsPosition[MAX_ADDITIONAL_LIGHTS];
+            vec4 _AdditionalLightsColor[MAX_ADDITIONAL_LIGHTS];
+            vec4 _AdditionalLightsSpotDir[MAX_ADDITIONAL_LIGHTS];
+            vec4 _AdditionalLightsAttenuation[MAX_ADDITIONAL_LIGHTS];
+            vec4 _ClusterGridSize;
+            vec4 _ClusterDepthParams;
+            vec4 _ClusterViewport;
+        };
+
+    The fixed size arrays only hold the first MAX_ADDITIONAL_LIGHTS lights
+    for shaders that don't support clustered lighting. The cluster members
+    describe the grid used to look up every light through LightClusters.
+    """
+
+    # Must match the array sizes in the GLSL block
+    MAX_ADDITIONAL_LIGHTS = 16
+
+    # Component offsets of each member
+    MAIN_LIGHT_DIRECTION = 0
+    MAIN_LIGHT_COLOR = 4
+    AMBIENT_COLOR = 8
+    ADDITIONAL_LIGHTS_COUNT = 11
+    ADDITIONAL_LIGHTS = 12
+    CLUSTER_GRID_SIZE = ADDITIONAL_LIGHTS + MAX_ADDITIONAL_LIGHTS * 4 * 4
+    CLUSTER_DEPTH_PARAMS = CLUSTER_GRID_SIZE + 4
+    CLUSTER_VIEWPORT = CLUSTER_DEPTH_PARAMS + 4
+
+    def __init__(self):
+        super(LightUniformBuffer, self).__init__(
+            'LightData',
+            self.CLUSTER_VIEWPORT + 4
+        )
+
+    def update(self, lighting, clusters = None):
+        """
+        Parameters:
+            lighting (LightData)
+            clusters (LightClusters): Light assignment for the current frame, if any
+        """
+        data = self.data
+        limit = self.MAX_ADDITIONAL_LIGHTS
+
+        main_light = lighting.main_light
+        data[0:4] = main_light.direction
+        data[4:8] = main_light.color
+        data[8:11] = lighting.ambient_color[:3]
+
+        table = lighting.additional_lights
+        count = min(table.count, limit)
+        self.data_int[self.ADDITIONAL_LIGHTS_COUNT] = count
+
+        # Position, color, spot direction, attenuation arrays back to back
+        arrays = data[self.ADDITIONAL_LIGHTS:].reshape(4, limit, 4)
+        arrays[:, count:] = 0
+        arrays[0, :count] = table.positions[:count]
+        arrays[1, :count] = table.colors[:count]
+        arrays[2, :count] = table.directions[:count]
+        arrays[3, :count] = table.attenuations[:count]
+
+        if clusters is not None:
+            offset = self.CLUSTER_GRID_SIZE
+            data[offset:offset + 3] = clusters.GRID
+            data[offset + 3] = table.count
+            data[self.CLUSTER_DEPTH_PARAMS:self.CLUSTER_DEPTH_PARAMS + 4] = clusters.get_depth_params()
+            data[self.CLUSTER_VIEWPORT:self.CLUSTER_VIEWPORT + 4] = clusters.viewport
+
+        self.upload()
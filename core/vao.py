@@ -2,6 +2,8 @@
 import numpy as np 
 from bgl import *
 
+from shaders.base import ATTRIBUTE_LOCATIONS
+
 class VertexBuffer:
     """Management for a single VBO.
 
@@ -33,7 +35,8 @@ class VertexBuffer:
         """Create a new VertexBuffer
 
         Parameters:
-            attr (str): Attribute name to use while binding to a program.
+            attr (str): Attribute name, bound to the same location in every
+                        program through ATTRIBUTE_LOCATIONS.
                         Use one of the enums, e.g. `VertexBuffer.NORMAL`
         """
         self.attr = attr # Attribute name
@@ -104,13 +107,16 @@ class VertexBuffer:
         self.components = arr.shape[1]
         self.buffer = Buffer(GL_FLOAT, self.components * self.count, self._data)
 
-    def upload(self, program):
+    def upload(self):
         size_in_bytes = self.components * self.count * 4
 
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo_id)
         glBufferData(GL_ARRAY_BUFFER, size_in_bytes, self.buffer, GL_STATIC_DRAW)
         
-        location = glGetAttribLocation(program, self.attr)
+        # Fixed rather than looked up from a program, so that the VAO
+        # can be drawn by any program - including ones that don't use
+        # every attribute of the material's own shader
+        location = ATTRIBUTE_LOCATIONS[self.attr]
         glVertexAttribPointer(location, self.components, GL_FLOAT, GL_FALSE, 0, 0)
         glEnableVertexAttribArray(location)
 
@@ -250,13 +256,25 @@ class VAO:
     #     for buf in self.vertex_buffers.values():
     #         buf.destroy()
 
-    def upload(self, program):
+    def upload(self, program, attrs: tuple = None):
+        """Copy buffer data to the GPU
+
+        Parameters:
+            program (int):  Shader program the VAO is bound for
+            attrs (tuple):  Vertex buffer attributes to upload. If set, only those 
+                            buffers are uploaded and the index buffer is left as-is
+        """
         self.bind(program)
         
-        for buf in self.vertex_buffers.values():
-            buf.upload(program)
-        
-        self.index_buffer.upload(program)
+        if attrs is not None:
+            for attr in attrs:
+                self.vertex_buffers[attr].upload()
+        else:
+            for buf in self.vertex_buffers.values():
+                buf.upload()
+            
+            self.index_buffer.upload(program)
+
         self.unbind()
 
     def bind(self, program):
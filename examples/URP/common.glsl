@@ -1,13 +1,17 @@
 
 #pragma once
 
-// Transformation matrices
+// Per-camera matrices, shared by all programs
+layout(std140) uniform CameraData {
+    mat4 ViewMatrix;
+    mat4 ProjectionMatrix;
+    mat4 CameraMatrix;
+};
+
+// Per-object transformation matrices
 uniform mat4 ModelMatrix;
-uniform mat4 ViewMatrix;
 uniform mat4 ModelViewMatrix;
-uniform mat4 ProjectionMatrix;
 uniform mat4 ModelViewProjectionMatrix;
-uniform mat4 CameraMatrix;
 
 // Scene information
 uniform int _Frame;
@@ -3,17 +3,39 @@
 
 #include "common.glsl"
 
-// Main directional light
-uniform vec4 _MainLightDirection;
-uniform vec4 _MainLightColor;
-uniform vec3 _AmbientColor;
-
-// Additional lights
-uniform int _AdditionalLightsCount;
-uniform vec4[16] _AdditionalLightsPosition; // (Light.matrix_world.to_translation(), 1|0)
-uniform vec4[16] _AdditionalLightsColor; // (Light.color, intensity)
-uniform vec4[16] _AdditionalLightsSpotDir; // (Light.matrix_world.to_quaternion() @ Vector((0, 1, 0)), 0)
-uniform vec4[16] _AdditionalLightsAttenuation; // (magic, 2.8, 0, 1)
+#define MAX_ADDITIONAL_LIGHTS 16
+
+// Scene lighting, shared by all programs
+layout(std140) uniform LightData {
+    // Main directional light
+    vec4 _MainLightDirection;
+    vec4 _MainLightColor;
+    vec3 _AmbientColor;
+
+    // Additional lights
+    int _AdditionalLightsCount;
+    vec4 _AdditionalLightsPosition[MAX_ADDITIONAL_LIGHTS]; // (Light.matrix_world.to_translation(), 1|0)
+    vec4 _AdditionalLightsColor[MAX_ADDITIONAL_LIGHTS]; // (Light.color, intensity)
+    vec4 _AdditionalLightsSpotDir[MAX_ADDITIONAL_LIGHTS]; // (Light.matrix_world.to_quaternion() @ Vector((0, 1, 0)), 0)
+    vec4 _AdditionalLightsAttenuation[MAX_ADDITIONAL_LIGHTS]; // (magic, 2.8, 0, 1)
+
+    // Clustered lighting, for any number of additional lights
+    vec4 _ClusterGridSize; // (clusters x, y, z, total lights)
+    vec4 _ClusterDepthParams; // (near, far, scale, bias) to map log(depth) to a slice
+    vec4 _ClusterViewport; // (x, y, width, height)
+};
+
+// Per-cluster (offset, count) into _ClusterLightIndices.
+// Clusters are stored at (x + y * _ClusterGridSize.x, z)
+uniform isampler2D _ClusterGrid;
+
+// Light rows grouped by cluster, 1024 per texture row
+uniform isampler2D _ClusterLightIndices;
+
+// 4 texels per light row: position, color, spot direction, attenuation
+uniform sampler2D _ClusterLightData;
+
+#define CLUSTER_INDEX_WIDTH 1024
 
 struct Light {
     vec3 position;
@@ -83,12 +105,8 @@ int GetAdditionalLightsCount()
     return _AdditionalLightsCount;
 }
 
-Light GetAdditionalLight(int i, vec3 positionWS) 
+Light GetAdditionalLight(vec4 lightPositionWS, vec4 lightColor, vec4 spotDirection, vec4 distanceAndSpotAttenuation, vec3 positionWS)
 {
-    vec4 lightPositionWS = _AdditionalLightsPosition[i];
-    vec4 distanceAndSpotAttenuation = _AdditionalLightsAttenuation[i]; 
-    vec4 spotDirection = _AdditionalLightsSpotDir[i];
-
     /*
         Seems to be:
         color.multiply by intensity (linear or not)
@@ -100,7 +118,7 @@ Light GetAdditionalLight(int i, vec3 positionWS)
     */
 
     // Via: https://github.com/zhanmengao/Main/blob/dd0975a921154b1f943ddafbc335cab1f155cab5/%E5%A4%96%E9%83%A8%E5%BA%93%E6%BA%90%E7%A0%81/UnityCsEdit/UnityCsEdit/UnityCsReference-master/Runtime/Export/GI/Lightmapping.cs#L93
-    vec3 color = pow(_AdditionalLightsColor[i].rgb, vec3(2.2)) * _AdditionalLightsColor[i].w;
+    vec3 color = pow(lightColor.rgb, vec3(2.2)) * lightColor.w;
     // float mcc_rcp = 1.0 / max(color.r, max(color.g, color.b));
     // color = color * mcc_rcp; 
     
@@ -127,6 +145,57 @@ Light GetAdditionalLight(int i, vec3 positionWS)
     return light;
 }
 
+/**
+ * Additional light from the fixed size arrays, limited to MAX_ADDITIONAL_LIGHTS
+ */
+Light GetAdditionalLight(int i, vec3 positionWS) 
+{
+    return GetAdditionalLight(
+        _AdditionalLightsPosition[i],
+        _AdditionalLightsColor[i],
+        _AdditionalLightsSpotDir[i],
+        _AdditionalLightsAttenuation[i],
+        positionWS
+    );
+}
+
+/**
+ * Range of _ClusterLightIndices that affect a fragment, as (offset, count)
+ */
+ivec2 GetClusterLightRange(vec4 fragCoord, vec3 positionWS)
+{
+    vec3 positionVS = (ViewMatrix * vec4(positionWS, 1.0)).xyz;
+    float depth = max(-positionVS.z, _ClusterDepthParams.x);
+
+    ivec3 gridSize = ivec3(_ClusterGridSize.xyz);
+    vec2 uv = (fragCoord.xy - _ClusterViewport.xy) / _ClusterViewport.zw;
+
+    ivec3 cluster = ivec3(
+        int(uv.x * _ClusterGridSize.x),
+        int(uv.y * _ClusterGridSize.y),
+        int(log(depth) * _ClusterDepthParams.z + _ClusterDepthParams.w)
+    );
+    cluster = clamp(cluster, ivec3(0), gridSize - 1);
+
+    return texelFetch(_ClusterGrid, ivec2(cluster.x + cluster.y * gridSize.x, cluster.z), 0).rg;
+}
+
+/**
+ * Additional light referenced by the n-th entry of a cluster's light list
+ */
+Light GetClusterLight(int n, vec3 positionWS)
+{
+    int row = texelFetch(_ClusterLightIndices, ivec2(n % CLUSTER_INDEX_WIDTH, n / CLUSTER_INDEX_WIDTH), 0).r;
+
+    return GetAdditionalLight(
+        texelFetch(_ClusterLightData, ivec2(0, row), 0),
+        texelFetch(_ClusterLightData, ivec2(1, row), 0),
+        texelFetch(_ClusterLightData, ivec2(2, row), 0),
+        texelFetch(_ClusterLightData, ivec2(3, row), 0),
+        positionWS
+    );
+}
+
 /**
  * Simple/cheap vertex lighting 
  */
@@ -153,10 +222,10 @@ vec4 LightweightFragmentBlinnPhong(vec3 positionWS, vec3 normalWS, vec3 viewDire
     vec3 diffuseColor = LightingLambert(attenuatedLightColor, mainLight.direction, normalWS);
     vec3 specularColor = LightingSpecular(attenuatedLightColor, mainLight.direction, normalWS, viewDirectionWS, specularGloss, shininess);
 
-    int pixelLightCount = GetAdditionalLightsCount();
-    for (int i = 0; i < pixelLightCount; ++i)
+    ivec2 range = GetClusterLightRange(gl_FragCoord, positionWS);
+    for (int i = range.x; i < range.x + range.y; ++i)
     {
-        Light light = GetAdditionalLight(i, positionWS);
+        Light light = GetClusterLight(i, positionWS);
         vec3 attenuatedLightColor = light.color * light.distanceAttenuation;
         diffuseColor += LightingLambert(attenuatedLightColor, light.direction, normalWS);
         specularColor += LightingSpecular(attenuatedLightColor, light.direction, normalWS, viewDirectionWS, specularGloss, shininess);
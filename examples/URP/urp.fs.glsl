@@ -17,10 +17,11 @@ void main()
     vec3 diffuseColor = LightingLambert(attenuatedLightColor, mainLight.direction, IN.normalWS);
     // vec3 specularColor = LightingSpecular(attenuatedLightColor, mainLight.direction, normalWS, viewDirectionWS, specularGloss, shininess);
 
-    int pixelLightCount = GetAdditionalLightsCount();
-    for (int i = 0; i < pixelLightCount; ++i)
+    // Only the lights in this fragment's cluster can reach it
+    ivec2 range = GetClusterLightRange(gl_FragCoord, IN.positionWS);
+    for (int i = range.x; i < range.x + range.y; ++i)
     {
-        Light light = GetAdditionalLight(i, IN.positionWS);
+        Light light = GetClusterLight(i, IN.positionWS);
         vec3 attenuatedLightColor = light.color * light.distanceAttenuation;
         diffuseColor += LightingLambert(attenuatedLightColor, light.direction, IN.normalWS);
         // specularColor += LightingSpecular(attenuatedLightColor, light.direction, normalWS, viewDirectionWS, specularGloss, shininess);
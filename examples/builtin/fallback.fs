@@ -1,5 +1,9 @@
 
-uniform mat4 CameraMatrix;
+layout(std140) uniform CameraData {
+    mat4 ViewMatrix;
+    mat4 ProjectionMatrix;
+    mat4 CameraMatrix;
+};
 
 layout (location = 0) out vec4 FragColor;
 
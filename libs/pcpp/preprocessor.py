@@ -372,6 +372,22 @@ class FileInclusionTime(object):
         self.depth = depth
         self.elapsed = 0.0
 
+# ------------------------------------------------------------------
+# default_lexer()
+#
+# Building a lexer reflects over this module and compiles its master regex,
+# so it's done once and cloned for every Preprocessor
+# ------------------------------------------------------------------
+
+_default_lexer = None
+
+def default_lexer():
+    """Return a clone of the shared lexer for the rules in this module"""
+    global _default_lexer
+    if _default_lexer is None:
+        _default_lexer = lex.lex()
+    return _default_lexer.clone()
+
 # ------------------------------------------------------------------
 # Preprocessor object
 #
@@ -383,7 +399,7 @@ class Preprocessor(PreprocessorHooks):
     def __init__(self,lexer=None):
         super(Preprocessor, self).__init__()
         if lexer is None:
-            lexer = lex.lex()
+            lexer = default_lexer()
         self.lexer = lexer
         self.macros = { }
         self.path = []           # list of -I formal search paths for includes
@@ -873,10 +889,8 @@ class Preprocessor(PreprocessorHooks):
 
     def expand_macros(self,tokens,expanding_from=[]):
         """Given a list of tokens, this function performs macro expansion."""
-        # Each token needs to track from which macros it has been expanded from to prevent recursion
-        for tok in tokens:
-            if not hasattr(tok, 'expanded_from'):
-                tok.expanded_from = []
+        # Each token tracks from which macros it has been expanded from to prevent recursion.
+        # This is an immutable tuple, so copies of a token never share changes to it
         i = 0
         #print "*** EXPAND MACROS in", "".join([t.value for t in tokens]), "expanding_from=", expanding_from
         #print tokens
@@ -898,9 +912,7 @@ class Preprocessor(PreprocessorHooks):
                         for e in ex:
                             e.source = t.source
                             e.lineno = t.lineno
-                            if not hasattr(e, 'expanded_from'):
-                                e.expanded_from = []
-                            e.expanded_from.append(t.value)
+                            e.expanded_from = e.expanded_from + (t.value,)
                         tokens[i:i+1] = ex
                     else:
                         # A macro with arguments
@@ -945,9 +957,7 @@ class Preprocessor(PreprocessorHooks):
                                 for e in ex:
                                     e.source = t.source
                                     e.lineno = t.lineno
-                                    if not hasattr(e, 'expanded_from'):
-                                        e.expanded_from = []
-                                    e.expanded_from.append(t.value)
+                                    e.expanded_from = e.expanded_from + (t.value,)
                                 # A non-conforming extension implemented by the GCC and clang preprocessors
                                 # is that an expansion of a macro with arguments where the following token is
                                 # an identifier inserts a space between the expansion and the identifier. This
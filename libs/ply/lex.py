@@ -54,10 +54,37 @@ class LexError(Exception):
         self.text = s
 
 # Token class.  This class is used to represent the tokens produced.
+#
+# Slots keep each token small, as preprocessors create and copy them by
+# the hundred thousand. `source` and `expanded_from` are set by pcpp.
 class LexToken(object):
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer', 'source', 'expanded_from')
+
+    def __init__(self):
+        self.source = None
+        self.expanded_from = ()
+
+    def __copy__(self):
+        # `lexer` is left unset, the same as on most tokens token() returns
+        # since it's deleted once a rule function returns. Rule and error
+        # functions are only ever handed the token token() just created,
+        # never a copy, and yacc re-attaches the lexer to any token passed
+        # to p_error() without one. Copying it would mean a try/except on
+        # every copy, as unset slots raise AttributeError.
+        tok = _new_token(LexToken)
+        tok.type = self.type
+        tok.value = self.value
+        tok.lineno = self.lineno
+        tok.lexpos = self.lexpos
+        tok.source = self.source
+        tok.expanded_from = self.expanded_from
+        return tok
+
     def __repr__(self):
         return f'LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})'
 
+_new_token = object.__new__
+
 # This object is a stand-in for a logging object created by the
 # logging module.
 
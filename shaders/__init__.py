@@ -1,13 +1,19 @@
 
 if 'bpy' in locals():
     import importlib
+    importlib.reload(watcher)
+    importlib.reload(textures)
     importlib.reload(base)
     importlib.reload(fallback)
+    importlib.reload(deferred)
     importlib.reload(glsl)
     importlib.reload(ogsfx)
 else:
+    from . import watcher
+    from . import textures
     from . import base
     from . import fallback 
+    from . import deferred
     from . import glsl 
     from . import ogsfx
 
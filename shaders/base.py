@@ -1,9 +1,67 @@
 
 import os
+import re
 import json
+import itertools
 import numpy as np
+from collections import OrderedDict
 from bgl import *
 
+from .program_cache import ProgramCache
+from .watcher import FILE_WATCHER
+from .textures import TEXTURE_MANAGER, DEFAULT_SAMPLER
+
+# Fixed binding points for uniform blocks shared by every program.
+# Set with glUniformBlockBinding after linking since `layout(binding = N)`
+# requires GLSL 4.20
+UNIFORM_BLOCK_BINDINGS = {
+    'CameraData': 0,
+    'LightData': 1,
+}
+
+# Fixed texture units for samplers shared by every program, set once after
+# linking for the same reason. Kept at the top of the 16 units guaranteed by
+# GL 3.3 so they don't collide with material textures bound from unit 0.
+SHARED_SAMPLER_UNITS = {
+    '_ClusterGrid': 13,
+    '_ClusterLightIndices': 14,
+    '_ClusterLightData': 15,
+}
+
+# Fixed vertex attribute locations bound before linking every program.
+# VAOs record attribute pointers against these, so the same mesh buffers 
+# can be drawn by any program (e.g. a material shader and the GBuffer pass)
+ATTRIBUTE_LOCATIONS = {
+    'Position': 0,
+    'Normal': 1,
+    'Texcoord0': 2,
+    'Texcoord1': 3,
+    'Texcoord2': 4,
+    'Texcoord3': 5,
+    'Texcoord4': 6,
+    'Texcoord5': 7,
+    'Texcoord6': 8,
+    'Texcoord7': 9,
+}
+
+class UniformStats:
+    """Counters for uniform writes across all shaders"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.issued = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return '<UniformStats(issued={}, skipped={})>'.format(self.issued, self.skipped)
+
+# Shared by every BaseShader. Reset once per frame by the engine
+UNIFORM_STATS = UniformStats()
+
+# Linked program binaries persisted across sessions and reloads
+PROGRAM_CACHE = ProgramCache()
+
 class CompileError(Exception):
     pass
 
@@ -78,17 +136,60 @@ class ShaderProperties:
         # TODO: Should this also perform UPLOAD for the shader (textures, etc)
         # I would assume so, right? 
 
-def compile_glsl(src: str, stage_flag: int) -> int:
-    shader = glCreateShader(stage_flag)
-    glShaderSource(shader, src)
-    glCompileShader(shader)
+# GL_KHR_parallel_shader_compile, not exported by bgl
+GL_COMPLETION_STATUS_KHR = 0x91B1
+
+# Whether the driver accepts GL_COMPLETION_STATUS_KHR queries. Detected on first use
+PARALLEL_COMPILE_SUPPORTED = None
+
+def is_parallel_compile_supported(program: int) -> bool:
+    """Check if completion of a submitted program can be polled without blocking
 
-    # Check for compile errors
+    Parameters:
+        program (int): Any GL program to query against
+    """
+    global PARALLEL_COMPILE_SUPPORTED
+
+    if PARALLEL_COMPILE_SUPPORTED is None:
+        # Unsupported drivers flag the unknown enum as an error
+        while glGetError() != GL_NO_ERROR:
+            pass
+
+        status = Buffer(GL_INT, 1)
+        glGetProgramiv(program, GL_COMPLETION_STATUS_KHR, status)
+        PARALLEL_COMPILE_SUPPORTED = glGetError() == GL_NO_ERROR
+
+    return PARALLEL_COMPILE_SUPPORTED
+
+STAGE_NAMES = {
+    'vs': 'Vertex',
+    'tcs': 'Tessellation Control',
+    'tes': 'Tessellation Evaluation',
+    'gs': 'Geometry',
+    'fs': 'Fragment',
+}
+
+def get_stage_flag(stage: str) -> int:
+    return {
+        'vs': GL_VERTEX_SHADER,
+        'tcs': GL_TESS_CONTROL_SHADER,
+        'tes': GL_TESS_EVALUATION_SHADER,
+        'gs': GL_GEOMETRY_SHADER,
+        'fs': GL_FRAGMENT_SHADER,
+    }[stage]
+
+def check_shader(shader: int, stage: str):
+    """Raise a CompileError with the GL log if a shader failed to compile
+
+    Parameters:
+        shader (int):   Compiled GL shader
+        stage (str):    Stage key, one of `STAGE_NAMES`
+    """
     shader_ok = Buffer(GL_INT, 1)
     glGetShaderiv(shader, GL_COMPILE_STATUS, shader_ok)
 
     if shader_ok[0] == True:
-        return shader
+        return
 
     # If not okay, read the error from GL logs
     buffer_size = 1024
@@ -96,20 +197,146 @@ def compile_glsl(src: str, stage_flag: int) -> int:
     info_log = Buffer(GL_BYTE, [buffer_size])
     glGetShaderInfoLog(shader, buffer_size, length, info_log)
 
-    if stage_flag == GL_VERTEX_SHADER:
-        stage = 'Vertex'
-    elif stage_flag == GL_FRAGMENT_SHADER:
-        stage = 'Fragment'
-    elif stage_flag == GL_TESS_CONTROL_SHADER:
-        stage = 'Tessellation Control'
-    elif stage_flag == GL_TESS_EVALUATION_SHADER:
-        stage = 'Tessellation Evaluation'
-    elif stage_flag == GL_GEOMETRY_SHADER:
-        stage = 'Geometry'
-    
     # Reconstruct byte data into a string
     err = ''.join(chr(info_log[i]) for i in range(length[0]))
-    raise CompileError(stage + ' Shader Error:\n' + err)
+    raise CompileError(STAGE_NAMES[stage] + ' Shader Error:\n' + err)
+
+def check_program(program: int):
+    """Raise a LinkError with the GL log if a program failed to link"""
+    link_ok = Buffer(GL_INT, 1)
+    glGetProgramiv(program, GL_LINK_STATUS, link_ok)
+
+    if link_ok[0] == True:
+        return
+
+    # If not okay, read the error from GL logs and report
+    bufferSize = 1024
+    length = Buffer(GL_INT, 1)
+    infoLog = Buffer(GL_BYTE, [bufferSize])
+    glGetProgramInfoLog(program, bufferSize, length, infoLog)
+    
+    err = ''.join(chr(infoLog[i]) for i in range(length[0]))
+    raise LinkError(err)
+
+class PendingProgram:
+    """A GL program submitted to the driver but not yet checked for errors.
+
+    Every stage is compiled and the program is linked up front without
+    querying any status, since a status query waits on the driver. With
+    GL_KHR_parallel_shader_compile the driver does the work on its own
+    threads and is_complete() can be polled each frame without blocking.
+    Without it, is_complete() is always True and finish() blocks the same
+    as a synchronous compile.
+
+    Usage:
+        pending = PendingProgram(vs, fs)
+
+        # ... later frames ...
+        if pending.is_complete():
+            program = pending.finish() # May raise CompileError or LinkError
+    """
+    def __init__(self, vs: str, fs: str, tcs: str = None, tes: str = None, gs: str = None):
+        """Submit stage sources for compilation
+
+        Parameters:
+            vs (str): Vertex shader source
+            fs (str): Fragment shader source
+            tcs (str): Tessellation control shader source
+            tes (str): Tessellation evaluation shader source
+            gs (str): Geometry shader source
+        """
+        self.shaders = [] # (stage, GL shader)
+
+        # Unchanged sources skip compilation entirely
+        self.cache_key = PROGRAM_CACHE.key((vs, fs, tcs, tes, gs), ATTRIBUTE_LOCATIONS)
+        self.program = PROGRAM_CACHE.load(self.cache_key)
+        self.is_cached = self.program > 0
+        if self.is_cached:
+            return
+
+        stages = (('vs', vs), ('tcs', tcs), ('tes', tes), ('gs', gs), ('fs', fs))
+        for stage, src in stages:
+            if src:
+                shader = glCreateShader(get_stage_flag(stage))
+                glShaderSource(shader, src)
+                glCompileShader(shader)
+                self.shaders.append((stage, shader))
+
+        program = glCreateProgram()
+        for stage, shader in self.shaders:
+            glAttachShader(program, shader)
+
+        for name, location in ATTRIBUTE_LOCATIONS.items():
+            glBindAttribLocation(program, location, name)
+
+        PROGRAM_CACHE.prepare(program)
+        glLinkProgram(program)
+        self.program = program
+
+    def __repr__(self):
+        return '<PendingProgram(program={}, cached={}) object at {}>'.format(
+            self.program,
+            self.is_cached,
+            id(self)
+        )
+
+    def is_complete(self) -> bool:
+        """Whether finish() can run without waiting on the driver"""
+        if self.is_cached or not is_parallel_compile_supported(self.program):
+            return True
+
+        status = Buffer(GL_INT, 1)
+        glGetProgramiv(self.program, GL_COMPLETION_STATUS_KHR, status)
+        return status[0] == True
+
+    def get_progress(self) -> float:
+        """Fraction of stages, plus the link, that the driver has completed"""
+        if self.is_complete():
+            return 1.0
+
+        status = Buffer(GL_INT, 1)
+        done = 0
+        for stage, shader in self.shaders:
+            glGetShaderiv(shader, GL_COMPLETION_STATUS_KHR, status)
+            done += 1 if status[0] == True else 0
+
+        return done / (len(self.shaders) + 1)
+
+    def finish(self) -> int:
+        """Check for errors and release stage shaders. Blocks if not yet complete
+
+        Returns:
+            int: Linked GL program
+        """
+        if self.is_cached:
+            return self.program
+
+        try:
+            # Report the first stage error over the link error it causes
+            for stage, shader in self.shaders:
+                check_shader(shader, stage)
+
+            check_program(self.program)
+        except:
+            glDeleteProgram(self.program)
+            raise
+        finally:
+            for stage, shader in self.shaders:
+                glDeleteShader(shader)
+            self.shaders = []
+
+        PROGRAM_CACHE.store(self.cache_key, self.program)
+        return self.program
+
+    def discard(self):
+        """Delete the program and stage shaders without waiting on the driver"""
+        for stage, shader in self.shaders:
+            glDeleteShader(shader)
+        self.shaders = []
+
+        if self.program > 0:
+            glDeleteProgram(self.program)
+            self.program = 0
 
 def compile_program(vs: str, fs: str, tcs: str = None, tes: str = None, gs: str = None):
     """Compile a new GL program from the given source strings
@@ -124,43 +351,219 @@ def compile_program(vs: str, fs: str, tcs: str = None, tes: str = None, gs: str
     Returns:
         New GL Program
     """
-    vs_compiled = compile_glsl(vs, GL_VERTEX_SHADER)
-    fs_compiled = compile_glsl(fs, GL_FRAGMENT_SHADER)
-    tcs_compiled = compile_glsl(gs, GL_TESS_CONTROL_SHADER) if tcs else None
-    tes_compiled = compile_glsl(gs, GL_TESS_EVALUATION_SHADER) if tes else None
-    gs_compiled = compile_glsl(gs, GL_GEOMETRY_SHADER) if gs else None
-
-    program = glCreateProgram()
-    glAttachShader(program, vs_compiled)
-    glAttachShader(program, fs_compiled)
-    if tcs: glAttachShader(program, tcs_compiled)
-    if tes: glAttachShader(program, tes_compiled)
-    if gs: glAttachShader(program, gs_compiled)
-        
-    glLinkProgram(program)
+    return PendingProgram(vs, fs, tcs, tes, gs).finish()
 
-    # Cleanup shaders
-    glDeleteShader(vs_compiled)
-    glDeleteShader(fs_compiled)
-    if tcs: glDeleteShader(tcs_compiled)
-    if tes: glDeleteShader(tes_compiled)
-    if gs: glDeleteShader(gs_compiled)
+def get_active_variables(program: int, count_flag: int, max_length_flag: int, get_active, get_location) -> dict:
+    """Enumerate the active uniforms or attributes of a linked program
 
-    # Check for link errors
-    link_ok = Buffer(GL_INT, 1)
-    glGetProgramiv(program, GL_LINK_STATUS, link_ok)
+    Parameters:
+        program (int):          Linked GL program
+        count_flag (int):       e.g. `GL_ACTIVE_UNIFORMS`
+        max_length_flag (int):  e.g. `GL_ACTIVE_UNIFORM_MAX_LENGTH`
+        get_active (callable):  e.g. `glGetActiveUniform`
+        get_location (callable): e.g. `glGetUniformLocation`
 
-    # If not okay, read the error from GL logs and report
-    if link_ok[0] != True:
-        bufferSize = 1024
-        length = Buffer(GL_INT, 1)
-        infoLog = Buffer(GL_BYTE, [bufferSize])
-        glGetProgramInfoLog(program, bufferSize, length, infoLog)
+    Returns:
+        dict(str, tuple(int, int, int)): name -> (location, type, size)
+    """
+    buf = Buffer(GL_INT, 1)
+    glGetProgramiv(program, count_flag, buf)
+    count = buf[0]
+
+    glGetProgramiv(program, max_length_flag, buf)
+    max_length = max(buf[0], 1)
+
+    length = Buffer(GL_INT, 1)
+    size = Buffer(GL_INT, 1)
+    data_type = Buffer(GL_INT, 1)
+    name = Buffer(GL_BYTE, [max_length])
+
+    variables = {}
+    for i in range(count):
+        get_active(program, i, max_length, length, size, data_type, name)
+        key = ''.join(chr(name[c]) for c in range(length[0]))
         
-        err = ''.join(chr(infoLog[i]) for i in range(length[0]))
-        raise LinkError(err)
+        # Members of uniform blocks don't have a location
+        location = get_location(program, key)
+        if location < 0:
+            continue
+
+        info = (location, data_type[0], size[0])
+        variables[key] = info
+
+        # Arrays are reported as `name[0]` but set by `name`
+        if key.endswith('[0]'):
+            variables[key[:-3]] = info
+
+    return variables
 
-    return program 
+def reflect_program(program: int):
+    """Read the active uniforms and attributes of a linked program
+
+    Parameters:
+        program (int): Linked GL program
+
+    Returns:
+        tuple(dict, dict): Uniforms and attributes, each mapping 
+                           name -> (location, type, size)
+    """
+    uniforms = get_active_variables(
+        program, 
+        GL_ACTIVE_UNIFORMS, 
+        GL_ACTIVE_UNIFORM_MAX_LENGTH, 
+        glGetActiveUniform, 
+        glGetUniformLocation
+    )
+
+    attributes = get_active_variables(
+        program, 
+        GL_ACTIVE_ATTRIBUTES, 
+        GL_ACTIVE_ATTRIBUTE_MAX_LENGTH, 
+        glGetActiveAttrib, 
+        glGetAttribLocation
+    )
+
+    return uniforms, attributes
+
+def allocate_uniform_shadows(uniforms: dict):
+    """Lay out storage for the last uploaded value of every uniform
+
+    Parameters:
+        uniforms (dict): Reflected uniforms as name -> (location, type, size)
+
+    Returns:
+        tuple(dict, np.ndarray): name -> (offset, components) into a 
+                                 float32 array initialized to NaN
+    """
+    if not uniforms:
+        return {}, np.empty(0, dtype=np.float32)
+
+    # Number of 4 byte components per element of each uniform type.
+    # Anything not listed (samplers, etc) is a single int.
+    components = {
+        GL_FLOAT: 1,
+        GL_FLOAT_VEC2: 2,
+        GL_FLOAT_VEC3: 3,
+        GL_FLOAT_VEC4: 4,
+        GL_INT: 1,
+        GL_INT_VEC2: 2,
+        GL_INT_VEC3: 3,
+        GL_INT_VEC4: 4,
+        GL_BOOL: 1,
+        GL_BOOL_VEC2: 2,
+        GL_BOOL_VEC3: 3,
+        GL_BOOL_VEC4: 4,
+        GL_FLOAT_MAT2: 4,
+        GL_FLOAT_MAT3: 9,
+        GL_FLOAT_MAT4: 16,
+    }
+
+    offsets = {}
+    by_location = {}
+    total = 0
+
+    for name, (location, data_type, size) in uniforms.items():
+        # Array aliases (`name` and `name[0]`) share the same storage
+        if location not in by_location:
+            count = components.get(data_type, 1) * size
+            by_location[location] = (total, count)
+            total += count
+
+        offsets[name] = by_location[location]
+
+    # NaN never compares equal, so the first write always goes through
+    return offsets, np.full(total, np.nan, dtype=np.float32)
+
+def bind_uniform_blocks(program: int) -> set:
+    """Connect shared uniform blocks declared by a program to their binding points
+
+    Parameters:
+        program (int): Linked GL program
+
+    Returns:
+        set(str): Names of blocks from `UNIFORM_BLOCK_BINDINGS` that the program uses
+    """
+    blocks = set()
+    for name, binding in UNIFORM_BLOCK_BINDINGS.items():
+        index = glGetUniformBlockIndex(program, name)
+        if index != GL_INVALID_INDEX:
+            glUniformBlockBinding(program, index, binding)
+            blocks.add(name)
+
+    return blocks
+
+def bind_shared_samplers(program: int, uniforms: dict) -> set:
+    """Point shared samplers declared by a program at their texture units
+
+    Parameters:
+        program (int): Linked GL program
+        uniforms (dict): Reflected uniforms of the program
+
+    Returns:
+        set(str): Names of samplers from `SHARED_SAMPLER_UNITS` that the program uses
+    """
+    samplers = set(SHARED_SAMPLER_UNITS.keys()) & set(uniforms.keys())
+    if not samplers:
+        return samplers
+
+    # Sampler uniforms are per-program state and can only be set while bound
+    current = Buffer(GL_INT, 1)
+    glGetIntegerv(GL_CURRENT_PROGRAM, current)
+    glUseProgram(program)
+
+    for name in samplers:
+        glUniform1i(uniforms[name][0], SHARED_SAMPLER_UNITS[name])
+
+    glUseProgram(current[0])
+    return samplers
+
+# `#pragma multi_compile A B C` declares a set of keywords, like Unity's ShaderLab
+MULTI_COMPILE_PATTERN = re.compile(r'^[ \t]*#[ \t]*pragma[ \t]+multi_compile[ \t]+(.+)$', re.MULTILINE)
+
+def find_keyword_sets(source: str) -> list:
+    """Find keyword sets declared with `#pragma multi_compile` in a source
+
+    Returns:
+        list(tuple(str)): Keywords of each set, in declaration order
+    """
+    return [tuple(m.group(1).split()) for m in MULTI_COMPILE_PATTERN.finditer(source)]
+
+class ShaderVariant:
+    """Linked program for one keyword combination and its reflected state"""
+    def __init__(self, keywords: tuple, program: int):
+        """
+        Parameters:
+            keywords (tuple(str)):  Sorted keywords defined for this program
+            program (int):          Linked GL program, or -1 if none
+        """
+        self.keywords = keywords
+        self.program = program
+
+        if program > 0:
+            self.uniforms, self.attributes = reflect_program(program)
+            self.uniform_blocks = bind_uniform_blocks(program)
+            self.shared_samplers = bind_shared_samplers(program, self.uniforms)
+        else:
+            self.uniforms = {}
+            self.attributes = {}
+            self.uniform_blocks = set()
+            self.shared_samplers = set()
+
+        self.shadow_offsets, self.shadow = allocate_uniform_shadows(self.uniforms)
+
+        # Per-object matrices in the order provided to set_object_matrix_buffer()
+        self.object_matrix_uniforms = [
+            (i, self.uniforms[name][0], self.shadow_offsets[name][0])
+            for i, name in enumerate(('ModelMatrix', 'ModelViewMatrix', 'ModelViewProjectionMatrix'))
+            if name in self.uniforms
+        ]
+
+    def __repr__(self):
+        return '<ShaderVariant(keywords={}, program={}) object at {}>'.format(
+            self.keywords,
+            self.program,
+            id(self)
+        )
 
 class BaseShader:
     """Base encapsulation of shader compilation and configuration.
@@ -170,21 +573,339 @@ class BaseShader:
 
     Attributes:
         program (int): 
+        uniforms (dict): Active uniforms of `program` as name -> (location, type, size)
+        attributes (dict): Active attributes of `program` as name -> (location, type, size)
+        uniform_blocks (set): Shared uniform blocks used by `program`
+        shared_samplers (set): Shared samplers used by `program`
+        shadow (np.ndarray): Last values uploaded to each of `uniforms`
         last_error (str): Last error message by a call to compile()
+        pending (PendingProgram): Program still compiling from compile_async()
+        keyword_sets (list[tuple]): Declared sets of mutually exclusive keywords
+        variants (OrderedDict): Compiled ShaderVariant per keyword combination, in LRU order
+        requested_variants (list[tuple]): Keyword combinations to compile through a CompileQueue
+        pending_variants (dict): PendingProgram per keyword combination still compiling,
+                                 or None while its sources are preprocessed
+        variant_generation (int): Incremented whenever variants are discarded for new sources
         watched (list[str]): List of filenames to monitor for disk changes
-        prev_mtimes (list[int]): mtimes recorded for all monitored files
+        has_file_changes (bool): Whether any watched file changed since the last compile
+        preprocessed (dict): Results of get_preprocess_jobs() for compile_async() to use
     """
 
     # program: int
     # last_error: str
     # watched: list 
-    # prev_mtimes: list
+
+    # Compiled keyword variants kept per shader, including the base variant
+    MAX_VARIANTS = 16
 
     def __init__(self):
+        self.variants = OrderedDict()
+        self.requested_variants = []
+        self.pending_variants = {}
+        self.variant_generation = 0
+        self.clear_keywords()
         self.program = -1
         self.last_error = None
+        self.pending = None
+        self.is_compiling_async = False
         self.watched = []
-        self.prev_mtimes = []
+        self.has_file_changes = False
+        self.preprocessed = {}
+
+    @property
+    def program(self) -> int:
+        return self._program
+
+    @program.setter
+    def program(self, program: int):
+        """Set a newly linked program and reflect its active variables
+
+        This is the base variant without keywords. Any compiled keyword
+        variants were built from the previous sources and are discarded,
+        along with those still compiling.
+        """
+        for variant in self.variants.values():
+            if variant.program > 0 and variant.program != program:
+                glDeleteProgram(variant.program)
+
+        for pending in self.pending_variants.values():
+            if pending:
+                pending.discard()
+
+        self.requested_variants = []
+        self.pending_variants = {}
+        self.variant_generation += 1
+
+        base = ShaderVariant((), program)
+        self.variants = OrderedDict([((), base)])
+        self.failed_variants = {}
+        self.activate_variant(base)
+
+    def activate_variant(self, variant):
+        """Point program and reflection state at a compiled variant"""
+        self.variant = variant
+        self._program = variant.program
+        self.uniforms = variant.uniforms
+        self.attributes = variant.attributes
+        self.uniform_blocks = variant.uniform_blocks
+        self.shared_samplers = variant.shared_samplers
+        self.shadow_offsets = variant.shadow_offsets
+        self.shadow = variant.shadow
+        self.object_matrix_uniforms = variant.object_matrix_uniforms
+
+    def declare_keywords(self, *keywords):
+        """Declare a set of mutually exclusive keywords that variants may enable
+
+        Use `_` as one of the keywords for a set that can be entirely disabled.
+        E.g. `declare_keywords('_', 'NORMAL_MAP')`
+
+        Parameters:
+            keywords (str): Keywords of the set
+        """
+        self.keyword_sets.append(tuple(keywords))
+        self.declared_keywords.update(k for k in keywords if k != '_')
+
+    def clear_keywords(self):
+        self.keyword_sets = []
+        self.declared_keywords = set()
+
+    def declare_keywords_from_sources(self, sources):
+        """Replace declared keywords with every `#pragma multi_compile` in sources
+
+        Parameters:
+            sources (iterable(str)): Preprocessed sources. None entries are skipped
+        """
+        self.clear_keywords()
+        for source in sources:
+            for keywords in find_keyword_sets(source or ''):
+                if keywords not in self.keyword_sets:
+                    self.declare_keywords(*keywords)
+
+    def get_variant_key(self, keywords) -> tuple:
+        """Keywords requested by a material or pass that this shader declares
+
+        Keywords the shader doesn't declare are ignored, so passes can
+        request features globally without creating duplicate variants.
+
+        Parameters:
+            keywords (iterable(str))
+
+        Returns:
+            tuple(str): Sorted keywords, used as the variant cache key
+        """
+        return tuple(sorted(set(keywords) & self.declared_keywords))
+
+    @property
+    def base_program(self) -> int:
+        """Program of the base variant, regardless of the active variant"""
+        return self.variants[()].program
+
+    def select_variant(self, keywords):
+        """Activate the program for a keyword combination
+
+        Variants are requested on first use and the base variant is drawn
+        in their place until a CompileQueue compiles them. Variants that 
+        fail to compile fall back to the base variant and aren't retried 
+        until the shader recompiles.
+
+        Parameters:
+            keywords (iterable(str)): Requested keywords
+        """
+        key = self.get_variant_key(keywords)
+        if key == self.variant.keywords:
+            return
+
+        variant = self.variants.get(key)
+        if variant is None:
+            self.request_variant(key)
+            variant = self.variants[()]
+
+        self.variants.move_to_end(variant.keywords)
+        self.activate_variant(variant)
+
+    def request_variant(self, keywords):
+        """Queue a keyword combination for a CompileQueue to compile
+
+        Combinations already compiled, compiling or failed are skipped.
+
+        Parameters:
+            keywords (iterable(str)): Requested keywords
+        """
+        key = self.get_variant_key(keywords)
+        if self.base_program < 1 \
+            or key in self.variants \
+            or key in self.failed_variants \
+            or key in self.pending_variants \
+            or key in self.requested_variants:
+            return
+
+        self.requested_variants.append(key)
+
+    def take_requested_variants(self) -> list:
+        """Requested keyword combinations, now marked as pending
+
+        Returns:
+            list(tuple(str)): Variant keys to preprocess and compile_variant_async()
+        """
+        keys = self.requested_variants
+        self.requested_variants = []
+
+        for key in keys:
+            self.pending_variants[key] = None
+
+        return keys
+
+    def get_variant_sources(self, key: tuple, preprocessed: dict = None) -> tuple:
+        """Stage sources of a keyword variant, with a `#define` per keyword
+
+        Unlike compile(), this must leave the base variant's state alone.
+        That is its includes, declared keywords and file changes. Watched 
+        files may only be extended with those that the variant reads.
+
+        Parameters:
+            key (tuple(str)):       Variant key from get_variant_key()
+            preprocessed (dict):    PreprocessedStage per job of get_preprocess_jobs(key)
+
+        Returns:
+            tuple(str): (vs, fs, tcs, tes, gs) sources, None for unused stages
+        """
+        raise NotImplementedError('Must be implemented by shaders that declare keywords')
+
+    def compile_variant(self, key: tuple):
+        """Compile and cache a keyword variant, waiting on the driver
+
+        Returns:
+            ShaderVariant|None: None if compilation failed
+        """
+        try:
+            program = compile_program(*self.get_variant_sources(key))
+        except Exception as e:
+            self.fail_variant(key, e)
+            return None
+
+        return self.add_variant(key, program)
+
+    def compile_variant_async(self, key: tuple, preprocessed: dict = None):
+        """Submit a keyword variant to the driver for poll_variants() to pick up
+
+        Parameters:
+            key (tuple(str)):       Variant key from take_requested_variants()
+            preprocessed (dict):    PreprocessedStage per job of get_preprocess_jobs(key)
+        """
+        try:
+            self.pending_variants[key] = PendingProgram(*self.get_variant_sources(key, preprocessed))
+        except Exception as e:
+            self.fail_variant(key, e)
+
+    def poll_variants(self, block: bool = False) -> bool:
+        """Cache variants from compile_variant_async() that the driver completed
+
+        Parameters:
+            block (bool): Wait on the driver instead of checking for completion
+
+        Returns:
+            bool: True if any variant was added
+        """
+        changed = False
+        for key, pending in list(self.pending_variants.items()):
+            if pending is None or (not block and not pending.is_complete()):
+                continue
+
+            try:
+                self.add_variant(key, pending.finish())
+                changed = True
+            except Exception as e:
+                self.fail_variant(key, e)
+
+        return changed
+
+    def add_variant(self, key: tuple, program: int):
+        """Cache a linked variant program
+
+        Returns:
+            ShaderVariant
+        """
+        self.pending_variants.pop(key, None)
+
+        variant = ShaderVariant(key, program)
+        self.variants[key] = variant
+        self.evict_variants()
+        return variant
+
+    def fail_variant(self, key: tuple, error: Exception):
+        """Stop retrying a keyword variant until the shader recompiles"""
+        print('SHADER VARIANT ERROR', key)
+        print(error)
+        self.pending_variants.pop(key, None)
+        self.failed_variants[key] = str(error)
+
+    def evict_variants(self):
+        """Delete least recently used variants over MAX_VARIANTS
+
+        The base and active variants are never evicted.
+        """
+        for key in list(self.variants.keys()):
+            if len(self.variants) <= self.MAX_VARIANTS:
+                break
+
+            variant = self.variants[key]
+            if key == () or variant is self.variant:
+                continue
+
+            del self.variants[key]
+            glDeleteProgram(variant.program)
+
+    def prewarm(self, combinations: list = None):
+        """Request variants ahead of first use
+
+        Parameters:
+            combinations (list(tuple(str))): Keyword combinations to compile. Defaults to
+                                             every combination of the declared keyword sets,
+                                             up to MAX_VARIANTS
+        """
+        if combinations is None:
+            combinations = itertools.islice(
+                itertools.product(*self.keyword_sets), 
+                self.MAX_VARIANTS
+            )
+
+        for combination in combinations:
+            self.request_variant(combination)
+
+    def get_uniform_location(self, uniform: str) -> int:
+        """Location of an active uniform, or -1 if the program doesn't use it"""
+        info = self.uniforms.get(uniform)
+        return info[0] if info else -1
+
+    def is_uniform_unchanged(self, uniform: str, values) -> bool:
+        """Compare values against what was last uploaded to a uniform.
+
+        If they differ, the shadow copy is updated with the new values 
+        and the caller is expected to upload them.
+
+        Parameters:
+            uniform (str):              Active uniform name
+            values (np.ndarray|list):   New values, flattened or not
+
+        Returns:
+            bool: True if the GL call can be skipped
+        """
+        offset, count = self.shadow_offsets[uniform]
+        values = np.asarray(values, dtype=np.float32).reshape(-1)[:count]
+        shadow = self.shadow[offset:offset + len(values)]
+
+        if np.array_equal(shadow, values):
+            UNIFORM_STATS.skipped += 1
+            return True
+
+        shadow[:] = values
+        UNIFORM_STATS.issued += 1
+        return False
+
+    def get_attribute_location(self, attr: str) -> int:
+        """Location of an active attribute, or -1 if the program doesn't use it"""
+        info = self.attributes.get(attr)
+        return info[0] if info else -1
 
     @property
     def is_compiled(self) -> bool:
@@ -192,18 +913,14 @@ class BaseShader:
 
     def needs_recompile(self) -> bool:
         """Does this shader need to be recompiled from updated settings"""
-        return not self.is_compiled or self.mtimes_changed()
-
-    def update_mtimes(self):
-        self.prev_mtimes = self.mtimes()
+        return not self.is_compiled or self.has_file_changes
 
-    def mtimes(self):
-        """Aggregate file modication times from monitored files"""
-        return [os.stat(file).st_mtime for file in self.watched]
+    def clear_file_changes(self):
+        """Mark the current contents of watched files as compiled
 
-    def mtimes_changed(self) -> bool:
-        """Check if the file update time has changed in any of the source files"""
-        return self.prev_mtimes != self.mtimes() 
+        Changes are flagged by FILE_WATCHER.dispatch() from then on.
+        """
+        self.has_file_changes = False
 
     def watch(self, files: list):
         """Monitor one or more files for changes on disk.
@@ -214,8 +931,7 @@ class BaseShader:
             files (list[str]): List of filenames to monitor
         """
         self.watched = files
-        # We keep mtimes as-is, in case they changed the file   
-        # list to the same values and order. 
+        FILE_WATCHER.watch(self, files)
         
     def set_mat4(self, uniform: str, mat):
         """Set a mat4 uniform
@@ -224,11 +940,13 @@ class BaseShader:
             uniform (str)
             value (mathutils.Quaternion | list[float])
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return # Skip uniforms that were optimized out for being unused
 
-        mat_buffer = np.reshape(mat, (16, )).tolist()
-        mat_buffer = Buffer(GL_FLOAT, 16, mat_buffer)
+        mat_buffer = np.reshape(mat, (16, ))
+        if self.is_uniform_unchanged(uniform, mat_buffer): return
+
+        mat_buffer = Buffer(GL_FLOAT, 16, mat_buffer.tolist())
         glUniformMatrix4fv(location, 1, GL_FALSE, mat_buffer)
 
     def set_vec3_array(self, uniform: str, arr):
@@ -238,11 +956,12 @@ class BaseShader:
             uniform (str)
             value (list[mathutils.Vector | list[float]])
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, arr): return
 
         buffer = Buffer(GL_FLOAT, len(arr), arr)
-        glUniform3fv(location, len(arr), buffer)
+        glUniform3fv(location, len(arr) // 3, buffer)
         
     def set_vec4_array(self, uniform: str, arr: list):
         """Set a vec4[] uniform
@@ -251,11 +970,12 @@ class BaseShader:
             uniform (str)
             value (list[mathutils.Vector | list[float]])
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, arr): return
 
         buffer = Buffer(GL_FLOAT, len(arr), arr)
-        glUniform4fv(location, len(arr), buffer)
+        glUniform4fv(location, len(arr) // 4, buffer)
     
     def set_int(self, uniform: str, value: int):
         """Set an int uniform
@@ -264,8 +984,9 @@ class BaseShader:
             uniform (str)
             value (int)
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, (value,)): return
 
         glUniform1i(location, value)
 
@@ -276,8 +997,10 @@ class BaseShader:
             uniform (str)
             value (float)
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, (value,)): return
+
         glUniform1f(location, value)
 
     def set_vec3(self, uniform: str, value):
@@ -287,8 +1010,9 @@ class BaseShader:
             uniform (str)
             value (mathutils.Vector | list[float])
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, value[:3]): return
 
         glUniform3f(location, value[0], value[1], value[2])
         
@@ -299,39 +1023,56 @@ class BaseShader:
             uniform (str)
             value (mathutils.Vector | list[float])
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
+        if self.is_uniform_unchanged(uniform, value[:4]): return
 
         glUniform4f(location, value[0], value[1], value[2], value[3])
         
-    def bind_texture(self, idx: int, uniform: str, image):
+    def bind_texture(self, idx: int, uniform: str, image, sampler: tuple = DEFAULT_SAMPLER):
         """Bind a `bpy.types.Image` to GL
 
         Parameters:
             idx (int):                  Offset from GL_TEXTURE0 to bind
             uniform (str):              Uniform name to bind the texture
             image (bpy.types.Image):    Source image in Blender
+            sampler (tuple(str)):       Filter and wrap mode, e.g. `('LINEAR', 'REPEAT')`
         """
-        location = glGetUniformLocation(self.program, uniform)
+        location = self.get_uniform_location(uniform)
         if location < 0: return
 
-        # If it's not on the GPU yet, get Blender to upload it.
-        if image.bindcode < 1:
-            image.gl_load()
-        
-        # TODO: glTexParameteri calls
-        glActiveTexture(GL_TEXTURE0 + idx)
-        glBindTexture(GL_TEXTURE_2D, image.bindcode)
+        # Uploaded with mipmaps on first use, and evicted when over budget
+        TEXTURE_MANAGER.bind(idx, image, sampler)
+
+        # Texture units are global state, but the sampler uniform is per-program
+        if self.is_uniform_unchanged(uniform, (idx,)): return
         glUniform1i(location, idx)
 
     # Methods to be implemented by different shader formats
 
-    def bind(self, render_pass: str):
+    def get_textures(self) -> tuple:
+        """Images that bind_textures() will bind for this shader.
+
+        Used by render queues to batch draws that share the same texture set.
+        
+        Returns:
+            tuple(bpy.types.Image)
+        """
+        return ()
+
+    def bind_textures(self):
+        """Bind textures and sampler uniforms for the current program"""
+        pass
+
+    def bind(self, render_pass: str, keywords: tuple = ()):
         """Bind the GL program for the given pass
         
         Properties:
             render_pass (str): Pass name. E.g. `Shadow`, `Main`
+            keywords (tuple(str)): Keywords requested by the pass and material
         """
+        self.select_variant(keywords)
+
         # Override to handle binding on each pass. E.g. switching programs
         # or updating uniform values to represent that pass.
 
@@ -349,6 +1090,10 @@ class BaseShader:
     def set_camera_matrices(self, view_matrix, projection_matrix):
         """Set per-camera matrices
         
+        Programs using the shared `CameraData` block already have these 
+        from the per-frame UBO. Loose uniforms are only set for programs 
+        that declare them outside of the block.
+
         Parameters:
             view_matrix (mathutils.Quaternion)
             projection_matrix (mathutils.Quaternion)
@@ -356,6 +1101,9 @@ class BaseShader:
         self.view_matrix = view_matrix
         self.projection_matrix = projection_matrix
 
+        if 'CameraData' in self.uniform_blocks:
+            return
+
         self.set_mat4("ViewMatrix", view_matrix.transposed())
         self.set_mat4("ProjectionMatrix", projection_matrix.transposed())
         self.set_mat4("CameraMatrix", view_matrix.inverted().transposed())
@@ -373,6 +1121,35 @@ class BaseShader:
         self.set_mat4("ModelViewMatrix", mv.transposed())
         self.set_mat4("ModelViewProjectionMatrix", mvp.transposed())
         
+    def set_object_matrix_buffer(self, matrices):
+        """Set per-object matrices from precomputed, column major values
+
+        Unlike set_object_matrices() this skips shadow comparisons, since
+        per-object values change with every draw.
+
+        Parameters:
+            matrices (bgl.Buffer): Shape (3, 16) of ModelMatrix, ModelViewMatrix,
+                                   and ModelViewProjectionMatrix. See ObjectTransforms
+        """
+        for i, location, shadow_offset in self.object_matrix_uniforms:
+            glUniformMatrix4fv(location, 1, GL_FALSE, matrices[i])
+            
+            # Make sure a later set_mat4() of the same uniform isn't skipped
+            self.shadow[shadow_offset] = np.nan
+        
+        UNIFORM_STATS.issued += len(self.object_matrix_uniforms)
+
+    def set_material(self, material):
+        """Set per-material uniforms from Blender's material settings
+
+        Used by passes that draw many materials with one shared program,
+        e.g. GBufferPass. Shaders that own their materials can ignore this.
+
+        Parameters:
+            material (bpy.types.Material)
+        """
+        pass
+
     def get_properties(self):
         """Retrieve a ShaderProperties for non-material properties specific to this shader.
         
@@ -429,9 +1206,94 @@ class BaseShader:
         It is recommended that either a `CompileError` or `LinkError` be thrown.
         
         A successful compilation will set `self.program` to a valid GLSL program.
+        Implementations should link through `link_program()` to also 
+        support `compile_async()`.
         """
         raise NotImplementedError('Must be implemented by a concrete class')
 
+    def link_program(self, vs: str, fs: str, tcs: str = None, tes: str = None, gs: str = None):
+        """Compile and link stage sources into `self.program`
+
+        During compile_async() the program is only submitted to the driver
+        and stored in `self.pending` until poll_compile() swaps it in.
+        """
+        if self.is_compiling_async:
+            self.cancel_compile()
+            self.pending = PendingProgram(vs, fs, tcs, tes, gs)
+        else:
+            self.cancel_compile()
+            self.program = compile_program(vs, fs, tcs, tes, gs)
+
+    def get_preprocess_jobs(self, key: tuple = ()) -> list:
+        """Stages that compile() would preprocess, for a PreprocessPool
+
+        Parameters:
+            key (tuple(str)): Variant key, for the stages of get_variant_sources() instead
+
+        Returns:
+            list(tuple(str, tuple(str))): (filename, defines) per stage,
+                or an empty list if sources aren't GLSL files
+        """
+        return []
+
+    def compile_async(self, preprocessed: dict = None):
+        """Start a compile() without waiting on the driver to finish
+
+        The previous program (if any) stays bound until poll_compile() 
+        reports that the new one is ready. Errors while preprocessing
+        sources are still raised immediately.
+
+        Parameters:
+            preprocessed (dict): PreprocessedStage per job of get_preprocess_jobs(),
+                                 for compile() to use instead of preprocessing
+        """
+        self.is_compiling_async = True
+        self.preprocessed = preprocessed or {}
+        try:
+            self.compile()
+        finally:
+            self.is_compiling_async = False
+            self.preprocessed = {}
+
+    @property
+    def is_compiling(self) -> bool:
+        return self.pending is not None
+
+    def cancel_compile(self):
+        """Discard the program still pending from compile_async(), if any"""
+        if self.pending:
+            self.pending.discard()
+            self.pending = None
+
+    def get_compile_progress(self) -> float:
+        """Fraction of the pending program the driver has completed"""
+        return self.pending.get_progress() if self.pending else 1.0
+
+    def poll_compile(self, block: bool = False) -> bool:
+        """Swap in the pending program from compile_async() once complete
+
+        Raises the program's CompileError or LinkError, if it failed.
+
+        Parameters:
+            block (bool): Wait on the driver instead of checking for completion
+
+        Returns:
+            bool: True if a new program was swapped in
+        """
+        if not self.pending:
+            return False
+        
+        if not block and not self.pending.is_complete():
+            return False
+
+        pending = self.pending
+        self.pending = None
+        program = pending.finish()
+
+        # Replaces (and deletes) the previous program and its variants
+        self.program = program
+        return True
+
     def set_lighting(self, lighting):
         """Set lighting uniforms from scene light data
         
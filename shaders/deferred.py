@@ -0,0 +1,230 @@
+
+from .base import (
+    BaseShader,
+    compile_program
+)
+
+# Shared by every deferred program. Must match core.ubo layouts
+COMMON = '''
+#version 330 core
+
+layout(std140) uniform CameraData {
+    mat4 ViewMatrix;
+    mat4 ProjectionMatrix;
+    mat4 CameraMatrix;
+};
+'''
+
+VS_GBUFFER = COMMON + '''
+uniform mat4 ModelViewProjectionMatrix;
+uniform mat4 ModelMatrix;
+
+in vec3 Position;
+in vec3 Normal;
+
+out VS_OUT {
+    vec3 normalWS;
+} OUT;
+
+void main()
+{
+    gl_Position = ModelViewProjectionMatrix * vec4(Position, 1.0);
+    OUT.normalWS = (ModelMatrix * vec4(Normal, 0)).xyz;
+}
+'''
+
+FS_GBUFFER = COMMON + '''
+uniform vec4 _BaseColor;
+uniform vec4 _MaterialParams; // (roughness, metallic, specular, 0)
+
+layout (location = 0) out vec4 GBufferAlbedo;
+layout (location = 1) out vec4 GBufferNormal;
+layout (location = 2) out vec4 GBufferMaterial;
+
+in VS_OUT {
+    vec3 normalWS;
+} IN;
+
+void main()
+{
+    GBufferAlbedo = vec4(_BaseColor.rgb, 1);
+    GBufferNormal = vec4(normalize(IN.normalWS), 0);
+    GBufferMaterial = _MaterialParams;
+}
+'''
+
+# Oversized triangle covering the whole viewport, from gl_VertexID
+VS_FULLSCREEN = COMMON + '''
+out vec2 uv;
+
+void main()
+{
+    uv = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+    gl_Position = vec4(uv * 2.0 - 1.0, 0.0, 1.0);
+}
+'''
+
+# MAX_ADDITIONAL_LIGHTS and CLUSTER_INDEX_WIDTH are defined by DeferredLightingShader
+FS_LIGHTING = COMMON + '''
+layout(std140) uniform LightData {
+    vec4 _MainLightDirection;
+    vec4 _MainLightColor;
+    vec3 _AmbientColor;
+    int _AdditionalLightsCount;
+    vec4 _AdditionalLightsPosition[MAX_ADDITIONAL_LIGHTS];
+    vec4 _AdditionalLightsColor[MAX_ADDITIONAL_LIGHTS];
+    vec4 _AdditionalLightsSpotDir[MAX_ADDITIONAL_LIGHTS];
+    vec4 _AdditionalLightsAttenuation[MAX_ADDITIONAL_LIGHTS];
+    vec4 _ClusterGridSize;
+    vec4 _ClusterDepthParams;
+    vec4 _ClusterViewport;
+};
+
+uniform isampler2D _ClusterGrid;
+uniform isampler2D _ClusterLightIndices;
+uniform sampler2D _ClusterLightData;
+
+uniform sampler2D _GBufferAlbedo;
+uniform sampler2D _GBufferNormal;
+uniform sampler2D _GBufferMaterial;
+uniform sampler2D _GBufferDepth;
+
+uniform mat4 _InverseViewProjection;
+
+in vec2 uv;
+
+layout (location = 0) out vec4 FragColor;
+
+vec3 BlinnPhong(vec3 lightColor, vec3 L, vec3 N, vec3 V, vec3 albedo, vec4 params)
+{
+    float NdotL = clamp(dot(N, L), 0.0, 1.0);
+    float NdotH = clamp(dot(N, normalize(L + V)), 0.0, 1.0);
+    float shininess = exp2(10.0 * (1.0 - params.x) + 1.0);
+    float specular = pow(NdotH, shininess) * params.z * (1.0 - params.x);
+
+    return lightColor * (albedo * (1.0 - params.y) * NdotL + specular * NdotL);
+}
+
+void main()
+{
+    float depth = texture(_GBufferDepth, uv).r;
+    if (depth >= 1.0) {
+        discard;
+    }
+
+    vec3 albedo = texture(_GBufferAlbedo, uv).rgb;
+    vec3 N = texture(_GBufferNormal, uv).xyz;
+    vec4 params = texture(_GBufferMaterial, uv);
+
+    vec4 positionCS = _InverseViewProjection * vec4(vec3(uv, depth) * 2.0 - 1.0, 1.0);
+    vec3 positionWS = positionCS.xyz / positionCS.w;
+    vec3 V = normalize(CameraMatrix[3].xyz - positionWS);
+
+    vec3 color = albedo * _AmbientColor;
+    color += BlinnPhong(_MainLightColor.rgb, _MainLightDirection.xyz, N, V, albedo, params);
+
+    // Only the lights in this pixel's cluster can reach it
+    float viewDepth = max(-(ViewMatrix * vec4(positionWS, 1.0)).z, _ClusterDepthParams.x);
+    ivec3 gridSize = ivec3(_ClusterGridSize.xyz);
+    ivec3 cluster = clamp(ivec3(
+        int(uv.x * _ClusterGridSize.x),
+        int(uv.y * _ClusterGridSize.y),
+        int(log(viewDepth) * _ClusterDepthParams.z + _ClusterDepthParams.w)
+    ), ivec3(0), gridSize - 1);
+
+    ivec2 range = texelFetch(_ClusterGrid, ivec2(cluster.x + cluster.y * gridSize.x, cluster.z), 0).rg;
+    for (int n = range.x; n < range.x + range.y; ++n)
+    {
+        int row = texelFetch(_ClusterLightIndices, ivec2(n % CLUSTER_INDEX_WIDTH, n / CLUSTER_INDEX_WIDTH), 0).r;
+        vec4 lightPosition = texelFetch(_ClusterLightData, ivec2(0, row), 0);
+        vec4 lightColor = texelFetch(_ClusterLightData, ivec2(1, row), 0);
+        vec4 spotDirection = texelFetch(_ClusterLightData, ivec2(2, row), 0);
+        vec4 attenuation = texelFetch(_ClusterLightData, ivec2(3, row), 0);
+
+        // Same attenuation as examples/URP/lights.glsl
+        vec3 lightVector = lightPosition.xyz - positionWS * lightPosition.w;
+        float distanceSqr = max(dot(lightVector, lightVector), 0.0000610352);
+        vec3 L = lightVector * inversesqrt(distanceSqr);
+
+        float factor = distanceSqr * attenuation.x;
+        float smoothFactor = clamp(1.0 - factor * factor, 0.0, 1.0);
+        float atten = smoothFactor * smoothFactor / distanceSqr;
+
+        float spot = clamp(dot(spotDirection.xyz, L) * attenuation.z + attenuation.w, 0.0, 1.0);
+        atten *= spot * spot;
+
+        vec3 radiance = pow(lightColor.rgb, vec3(2.2)) * lightColor.w * atten;
+        color += BlinnPhong(radiance, L, N, V, albedo, params);
+    }
+
+    FragColor = vec4(color, 1);
+}
+'''
+
+FS_COMPOSITE = COMMON + '''
+uniform sampler2D _LightAccumulation;
+uniform sampler2D _GBufferDepth;
+
+in vec2 uv;
+
+layout (location = 0) out vec4 FragColor;
+
+void main()
+{
+    float depth = texture(_GBufferDepth, uv).r;
+
+    // Keep the cleared background where nothing was drawn
+    if (depth >= 1.0) {
+        discard;
+    }
+
+    // Depth is restored so that forward draws after the
+    // composite are still occluded by deferred surfaces
+    gl_FragDepth = depth;
+    FragColor = vec4(texture(_LightAccumulation, uv).rgb, 1);
+}
+'''
+
+class GBufferShader(BaseShader):
+    """Built-in shader writing surface attributes of every material to a G-buffer"""
+    def compile(self):
+        self.program = compile_program(VS_GBUFFER, FS_GBUFFER)
+
+    def set_material(self, material):
+        self.set_vec4('_BaseColor', material.diffuse_color)
+        self.set_vec4('_MaterialParams', (
+            material.roughness,
+            material.metallic,
+            material.specular_intensity,
+            0
+        ))
+
+def insert_defines(source: str, defines: dict) -> str:
+    """Add a `#define` per item after the `#version` directive of a source"""
+    version, body = source.lstrip().split('\n', 1)
+    lines = ['#define {} {}'.format(name, value) for name, value in defines.items()]
+    return '\n'.join([version] + lines + [body])
+
+class DeferredLightingShader(BaseShader):
+    """Built-in shader lighting G-buffer pixels with the main light and clustered additional lights"""
+    def __init__(self, max_additional_lights: int, cluster_index_width: int):
+        """
+        Parameters:
+            max_additional_lights (int):    Array size of the LightData UBO members
+            cluster_index_width (int):      Texels per row of the cluster light index texture
+        """
+        super(DeferredLightingShader, self).__init__()
+        self.max_additional_lights = max_additional_lights
+        self.cluster_index_width = cluster_index_width
+
+    def compile(self):
+        fs = insert_defines(FS_LIGHTING, {
+            'MAX_ADDITIONAL_LIGHTS': self.max_additional_lights,
+            'CLUSTER_INDEX_WIDTH': self.cluster_index_width
+        })
+        self.program = compile_program(VS_FULLSCREEN, fs)
+
+class DeferredCompositeShader(BaseShader):
+    """Built-in shader resolving accumulated lighting and depth into the render target"""
+    def compile(self):
+        self.program = compile_program(VS_FULLSCREEN, FS_COMPOSITE)
@@ -1,8 +1,5 @@
 
-from .base import (
-    BaseShader,
-    compile_program
-)
+from .base import BaseShader
 
 VS_FALLBACK = '''
 #version 330 core
@@ -43,4 +40,4 @@ void main()
 class FallbackShader(BaseShader):
     """Built-in default shader as a "safe" fallback in case of failures"""
     def compile(self):
-        self.program = compile_program(VS_FALLBACK, FS_FALLBACK)
+        self.link_program(VS_FALLBACK, FS_FALLBACK)
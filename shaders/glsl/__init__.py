@@ -1,10 +1,14 @@
 
 if 'bpy' in locals():
     import importlib
+    importlib.reload(scanner)
     importlib.reload(preprocessor)
+    importlib.reload(preprocess_pool)
     importlib.reload(shader)
 else:
+    from . import scanner
     from . import preprocessor
+    from . import preprocess_pool
     from . import shader
 
 import bpy
@@ -0,0 +1,199 @@
+
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .preprocessor import GLSLPreprocessor
+
+class PreprocessedStage:
+    """Output of preprocess(), small enough to send back from a worker"""
+    def __init__(self, result: str, includes: list, dependencies: list):
+        """
+        Parameters:
+            result (str):               Processed source
+            includes (list(str)):       Files included, as written in each #include
+            dependencies (list(str)):   Absolute path of every file read
+        """
+        self.result = result
+        self.includes = includes
+        self.dependencies = dependencies
+
+def preprocess(filename: str, defines: tuple) -> PreprocessedStage:
+    """Preprocess a single shader stage the way GLSLShader.compile() does
+
+    Each call starts from a clean macro and #pragma once state. Files
+    shared between calls are still only lexed once per process, through
+    the preprocessor's cache. Macros and conditionals are left for the
+    driver to evaluate.
+
+    Parameters:
+        filename (str):         Stage source file
+        defines (tuple(str)):   Keywords to `#define` before the file
+    """
+    preprocessor = GLSLPreprocessor(fast=True)
+
+    for keyword in defines:
+        preprocessor.define('{} 1'.format(keyword))
+
+    result = preprocessor.parse_file(filename)
+    return PreprocessedStage(result, preprocessor.includes, preprocessor.dependencies)
+
+def warm_worker():
+    """Pool initializer, run first thing in every forked worker
+
+    A thread of Blender's may have been writing to stdout or stderr at
+    the moment of the fork, leaving the buffer's lock held forever in
+    the child. Workers get their own file objects over duplicates of
+    the same descriptors so that printing can't hang on it. The import
+    and logging locks are already reset by CPython after a fork.
+
+    Then builds PCPP's lexer so that no job waits on it.
+    """
+    for name in ('stdout', 'stderr'):
+        stream = getattr(sys, name, None)
+        try:
+            fd = stream.fileno()
+        except (AttributeError, ValueError, OSError):
+            continue
+
+        setattr(sys, name, os.fdopen(os.dup(fd), 'w', buffering=1))
+
+    GLSLPreprocessor(cache=None)
+
+class PreprocessPool:
+    """Shared worker processes preprocessing shader stages off the UI thread
+
+    Preprocessing is pure Python and would otherwise run one stage of one
+    material at a time under the GIL. Jobs are (filename, defines) pairs,
+    as returned by BaseShader.get_preprocess_jobs(), and the same job
+    submitted by several materials before it starts is only run once.
+
+    Workers are forked from Blender so that they start with every module
+    already imported and the parent's preprocessor cache. Spawned workers
+    would have to import the add-on outside of Blender, so on platforms
+    without a safe fork the pool is never started and shaders preprocess
+    in-process as part of compile().
+
+    Forking a multithreaded process only copies the forking thread, and
+    any lock another thread held at the time stays held in the child.
+    Workers only run preprocess(), which touches no Blender API, no GL
+    and no threads, and warm_worker() replaces the one shared resource
+    they do use (stdio). As a last resort, CompileQueue stops waiting on
+    a batch that outlives PREPROCESS_TIMEOUT and calls disable(), after
+    which shaders preprocess in-process like on other platforms.
+
+    Forking isn't free while Blender runs other threads, so workers are
+    only started by the first submit() - i.e. once a material actually
+    compiles - rather than for every render engine instance. They then
+    stay warm for every later reload until shutdown().
+
+    Usage:
+        futures = PREPROCESS_POOL.submit(shader.get_preprocess_jobs())
+
+        # ... later ...
+        shader.preprocessed = { job: f.result() for job, f in futures.items() }
+    """
+
+    # Leave a core for Blender itself
+    WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.queued = {} # (filename, defines) -> Future not yet picked up by a worker
+        self.is_disabled = False
+
+    @property
+    def is_supported(self) -> bool:
+        return sys.platform.startswith('linux') and not self.is_disabled
+
+    @property
+    def is_running(self) -> bool:
+        return self.executor is not None
+
+    def start(self):
+        """Fork workers, if supported and not already running"""
+        if self.executor is not None or not self.is_supported:
+            return
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.WORKERS,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=warm_worker
+        )
+
+    def submit(self, jobs: list) -> dict:
+        """Queue stages for preprocessing, starting workers if needed
+
+        Only available where `is_supported`.
+
+        Parameters:
+            jobs (list(tuple(str, tuple(str)))): (filename, defines) per stage
+
+        Returns:
+            dict: (filename, defines) -> Future of a PreprocessedStage
+        """
+        futures = {}
+        with self.lock:
+            self.start()
+
+            for job in jobs:
+                # Jobs already running may have read files that changed
+                # since, so only those still queued are shared
+                future = self.queued.get(job)
+                if future is None or future.running() or future.done():
+                    future = self.submit_job(job)
+                    self.queued[job] = future
+
+                futures[job] = future
+
+            # Forget jobs that workers have picked up
+            self.queued = {
+                job: f for job, f in self.queued.items()
+                if not f.running() and not f.done()
+            }
+
+        return futures
+
+    def submit_job(self, job: tuple):
+        """Submit a single job, replacing workers if any had died. Lock must be held"""
+        try:
+            return self.executor.submit(preprocess, *job)
+        except BrokenProcessPool:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+            self.queued = {}
+            self.start()
+            return self.executor.submit(preprocess, *job)
+
+    def shutdown(self):
+        """Stop every worker. Pending jobs are discarded"""
+        with self.lock:
+            if self.executor:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+            self.queued = {}
+
+    def disable(self):
+        """Stop every worker and never start them again this session
+
+        For workers that stopped responding, e.g. deadlocked after the fork.
+        """
+        print('Shader preprocess workers stopped responding, preprocessing in-process')
+        with self.lock:
+            self.is_disabled = True
+            if self.executor:
+                # Hung workers never exit on their own. ProcessPoolExecutor
+                # has no public way to kill them before Python 3.14
+                processes = getattr(self.executor, '_processes', None) or {}
+                for process in list(processes.values()):
+                    process.terminate()
+
+        self.shutdown()
+
+# Shared by every CompileQueue
+PREPROCESS_POOL = PreprocessPool()
@@ -1,9 +1,179 @@
 import os 
-import io
+import re
+import itertools
+from collections import OrderedDict
 from libs.pcpp import Preprocessor, OutputDirective, Action
+from libs.ply.lex import LexToken
+from .scanner import IncludeScanner, NeedsEvaluation
+
+# Macros that differ between otherwise identical runs of the preprocessor
+VOLATILE_MACROS = ('__DATE__', '__TIME__', '__FILE__')
+
+# Shallow copy of a LexToken, without the dispatch of copy.copy()
+copy_token = LexToken.__copy__
+
+class PreprocessedFile:
+    """Output of a single GLSLPreprocessor.parse_file() call"""
+    def __init__(self, result: str, pp):
+        """
+        Parameters:
+            result (str):               Processed source
+            pp (GLSLPreprocessor):      Preprocessor state after parsing
+        """
+        self.result = result
+        self.includes = list(pp.includes)
+        self.dependencies = list(pp.dependencies)
+        self.sources = dict(pp.sources)
+        self.macros = dict(pp.macros)
+        self.include_once = dict(pp.include_once)
+
+    def is_current(self) -> bool:
+        """Whether every file read still has the same contents on disk"""
+        for path, data in self.sources.items():
+            try:
+                with open(path) as f:
+                    if f.read() != data:
+                        return False
+            except OSError:
+                return False
+
+        return True
+
+class PreprocessCache:
+    """Results of preprocessing shared across stages, variants and materials
+
+    Two levels are cached:
+
+    * Lexed lines of each file, keyed by the file contents. Any file that
+      did not change since it was last read, e.g. a common.glsl included
+      by every stage of every material, skips the lexer entirely and only
+      has its directives and macros evaluated again.
+    * Complete output of parse_file(), keyed by the file, include paths,
+      macros defined beforehand and files already marked #pragma once.
+      An entry is reused only if every file it read - including nested
+      includes - still has identical contents.
+
+    Contents are compared rather than mtimes so that edits saved within
+    the filesystem's timestamp resolution are never missed.
+
+    Usage:
+        pp = GLSLPreprocessor() # Reads through PREPROCESS_CACHE by default
+        result = pp.parse_file('shader.vert')
+    """
+
+    # Defaults for the number of entries kept at each level
+    MAX_FILES = 256
+    MAX_OUTPUTS = 256
+
+    def __init__(self, max_files: int = MAX_FILES, max_outputs: int = MAX_OUTPUTS):
+        self.max_files = max_files
+        self.max_outputs = max_outputs
+        self.lines = OrderedDict() # (source, contents) -> list of lexed token lines
+        self.outputs = OrderedDict() # See get_output_key() -> PreprocessedFile
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return '<PreprocessCache(files={}, outputs={}, hits={}, misses={}) object at {}>'.format(
+            len(self.lines),
+            len(self.outputs),
+            self.hits,
+            self.misses,
+            id(self)
+        )
+
+    def get_lines(self, source: str, data: str):
+        key = (source, data)
+        lines = self.lines.get(key)
+        if lines is not None:
+            self.lines.move_to_end(key)
+
+        return lines
+
+    def put_lines(self, source: str, data: str, lines: list):
+        self.lines[(source, data)] = lines
+        while len(self.lines) > self.max_files:
+            self.lines.popitem(last=False)
+
+    def get_output_key(self, pp, filename: str) -> tuple:
+        """Everything about a preprocessor's state that can affect parse_file()
+
+        Parameters:
+            pp (GLSLPreprocessor)
+            filename (str)
+
+        Returns:
+            tuple
+        """
+        macros = []
+        for name, m in pp.macros.items():
+            if name not in VOLATILE_MACROS:
+                macros.append((
+                    name,
+                    ''.join(tok.value for tok in m.value),
+                    tuple(m.arglist) if m.arglist is not None else None,
+                    m.variadic
+                ))
+
+        return (
+            pp.fast,
+            pp.line_directive,
+            pp.compress,
+            tuple(tuple(rewrite) for rewrite in pp.rewrite_paths),
+            os.path.abspath(filename),
+            tuple(pp.path),
+            tuple(sorted(macros)),
+            tuple(sorted(pp.include_once.items()))
+        )
+
+    def get_output(self, key: tuple):
+        """
+        Returns:
+            PreprocessedFile|None: Output still matching the files on disk, or None
+        """
+        entry = self.outputs.get(key)
+        if entry is None or not entry.is_current():
+            self.outputs.pop(key, None)
+            self.misses += 1
+            return None
+
+        self.outputs.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put_output(self, key: tuple, entry: PreprocessedFile):
+        self.outputs[key] = entry
+        while len(self.outputs) > self.max_outputs:
+            self.outputs.popitem(last=False)
+
+    def clear(self):
+        self.lines.clear()
+        self.outputs.clear()
+
+# Shared by every GLSLPreprocessor instance
+PREPROCESS_CACHE = PreprocessCache()
 
 class GLSLPreprocessor(Preprocessor):
-    """Preprocessor directive handling for .glsl files"""
+    """Preprocessor directive handling for .glsl files
+    
+    Files are read through a PreprocessCache, so repeat parses of
+    unchanged files are cheap. Pass `cache=None` to always reprocess.
+
+    With `fast=True` only #include, #pragma once and include guards are
+    resolved, through an IncludeScanner. Macros and conditionals are
+    left for the GLSL compiler, with macros defined before parse_file()
+    inserted as #define directives. Files that can't be resolved without
+    evaluating directives fall back to full preprocessing.
+    """
+
+    def __init__(self, *args, cache: PreprocessCache = PREPROCESS_CACHE, fast: bool = False, **kwargs):
+        super(GLSLPreprocessor, self).__init__(*args, **kwargs)
+        self.cache = cache
+        self.fast = fast
+        self.builtin_macros = set(self.macros)
+        self.includes = []
+        self.dependencies = []
+        self.sources = {} # Absolute path -> contents of every file read
 
     def on_directive_handle(self, directive, toks, ifpassthru, precedingtoks):
         """Allow PCPP to process #include directives, but nothing else"""
@@ -22,20 +192,107 @@ class GLSLPreprocessor(Preprocessor):
     def parse_file(self, filename: str) -> str:
         """Parse an input file and return the processed output as a string"""
         self.add_path(os.path.dirname(os.path.abspath(filename)))
+
+        if self.cache is not None:
+            key = self.cache.get_output_key(self, filename)
+            entry = self.cache.get_output(key)
+            if entry is not None:
+                # Leave the preprocessor as if the file was just parsed
+                self.includes = list(entry.includes)
+                self.dependencies = list(entry.dependencies)
+                self.sources = dict(entry.sources)
+                self.macros = dict(entry.macros)
+                self.include_once = dict(entry.include_once)
+                return entry.result
+
         self.includes = [filename]
+        self.dependencies = [os.path.abspath(filename)]
 
         with open(filename) as f:
             data = f.read()
 
-        # TODO: No stream wrapper here? I don't really need it 
-        # but it was in the example implementations.
-        output = io.StringIO()
-        self.parse(data)
-        self.write(output)
-        result = output.getvalue()
-        output.close()
+        self.sources = { self.dependencies[0]: data }
+
+        result = None
+        if self.fast:
+            result = self.scan_includes(filename, data)
+
+        if result is None:
+            self.parse(data)
+            result = ''.join(self.generate())
+
+        # Errors are reported through return_code rather than raised,
+        # so make sure they're reported again on the next parse
+        if self.cache is not None and self.return_code == 0:
+            self.cache.put_output(key, PreprocessedFile(result, self))
+
         return result
 
+    def scan_includes(self, filename: str, data: str):
+        """Resolve includes of a file through an IncludeScanner
+
+        Returns:
+            str|None: Processed output, or None if the file needs full preprocessing
+        """
+        defines = []
+        for name, m in self.macros.items():
+            if name not in self.builtin_macros:
+                if m.arglist is not None:
+                    return None
+
+                defines.append('{} {}'.format(name, ''.join(tok.value for tok in m.value)))
+
+        include_once = dict(self.include_once)
+        try:
+            return IncludeScanner(self).scan(data, defines)
+        except NeedsEvaluation:
+            # Undo anything the scanner recorded before giving up
+            self.includes = [filename]
+            self.dependencies = self.dependencies[:1]
+            self.sources = { self.dependencies[0]: data }
+            self.include_once = include_once
+            self.temp_path = []
+            return None
+
+    def rewrite_source(self, abssource: str) -> str:
+        """Path of a file as it's reported by PCPP in #line directives"""
+        for rewrite in self.rewrite_paths:
+            rewritten = re.sub(rewrite[0], rewrite[1], abssource)
+            if rewritten != abssource:
+                if os.sep != '/':
+                    rewritten = rewritten.replace(os.sep, '/')
+                return rewritten
+
+        return abssource
+
+    def parsegen(self, input, source=None, abssource=None):
+        """Record every file read through #include as a dependency
+
+        This differs from `includes`, which only lists files that
+        produced output and needed a #line directive.
+        """
+        if abssource and abssource not in self.dependencies:
+            self.dependencies.append(abssource)
+            self.sources[abssource] = input
+
+        return super(GLSLPreprocessor, self).parsegen(input, source, abssource)
+
+    def group_lines(self, input, abssource):
+        """Split input into lines of tokens, reusing the lexed lines of unchanged files"""
+        if self.cache is None:
+            yield from super(GLSLPreprocessor, self).group_lines(input, abssource)
+            return
+
+        lines = self.cache.get_lines(abssource, input)
+        if lines is None:
+            lines = list(super(GLSLPreprocessor, self).group_lines(input, abssource))
+            self.cache.put_lines(abssource, input, lines)
+
+        # Tokens are modified in place while parsing,
+        # so the cached lines are never handed out directly
+        for line in lines:
+            yield [copy_token(tok) for tok in line]
+
     def include_to_id(self, include: str) -> int:
         """Convert an include filename to a unique ID"""
         if include in self.includes:
@@ -49,80 +306,114 @@ class GLSLPreprocessor(Preprocessor):
     #     return self.includes
 
     def write(self, oh):
-        """Duplicate of PCPP Preprocessor.write() but instead generates
-            GLSL-compat #line directives using file IDs instead of strings
+        """Write processed output to the file like stream oh"""
+        for chunk in self.generate():
+            oh.write(chunk)
+
+    def generate(self):
+        """Generate processed output one line at a time
+
+        Equivalent to PCPP's Preprocessor.write() but with GLSL-compat
+        #line directives using file IDs instead of strings. Tokens are
+        batched per line and each line is joined into a single string,
+        so consumers can start on output before the whole file is done.
+
+        Yields:
+            str: Processed output of a line, preceded by any blank lines
+                 or #line directive needed to keep line numbers in sync
         """
+        t_WS = self.t_WS
+        t_SPACE = self.t_SPACE
+        t_COMMENT1 = self.t_COMMENT1
+        ignore = self.ignore
+        compress = self.compress
+        line_directive = self.line_directive
+
         lastlineno = 0
         lastsource = None
-        done = False
         blanklines = 0
-        while not done:
-            emitlinedirective = False
-            toks = []
-            all_ws = True
-            # Accumulate a line
-            while not done:
-                tok = self.token()
-                if not tok:
-                    done = True
-                    break
-                toks.append(tok)
-                if tok.value[0] == '\n':
-                    break
-                if tok.type not in self.t_WS:
-                    all_ws = False
-            if not toks:
+
+        # Output values of the current line. Consecutive whitespace after
+        # the indent is replaced with its last token as the line is read
+        first = None
+        values = []
+        all_ws = True
+        prev_space = False
+
+        tokens = self.parser if self.parser is not None else ()
+        for tok in itertools.chain(tokens, (None,)):
+            if tok is not None:
+                if tok.type in ignore:
+                    continue
+
+                if first is None:
+                    first = tok
+
+                value = tok.value
+                if tok.type in t_SPACE or len(value) == 0:
+                    if not all_ws:
+                        if compress > 0 and value[0] == ' ':
+                            # Collapse a token of many whitespace into single
+                            value = ' '
+                        if prev_space:
+                            values[-1] = value
+                        else:
+                            values.append(value)
+                    else:
+                        values.append(value)
+                    prev_space = True
+                else:
+                    values.append(value)
+                    prev_space = False
+                    if tok.type not in t_WS:
+                        all_ws = False
+
+                if value[0] != '\n':
+                    continue
+            elif first is None:
                 break
+
+            # A full line is accumulated, or the last line of the file
             if all_ws:
-                # Remove preceding whitespace so it becomes just a LF
-                if len(toks) > 1:
-                    tok = toks[-1]
-                    toks = [ tok ]
-                blanklines += toks[0].value.count('\n')
+                # Preceding whitespace is dropped so it becomes just a LF
+                blanklines += values[-1].count('\n')
+                first = None
+                values = []
+                prev_space = False
                 continue
-            # The line in toks is not all whitespace
-            emitlinedirective = (blanklines > 6) and self.line_directive is not None
-            if hasattr(toks[0], 'source'):
-                if lastsource is None:
-                    if toks[0].source is not None:
-                        emitlinedirective = True
-                    lastsource = toks[0].source
-                elif lastsource != toks[0].source:
+
+            emitlinedirective = blanklines > 6 and line_directive is not None
+            source = first.source
+            if lastsource is None:
+                if source is not None:
                     emitlinedirective = True
-                    lastsource = toks[0].source
-            # Replace consecutive whitespace in output with a single space except at any indent
-            first_ws = None
-            for n in range(len(toks)-1, -1, -1):
-                tok = toks[n]
-                if first_ws is None:
-                    if tok.type in self.t_SPACE or len(tok.value) == 0:
-                        first_ws = n
-                else:
-                    if tok.type not in self.t_SPACE and len(tok.value) > 0:
-                        m = n + 1
-                        while m != first_ws:
-                            del toks[m]
-                            first_ws -= 1
-                        first_ws = None
-                        if self.compress > 0:
-                            # Collapse a token of many whitespace into single
-                            if toks[m].value[0] == ' ':
-                                toks[m].value = ' '
-            if not self.compress > 1 and not emitlinedirective:
-                newlinesneeded = toks[0].lineno - lastlineno - 1
-                if newlinesneeded > 6 and self.line_directive is not None:
+                lastsource = source
+            elif lastsource != source:
+                emitlinedirective = True
+                lastsource = source
+
+            if not compress > 1 and not emitlinedirective:
+                newlinesneeded = first.lineno - lastlineno - 1
+                if newlinesneeded > 6 and line_directive is not None:
                     emitlinedirective = True
-                else:
-                    while newlinesneeded > 0:
-                        oh.write('\n')
-                        newlinesneeded -= 1
-            lastlineno = toks[0].lineno
+                elif newlinesneeded > 0:
+                    values.insert(0, '\n' * newlinesneeded)
+
+            lastlineno = first.lineno
             # Account for those newlines in a multiline comment
-            if toks[0].type == self.t_COMMENT1:
-                lastlineno += toks[0].value.count('\n')
-            if emitlinedirective and self.line_directive is not None:
+            if first.type == t_COMMENT1:
+                lastlineno += first.value.count('\n')
+
+            if emitlinedirective and line_directive is not None:
                 lastsource_id = 0 if lastsource is None else self.include_to_id(lastsource)
-                oh.write('{} {} {}\n'.format(self.line_directive, lastlineno, lastsource_id))
+                values.insert(0, '{} {} {}\n'.format(line_directive, lastlineno, lastsource_id))
+
             blanklines = 0
-            for tok in toks:
-                oh.write(tok.value)
+            yield ''.join(values)
+
+            first = None
+            values = []
+            all_ws = True
+            prev_space = False
+
+        self.parser = None
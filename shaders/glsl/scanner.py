@@ -0,0 +1,377 @@
+
+import os
+import re
+
+# Tokens of a line that decide how PCPP's write() spaces its output.
+# Everything else is passed through untouched, so it's lumped into runs
+LINE_TOKEN = re.compile(r'''
+    (?P<ws>[ \t]+)
+    | (?P<block>/\*.*?\*/)
+    | (?P<line>//[^\n]*)
+    | (?P<text>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|[^ \t\n/"']+|.)
+''', re.S | re.X)
+
+DIRECTIVE = re.compile(r'\s*#\s*(\w*)\s*(.*?)\s*$', re.S)
+
+INCLUDE_ARGS = re.compile(r'"([^"]*)"|<([^>]*)>')
+
+IDENTIFIER = re.compile(r'[A-Za-z_]\w*$')
+
+# Characters that need a line to be tokenized rather than copied as-is
+SPECIAL_CHARS = re.compile(r'[/"\']')
+
+class NeedsEvaluation(Exception):
+    """Raised when a file can't be resolved without evaluating directives"""
+    pass
+
+def scan_line(text: str, pos: int) -> tuple:
+    """Tokenize a single line the way PCPP's write() would output it
+
+    Comments become whitespace and every run of whitespace after the
+    indent collapses to its last token. A line comment ends the line
+    early, leaving the real newline as a separate blank line.
+
+    A block comment may continue the line onto following lines.
+
+    Parameters:
+        text (str): Source with each line right-stripped
+        pos (int):  Offset of the start of the line
+
+    Returns:
+        tuple(str|None, int, int): Output text of the line (None if only
+            whitespace), blank lines counted by write(), and the offset
+            of the newline ending the line
+    """
+    values = []
+    is_ws = []
+    has_line_comment = False
+    end = len(text)
+
+    while pos < end and text[pos] != '\n':
+        m = LINE_TOKEN.match(text, pos)
+        kind = m.lastgroup
+        pos = m.end()
+
+        if kind == 'text':
+            values.append(m.group())
+            is_ws.append(False)
+        elif kind == 'ws':
+            values.append(m.group())
+            is_ws.append(True)
+        elif kind == 'block':
+            values.append(' ')
+            is_ws.append(True)
+        else:
+            values.append('\n')
+            is_ws.append(True)
+            has_line_comment = True
+
+    if not has_line_comment:
+        values.append('\n')
+        is_ws.append(True)
+
+    if all(is_ws):
+        return None, 1 + has_line_comment, pos
+
+    # The indent is kept as is
+    out = []
+    i = 0
+    count = len(values)
+    while is_ws[i]:
+        out.append(values[i])
+        i += 1
+
+    while i < count:
+        if is_ws[i]:
+            while i + 1 < count and is_ws[i + 1]:
+                i += 1
+        out.append(values[i])
+        i += 1
+
+    return ''.join(out), int(has_line_comment), pos
+
+def scan_lines(data: str) -> list:
+    """Split a file into output lines, matching PCPP's lexer and write()
+
+    Returns:
+        list(tuple(int, str|None, int)): Line number, output text of each
+            line (None if only whitespace) and blank lines counted by write()
+    """
+    lines = [x.rstrip() for x in data.splitlines()]
+
+    # Lines ending with \ continue onto the next, which is left blank
+    if '\\' in data:
+        for i in range(len(lines)):
+            j = i + 1
+            while lines[i].endswith('\\') and j < len(lines):
+                lines[i] = lines[i][:-1] + lines[j]
+                lines[j] = ''
+                j += 1
+
+    text = None
+    result = []
+    i = 0
+    pos = 0
+    count = len(lines)
+    special = SPECIAL_CHARS.search
+    while i < count:
+        line = lines[i]
+        if not special(line):
+            if line:
+                result.append((i + 1, line + '\n', 0))
+            else:
+                result.append((i + 1, None, 1))
+
+            pos += len(line) + 1
+            i += 1
+            continue
+
+        if text is None:
+            text = '\n'.join(lines)
+
+        content, blanks, end = scan_line(text, pos)
+        result.append((i + 1, content, blanks))
+
+        # Skip lines consumed by a multi-line block comment
+        i += 1 + text.count('\n', pos, end)
+        pos = end + 1
+
+    return result
+
+def find_include_guard(lines: list) -> tuple:
+    """Find an #ifndef/#define/#endif wrapping an entire file
+
+    Leading #pragma once and #version directives are allowed before the guard.
+
+    Parameters:
+        lines (list): Result of scan_lines()
+
+    Returns:
+        tuple(str, set(int))|None: Guard macro and indices of its
+            directive lines, or None if the file isn't guarded
+    """
+    content = [
+        (i, DIRECTIVE.match(line[1]) if '#' in line[1] else None)
+        for i, line in enumerate(lines) if line[1] is not None
+    ]
+
+    start = 0
+    while start < len(content):
+        m = content[start][1]
+        if not m or not (m.group(1) == 'version' or (m.group(1) == 'pragma' and m.group(2).split()[:1] == ['once'])):
+            break
+        start += 1
+
+    if len(content) - start < 3:
+        return None
+
+    ifndef = content[start][1]
+    define = content[start + 1][1]
+    if not ifndef or not define or ifndef.group(1) != 'ifndef' or define.group(1) != 'define':
+        return None
+
+    macro = ifndef.group(2)
+    if not IDENTIFIER.match(macro) or define.group(2) != macro:
+        return None
+
+    # The matching #endif must be the last line of the file
+    depth = 0
+    for n in range(start, len(content)):
+        m = content[n][1]
+        if not m:
+            continue
+
+        if m.group(1) in ('if', 'ifdef', 'ifndef'):
+            depth += 1
+        elif m.group(1) == 'endif':
+            depth -= 1
+            if depth == 0:
+                if n != len(content) - 1:
+                    return None
+
+                return macro, set((content[start][0], content[start + 1][0], content[n][0]))
+
+    return None
+
+class IncludeScanner:
+    """Resolve #include and #pragma once without evaluating anything else
+
+    This is a line based fast path for GLSLPreprocessor. Macros and
+    conditionals are left in the output for the GLSL compiler, while
+    #include, #pragma once, include guards and #version are handled
+    the same as PCPP. Output is spaced identically to PCPP's write(),
+    including #line directives with file IDs, as long as no macros need
+    expanding.
+
+    Anything that can only be resolved through evaluation - such as an
+    #include within a conditional - raises NeedsEvaluation so that the
+    caller can fall back to the full preprocessor.
+
+    Usage:
+        scanner = IncludeScanner(preprocessor)
+        result = scanner.scan(data)
+    """
+
+    def __init__(self, pp):
+        """
+        Parameters:
+            pp (GLSLPreprocessor): Provides include paths, #pragma once
+                                   state and file IDs, and records dependencies
+        """
+        self.pp = pp
+        self.out = []
+        self.lastlineno = 0
+        self.lastsource = None
+        self.blanklines = 0
+
+    def scan(self, data: str, defines: list = None) -> str:
+        """Process the root file
+
+        Parameters:
+            data (str):             Contents of the root file
+            defines (list(str)):    #define directives to insert before the root file
+
+        Returns:
+            str: Processed output
+        """
+        if defines:
+            for define in defines:
+                self.out.append('#define {}\n'.format(define))
+
+            # Force a #line directive on the first line to skip past defines
+            self.lastsource = object()
+
+        self.scan_file(data, None, None)
+        return ''.join(self.out)
+
+    def scan_file(self, data: str, abssource: str, source: str):
+        """
+        Parameters:
+            data (str):         File contents
+            abssource (str):    Absolute path of the file, None for the root
+            source (str):       Path to report in #line directives, None for the root
+        """
+        if '??' in data:
+            # Trigraphs would need replacing first
+            raise NeedsEvaluation('Trigraphs')
+
+        pp = self.pp
+        lines = scan_lines(data)
+
+        guard = None
+        removed = ()
+        if pp.auto_pragma_once_enabled:
+            guard = find_include_guard(lines)
+            if guard:
+                guard, removed = guard
+                if guard in pp.macros:
+                    raise NeedsEvaluation('Include guard {} is already defined'.format(guard))
+
+        depth = 0
+        for i, (lineno, content, blanks) in enumerate(lines):
+            if content is None:
+                self.blanklines += blanks
+                continue
+
+            if i in removed:
+                continue
+
+            m = DIRECTIVE.match(content) if '#' in content else None
+            if m:
+                name = m.group(1)
+                if name == 'include':
+                    if depth > 0:
+                        raise NeedsEvaluation('#include within a conditional')
+                    self.include(m.group(2))
+                    continue
+
+                if name == 'pragma' and m.group(2).split()[:1] == ['once']:
+                    if depth > 0:
+                        raise NeedsEvaluation('#pragma once within a conditional')
+                    pp.include_once[abssource] = None
+                    continue
+
+                if name == 'version' or name == '':
+                    continue
+
+                if name in ('if', 'ifdef', 'ifndef'):
+                    depth += 1
+                elif name == 'endif':
+                    depth -= 1
+                elif name == 'warning':
+                    # Not supported by GLSL
+                    raise NeedsEvaluation('#warning')
+
+            self.write_line(source, lineno, content)
+            self.blanklines += blanks
+
+        if guard:
+            pp.include_once[abssource] = guard
+
+    def include(self, args: str):
+        """Resolve an #include the same as Preprocessor.include()"""
+        pp = self.pp
+
+        m = INCLUDE_ARGS.match(args)
+        if not m:
+            raise NeedsEvaluation('#include {}'.format(args))
+
+        if m.group(1) is not None:
+            filename = m.group(1)
+            path = pp.temp_path + pp.path
+        else:
+            filename = m.group(2)
+            path = pp.path
+
+        for p in path or ['']:
+            fulliname = os.path.abspath(os.path.join(p, filename))
+            if fulliname in pp.include_once:
+                return
+
+            try:
+                with open(fulliname) as f:
+                    data = f.read()
+            except IOError:
+                continue
+
+            if fulliname not in pp.dependencies:
+                pp.dependencies.append(fulliname)
+                pp.sources[fulliname] = data
+
+            dname = os.path.dirname(fulliname)
+            if dname:
+                pp.temp_path.insert(0, dname)
+
+            self.scan_file(data, fulliname, pp.rewrite_source(fulliname))
+
+            if dname:
+                del pp.temp_path[0]
+            return
+
+        # Let the full preprocessor report it
+        raise NeedsEvaluation('Include file {} not found'.format(filename))
+
+    def write_line(self, source: str, lineno: int, content: str):
+        """Same as a non-blank line of Preprocessor.write()"""
+        pp = self.pp
+        emit = self.blanklines > 6 and pp.line_directive is not None
+
+        if source != self.lastsource:
+            emit = True
+            self.lastsource = source
+
+        if not emit:
+            newlines = lineno - self.lastlineno - 1
+            if newlines > 6 and pp.line_directive is not None:
+                emit = True
+            elif newlines > 0:
+                self.out.append('\n' * newlines)
+
+        self.lastlineno = lineno
+
+        if emit and pp.line_directive is not None:
+            source_id = 0 if source is None else pp.include_to_id(source)
+            self.out.append('{} {} {}\n'.format(pp.line_directive, lineno, source_id))
+
+        self.blanklines = 0
+        self.out.append(content)
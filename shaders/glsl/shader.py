@@ -4,11 +4,10 @@ from time import time
 
 from ..base import (
     BaseShader, 
-    ShaderProperties,
-    compile_program
+    ShaderProperties
 )
 
-from .preprocessor import GLSLPreprocessor
+from .preprocess_pool import preprocess
 
 class GLSLShader(BaseShader):
     """Direct GLSL shader from GLSL source files"""
@@ -36,6 +35,11 @@ class GLSLShader(BaseShader):
         self.material_properties.add('float', 'my_float', 'My Float', 'Something about my float', 0.5, 0, 1)
         self.material_properties.add('image', 'diffuse', 'Diffuse', 'Diffuse color channel texture')
 
+        self.diffuse = None
+        self.stages = {}
+        self.includes = {}
+        self.dependencies = {}
+
     def get_properties(self):
         return self.properties
 
@@ -58,8 +62,19 @@ class GLSLShader(BaseShader):
         }
 
         # Monitor each stage file for changes
-        self.watch([f for f in self.stages.values() if f])
+        self.watch(self.get_dependencies())
         
+    def get_dependencies(self) -> list:
+        """Stage files and every file they included during the last compile"""
+        files = [f for f in self.stages.values() if f]
+        for dependencies in self.dependencies.values():
+            files.extend(dependencies)
+
+        return files
+
+    def get_preprocess_jobs(self, key: tuple = ()) -> list:
+        return [(f, key) for f in self.stages.values() if f]
+
     def get_material_properties(self):
         return self.material_properties
 
@@ -76,27 +91,32 @@ class GLSLShader(BaseShader):
         # TODO: Implement as part of the compilation process - somehow.
         # (Probably as a feature of base shader - since everything can do this)
         self.includes = {}
-        
-        preprocessor = GLSLPreprocessor()
+        self.dependencies = {}
 
         for stage, filename in self.stages.items():
             source = None
             if filename:
-                # TODO: Stage defines (e.g. #define VERTEX - useful?)
-                # Would be more useful if there was a single input field
-                source = '#version {}\n{}'.format(
-                    self.COMPAT_VERSION, 
-                    preprocessor.parse_file(filename)
-                )
-                self.includes[stage] = preprocessor.includes
+                # Stages may have already been preprocessed by a CompileQueue
+                job = (filename, ())
+                preprocessed = self.preprocessed.get(job) or preprocess(*job)
+                source = self.get_stage_source(preprocessed)
+                self.includes[stage] = preprocessed.includes
+                self.dependencies[stage] = set(preprocessed.dependencies)
 
             sources[stage] = source
 
-        # We update mtimes first so that if a compilation fails
-        # we can still detect file changes
-        self.update_mtimes()
+        self.declare_keywords_from_sources(sources.values())
+
+        # We clear file changes first so that if a compilation
+        # fails we can still detect file changes. Stages preprocessed
+        # by a CompileQueue were cleared when they were read instead
+        if not self.preprocessed:
+            self.clear_file_changes()
 
-        self.program = compile_program(
+        # Includes are watched as well so that edits to shared files reload
+        self.watch(self.get_dependencies())
+
+        self.link_program(
             sources['vs'], 
             sources['fs'], 
             sources['tcs'], 
@@ -104,22 +124,45 @@ class GLSLShader(BaseShader):
             sources['gs']
         )
 
+    def get_variant_sources(self, key: tuple, preprocessed: dict = None) -> tuple:
+        sources = {}
+        dependencies = set()
+
+        for stage, filename in self.stages.items():
+            source = None
+            if filename:
+                job = (filename, key)
+                stage_result = (preprocessed or {}).get(job) or preprocess(*job)
+                source = self.get_stage_source(stage_result)
+                dependencies.update(stage_result.dependencies)
+
+            sources[stage] = source
+
+        # Files read by every compiled variant, so that a change to an
+        # include used only by some keyword still triggers a reload
+        dependencies.difference_update(self.watched)
+        if dependencies:
+            self.dependencies.setdefault('variants', set()).update(dependencies)
+            self.watch(self.get_dependencies())
+
+        return (sources['vs'], sources['fs'], sources['tcs'], sources['tes'], sources['gs'])
+
+    def get_stage_source(self, preprocessed) -> str:
+        """Compilable source of a PreprocessedStage"""
+        # TODO: Stage defines (e.g. #define VERTEX - useful?)
+        # Would be more useful if there was a single input field
+        return '#version {}\n{}'.format(
+            self.COMPAT_VERSION, 
+            preprocessed.result
+        )
+
+    def get_textures(self) -> tuple:
+        return (self.diffuse,) if self.diffuse else ()
+
     def bind_textures(self):
         # TODO: WIP
         if self.diffuse:
-            print('binding diffuse', self.diffuse.bindcode)
             self.bind_texture(0, 'diffuse', self.diffuse)
-        else:
-            print('no diffuse')
-
-    def bind(self, render_pass: str):
-        """Bind the GL program for the given pass
-        
-        Properties:
-            render_pass (str): Pass name. E.g. `Shadow`, `Main`
-        """
-        super(GLSLShader, self).bind(render_pass)
-        self.bind_textures()
 
     def set_lighting(self, lighting):
         """Copy lighting information into shader uniforms
@@ -131,58 +174,29 @@ class GLSLShader(BaseShader):
         like shadows, light cookies, etc. Nor does it try to calculate per-object
         light arrays to support a ridiculous number of lights. 
 
+        Programs using the shared `LightData` block read lighting from the
+        per-frame UBO instead, so nothing needs to be set per material.
+
         Parameters:
             lighting (SceneLighting): Current scene lighting information
         """
-        limit = self.MAX_ADDITIONAL_LIGHTS
-
-        positions = [0] * (limit * 4)
-        directions = [0] * (limit * 4)
-        colors = [0] * (limit * 4)
-        attenuations = [0] * (limit * 4)
-
-        # Feed lights into buffers
-        i = 0
-        for light in lighting.additional_lights.values():
-            # print('Light', i)
-            v = light.position
-            # print('    Position', v)
-            positions[i * 4] = v[0]
-            positions[i * 4 + 1] = v[1]
-            positions[i * 4 + 2] = v[2]
-            positions[i * 4 + 3] = v[3]
-            
-            v = light.direction
-            # print('    Direction', v)
-            directions[i * 4] = v[0]
-            directions[i * 4 + 1] = v[1]
-            directions[i * 4 + 2] = v[2]
-            directions[i * 4 + 3] = v[3]
-
-            v = light.color
-            # print('    Color', v)
-            colors[i * 4] = v[0]
-            colors[i * 4 + 1] = v[1]
-            colors[i * 4 + 2] = v[2]
-            colors[i * 4 + 3] = v[3]
-
-            v = light.attenuation
-            # print('    Attenuation', v)
-            attenuations[i * 4] = v[0]
-            attenuations[i * 4 + 1] = v[1]
-            attenuations[i * 4 + 2] = v[2]
-            attenuations[i * 4 + 3] = v[3]
-
-            i += 1
-        
+        if 'LightData' in self.uniform_blocks:
+            return
+
+        # Rows of the light table are already packed as vec4s, 
+        # so slices can be uploaded directly
+        table = lighting.additional_lights
+        count = min(table.count, self.MAX_ADDITIONAL_LIGHTS)
+
         if lighting.main_light:
             self.set_vec4("_MainLightDirection", lighting.main_light.direction)
             self.set_vec4("_MainLightColor", lighting.main_light.color)
 
-        self.set_int("_AdditionalLightsCount", i)
-        self.set_vec4_array("_AdditionalLightsPosition", positions)
-        self.set_vec4_array("_AdditionalLightsColor", colors)
-        self.set_vec4_array("_AdditionalLightsSpotDir", directions)
-        self.set_vec4_array("_AdditionalLightsAttenuation", attenuations)
+        self.set_int("_AdditionalLightsCount", count)
+        if count > 0:
+            self.set_vec4_array("_AdditionalLightsPosition", table.positions[:count].reshape(-1))
+            self.set_vec4_array("_AdditionalLightsColor", table.colors[:count].reshape(-1))
+            self.set_vec4_array("_AdditionalLightsSpotDir", table.directions[:count].reshape(-1))
+            self.set_vec4_array("_AdditionalLightsAttenuation", table.attenuations[:count].reshape(-1))
         
         self.set_vec3("_AmbientColor", lighting.ambient_color)
@@ -46,7 +46,7 @@ class OGSFXShader(BaseShader):
     def compile(self):
         # For now, uses fallback
         self.program = compile_program(VS_FALLBACK, FS_FALLBACK)
-        self.update_mtimes()
+        self.clear_file_changes()
 
         # Pretend some settings have loaded from the .ogsfx
         props = self.get_material_properties()
@@ -60,6 +60,9 @@ class OGSFXShader(BaseShader):
         self.view_matrix = view_matrix
         self.projection_matrix = projection_matrix
 
+        if 'CameraData' in self.uniform_blocks:
+            return
+
         self.set_mat4("ViewMatrix", view_matrix.transposed())
         self.set_mat4("ProjectionMatrix", projection_matrix.transposed())
         self.set_mat4("CameraMatrix", view_matrix.inverted().transposed())
@@ -1,6 +1,6 @@
 
 import re
-from ply import lex
+from libs.ply import lex
 
 # Varying attributes for vertex streams
 varying_attributes = (
@@ -67,10 +67,6 @@ tokens = varying_attributes + tuple(keywords.values()) + (
     'GLSL',
 )
 
-states = (
-   ('glsl','exclusive'),
-)
-
 t_LBRACE = r'\{'
 t_RBRACE = r'\}'
 t_LPAREN  = r'\('
@@ -84,6 +80,36 @@ t_COMMA = r','
 t_COLON = r':'
 t_SEMI = r';'
 
+# Anything within a GLSL block that could hide a brace from matching
+GLSL_BLOCK_TOKEN = re.compile(r'''
+    [{}]
+    | //[^\n]*
+    | /\*.*?\*/
+    | "(?:[^"\\\n]|\\.)*"
+''', re.S | re.X)
+
+def find_closing_brace(data: str, pos: int) -> int:
+    """Find the } closing a block, skipping over comments and strings
+
+    Parameters:
+        data (str): Lexer input
+        pos (int):  Offset just after the block's opening {
+
+    Returns:
+        int: Offset of the closing }, or -1 if the block is never closed
+    """
+    depth = 1
+    for m in GLSL_BLOCK_TOKEN.finditer(data, pos):
+        c = m.group()
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return m.start()
+
+    return -1
+
 # Constants
 t_STRING_CONST = r'\"([^\\\n]|(\\.))*?\"'
 
@@ -126,45 +152,27 @@ def t_newline(t):
     r'\n+'
     t.lexer.lineno += len(t.value)
 
-def t_begin_glsl(t):
+def t_GLSL(t):
     r'GLSLShader\s+[A-Za-z_][A-Za-z0-9_]*\s*\{'
-    t.lexer.glsl_begin = t.lexer.lexpos
-    t.lexer.brace_level = 1
-    t.lexer.begin('glsl')
-    
-    # TODO: Better way to extract this?
-    match = re.match(
-        r'GLSLShader\s+([A-Za-z_][A-Za-z0-9_]*)\s*\{',
-        t.value,
-        re.MULTILINE
-    )
-    t.lexer.glsl_name = match.group(1)
-    
-    #t.type = 'ID'
-    #t.value = t.value[0]
-    #return t
-
-def t_glsl_lbrace(t):
-    r'\{'
-    t.lexer.brace_level += 1
-
-def t_glsl_rbrace(t):
-    r'\}'
-    t.lexer.brace_level -= 1
-    if t.lexer.brace_level == 0:
-        t.value = (
-            t.lexer.glsl_name, 
-            t.lexer.lexdata[t.lexer.glsl_begin:t.lexer.lexpos-1]
-        )
-        t.type = 'GLSL'
-        t.lexer.lineno += t.value.count('\n')
-        t.lexer.begin('INITIAL')
-        return t 
-
-def t_glsl_nonspace(t):
-    r'[^\s]+'
-
-t_glsl_ignore = ' \t\n'
+    lexer = t.lexer
+    name = t.value[10:-1].strip()
+    lexer.lineno += t.value.count('\n')
+    t.lineno = lexer.lineno
+
+    # The block is captured whole rather than lexed, since it's only
+    # handed to the GLSL compiler as-is
+    begin = lexer.lexpos
+    end = find_closing_brace(lexer.lexdata, begin)
+    if end < 0:
+        print('Unterminated GLSL block `{}`'.format(name))
+        lexer.lexpos = lexer.lexlen
+        return None
+
+    code = lexer.lexdata[begin:end]
+    t.value = (name, code)
+    lexer.lineno += code.count('\n')
+    lexer.lexpos = end + 1
+    return t
 
 # Identifiers
 def t_ID(t):
@@ -183,12 +191,27 @@ def t_error(t):
     t.lexer.skip(1)
 
 
-# Build the lexer
-lexer = lex.lex() #debug=False)
+# Built on first use rather than on import
+_lexer = None
+
+def get_lexer():
+    """Return a clone of the shared lexer, ready for new input"""
+    global _lexer
+    if _lexer is None:
+        _lexer = lex.lex()
+
+    lexer = _lexer.clone()
+    lexer.lineno = 1
+    return lexer
+
+def __getattr__(name):
+    # `lexer` used to be built on import
+    if name == 'lexer':
+        return get_lexer()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 if __name__ == '__main__':
-    # Build the lexer
-    lexer = lex.lex()
+    lexer = get_lexer()
     
     with open('test.ogsfx') as f:
         data = f.read()
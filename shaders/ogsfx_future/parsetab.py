@@ -1,123 +0,0 @@
-
-# parsetab.py
-# This file is automatically generated. Do not edit.
-# pylint: disable=W,C,R
-_tabversion = '3.10'
-
-_lr_method = 'LALR'
-
-_lr_signature = 'ATTRIBUTE BINORMAL BOOL BOOL_CONST COLON COLOR COLOR0 COMMA COMMENT CPPCOMMENT EQ FLOAT FLOAT_CONST GEOMETRYSHADER GLSL GT ID IN INT INT_CONST LBRACE LBRACKET LPAREN LT MAT3 MAT4 NORMAL OUT PASS PIXELSHADER POSITION PREPROCESSOR RANGE RBRACE RBRACKET RPAREN SAMPLER2D SAMPLER_STATE SEMI STRING STRING_CONST TANGENT TECHNIQUE TESSCONTROLSHADER TESSEVALSHADER TEXCOORD0 TEXCOORD1 TEXCOORD2 TEXCOORD3 TEXCOORD4 TEXCOORD5 TEXCOORD6 TEXCOORD7 TEXTURE TEXTURE2D UNIFORM VEC2 VEC3 VEC4 VERTEXSHADERshader : block_listblock_list   : block\n                    | block_list blockblock : GLSLblock    : technique\n                | uniform\n                | attribute_structtechnique : TECHNIQUE ID annotations_opt LBRACE pass_list RBRACEpass : PASS ID annotations_opt LBRACE stage_list RBRACEpass_list    : pass\n                    | pass_list passid_list  : ID\n                | id_list COMMA IDshader_id_list   : ID\n                        | LBRACE id_list RBRACEstage_name   : VERTEXSHADER\n                    | TESSCONTROLSHADER\n                    | TESSEVALSHADER\n                    | GEOMETRYSHADER\n                    | PIXELSHADERstage_argument   : IN ID ID\n                        | OUT ID IDstage_argument   : IN ID\n                        | OUT IDstage : stage_name LPAREN stage_argument COMMA stage_argument RPAREN EQ shader_id_list SEMIstage_list   : stage\n                    | stage_list stageempty :type_specifier   : FLOAT \n                        | INT\n                        | VEC2\n                        | VEC3\n                        | VEC4\n                        | MAT3\n                        | MAT4\n                        | TEXTURE2D\n                        | SAMPLER2Dnumber   : INT_CONST\n                | FLOAT_CONSTconstant_vec2 : LBRACE number COMMA number RBRACEconstant_vec3 : LBRACE number COMMA number COMMA number RBRACEconstant_vec4 : LBRACE number COMMA number COMMA number COMMA number RBRACEsampler_state : SAMPLER_STATE LBRACE TEXTURE EQ LT ID GT SEMI RBRACEconstant : number\n                | constant_vec2\n                | constant_vec3\n                | constant_vec4\n                | sampler_stateannotation_constant : number\n                            | STRING_CONST\n                            | BOOL_CONST\n                            | constant_vec2\n                            | constant_vec3\n                            | constant_vec4uniform  : UNIFORM type_specifier ID annotations_opt SEMI\n                | UNIFORM type_specifier ID annotations_opt EQ constant SEMIuniform  : UNIFORM type_specifier ID COLON ID SEMI\n                | UNIFORM type_specifier ID COLON ID EQ constant SEMIinput_specifier  : POSITION\n                        | NORMAL \n                        | TANGENT \n                        | BINORMAL\n                        | COLOR0 \n                        | TEXCOORD0 \n                        | TEXCOORD1 \n                        | TEXCOORD2 \n                        | TEXCOORD3 \n                        | TEXCOORD4 \n                        | TEXCOORD5 \n                        | TEXCOORD6 \n                        | TEXCOORD7attribute : type_specifier ID COLON input_specifier SEMIattribute_list   : attribute\n                        | attribute_list attributeattribute_list_opt   : attribute_list\n                            | emptyattribute_struct : ATTRIBUTE ID LBRACE attribute_list_opt RBRACE SEMIannotation_type_specifier    : STRING\n                                    | INT\n                                    | FLOAT\n                                    | BOOLannotation : annotation_type_specifier ID annotation_args_opt EQ annotation_constant SEMIannotation : annotation_type_specifier ID annotation_args_opt SEMIannotation_list  : annotation\n                        | annotation_list annotationannotations_opt  : empty\n                        | LT annotation_list GTannotation_ui_specifier : COLORannotation_ui_specifier : RANGE LPAREN number COMMA number RPARENannotation_args : LPAREN STRING_CONST RPARENannotation_args : LPAREN STRING_CONST COMMA annotation_ui_specifier RPARENannotation_args_opt  : annotation_argsannotation_args_opt : empty'
-    
-_lr_action_items = {'GLSL':([0,2,3,4,5,6,7,11,50,56,73,75,81,111,],[4,4,-2,-4,-5,-6,-7,-3,-55,-8,-57,-77,-56,-58,]),'TECHNIQUE':([0,2,3,4,5,6,7,11,50,56,73,75,81,111,],[8,8,-2,-4,-5,-6,-7,-3,-55,-8,-57,-77,-56,-58,]),'UNIFORM':([0,2,3,4,5,6,7,11,50,56,73,75,81,111,],[9,9,-2,-4,-5,-6,-7,-3,-55,-8,-57,-77,-56,-58,]),'ATTRIBUTE':([0,2,3,4,5,6,7,11,50,56,73,75,81,111,],[10,10,-2,-4,-5,-6,-7,-3,-55,-8,-57,-77,-56,-58,]),'$end':([1,2,3,4,5,6,7,11,50,56,73,75,81,111,],[0,-1,-2,-4,-5,-6,-7,-3,-55,-8,-57,-77,-56,-58,]),'ID':([8,10,13,14,15,16,17,18,19,20,21,22,32,33,34,35,36,38,43,46,134,136,137,142,143,158,161,166,],[12,23,27,-29,-30,-31,-32,-33,-34,-35,-36,-37,49,-78,-79,-80,-81,52,55,58,140,142,143,149,150,160,164,167,]),'FLOAT':([9,26,28,30,31,40,42,48,54,79,112,121,],[14,35,14,35,-84,14,-73,-85,-74,-83,-72,-82,]),'INT':([9,26,28,30,31,40,42,48,54,79,112,121,],[15,34,15,34,-84,15,-73,-85,-74,-83,-72,-82,]),'VEC2':([9,28,40,42,54,112,],[16,16,16,-73,-74,-72,]),'VEC3':([9,28,40,42,54,112,],[17,17,17,-73,-74,-72,]),'VEC4':([9,28,40,42,54,112,],[18,18,18,-73,-74,-72,]),'MAT3':([9,28,40,42,54,112,],[19,19,19,-73,-74,-72,]),'MAT4':([9,28,40,42,54,112,],[20,20,20,-73,-74,-72,]),'TEXTURE2D':([9,28,40,42,54,112,],[21,21,21,-73,-74,-72,]),'SAMPLER2D':([9,28,40,42,54,112,],[22,22,22,-73,-74,-72,]),'LT':([12,27,58,126,],[26,26,26,134,]),'LBRACE':([12,23,24,25,47,51,58,72,74,77,78,158,],[-28,28,29,-86,-87,71,-28,83,71,99,71,161,]),'SEMI':([25,27,37,47,49,52,53,59,60,61,63,64,65,66,67,68,69,70,84,85,86,87,88,89,90,91,92,93,94,95,96,97,98,100,101,102,103,104,105,106,107,130,133,146,147,156,157,159,160,165,],[-86,-28,50,-87,-28,73,75,79,-92,-93,81,-44,-45,-46,-47,-48,-38,-39,111,112,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-70,-71,121,-49,-50,-51,-52,-53,-54,-90,-91,-40,-41,153,-42,-43,162,-14,-15,]),'EQ':([25,27,37,47,49,52,59,60,61,107,110,130,154,],[-86,-28,51,-87,-28,74,78,-92,-93,-90,126,-91,158,]),'STRING':([26,30,31,48,79,121,],[33,33,-84,-85,-83,-82,]),'BOOL':([26,30,31,48,79,121,],[36,36,-84,-85,-83,-82,]),'COLON':([27,55,],[38,76,]),'RBRACE':([28,39,40,41,42,44,45,54,57,69,70,112,113,114,125,127,128,139,152,153,162,163,164,167,],[-28,53,-75,-76,-73,56,-10,-74,-11,-38,-39,-72,127,-26,133,-9,-27,146,156,157,-25,165,-12,-13,]),'PASS':([29,44,45,57,127,],[46,46,-10,-11,-9,]),'GT':([30,31,48,79,121,140,],[47,-84,-85,-83,-82,147,]),'LPAREN':([49,115,116,117,118,119,120,124,],[62,129,-16,-17,-18,-19,-20,131,]),'INT_CONST':([51,71,74,78,109,131,132,144,145,],[69,69,69,69,69,69,69,69,69,]),'FLOAT_CONST':([51,71,74,78,109,131,132,144,145,],[70,70,70,70,70,70,70,70,70,]),'SAMPLER_STATE':([51,74,],[72,72,]),'STRING_CONST':([62,78,],[80,102,]),'COMMA':([69,70,80,82,125,135,138,139,142,143,149,150,163,164,167,],[-38,-39,108,109,132,141,144,145,-23,-24,-21,-22,166,-12,-13,]),'RPAREN':([69,70,80,122,123,142,143,148,149,150,151,155,],[-38,-39,107,130,-88,-23,-24,154,-21,-22,155,-89,]),'POSITION':([76,],[86,]),'NORMAL':([76,],[87,]),'TANGENT':([76,],[88,]),'BINORMAL':([76,],[89,]),'COLOR0':([76,],[90,]),'TEXCOORD0':([76,],[91,]),'TEXCOORD1':([76,],[92,]),'TEXCOORD2':([76,],[93,]),'TEXCOORD3':([76,],[94,]),'TEXCOORD4':([76,],[95,]),'TEXCOORD5':([76,],[96,]),'TEXCOORD6':([76,],[97,]),'TEXCOORD7':([76,],[98,]),'BOOL_CONST':([78,],[103,]),'TEXTURE':([83,],[110,]),'VERTEXSHADER':([99,113,114,128,162,],[116,116,-26,-27,-25,]),'TESSCONTROLSHADER':([99,113,114,128,162,],[117,117,-26,-27,-25,]),'TESSEVALSHADER':([99,113,114,128,162,],[118,118,-26,-27,-25,]),'GEOMETRYSHADER':([99,113,114,128,162,],[119,119,-26,-27,-25,]),'PIXELSHADER':([99,113,114,128,162,],[120,120,-26,-27,-25,]),'COLOR':([108,],[123,]),'RANGE':([108,],[124,]),'IN':([129,141,],[136,136,]),'OUT':([129,141,],[137,137,]),}
-
-_lr_action = {}
-for _k, _v in _lr_action_items.items():
-   for _x,_y in zip(_v[0],_v[1]):
-      if not _x in _lr_action:  _lr_action[_x] = {}
-      _lr_action[_x][_k] = _y
-del _lr_action_items
-
-_lr_goto_items = {'shader':([0,],[1,]),'block_list':([0,],[2,]),'block':([0,2,],[3,11,]),'technique':([0,2,],[5,5,]),'uniform':([0,2,],[6,6,]),'attribute_struct':([0,2,],[7,7,]),'type_specifier':([9,28,40,],[13,43,43,]),'annotations_opt':([12,27,58,],[24,37,77,]),'empty':([12,27,28,49,58,],[25,25,41,61,25,]),'annotation_list':([26,],[30,]),'annotation':([26,30,],[31,48,]),'annotation_type_specifier':([26,30,],[32,32,]),'attribute_list_opt':([28,],[39,]),'attribute_list':([28,],[40,]),'attribute':([28,40,],[42,54,]),'pass_list':([29,],[44,]),'pass':([29,44,],[45,57,]),'annotation_args_opt':([49,],[59,]),'annotation_args':([49,],[60,]),'constant':([51,74,],[63,84,]),'number':([51,71,74,78,109,131,132,144,145,],[64,82,64,101,125,138,139,151,152,]),'constant_vec2':([51,74,78,],[65,65,104,]),'constant_vec3':([51,74,78,],[66,66,105,]),'constant_vec4':([51,74,78,],[67,67,106,]),'sampler_state':([51,74,],[68,68,]),'input_specifier':([76,],[85,]),'annotation_constant':([78,],[100,]),'stage_list':([99,],[113,]),'stage':([99,113,],[114,128,]),'stage_name':([99,113,],[115,115,]),'annotation_ui_specifier':([108,],[122,]),'stage_argument':([129,141,],[135,148,]),'shader_id_list':([158,],[159,]),'id_list':([161,],[163,]),}
-
-_lr_goto = {}
-for _k, _v in _lr_goto_items.items():
-   for _x, _y in zip(_v[0], _v[1]):
-       if not _x in _lr_goto: _lr_goto[_x] = {}
-       _lr_goto[_x][_k] = _y
-del _lr_goto_items
-_lr_productions = [
-  ("S' -> shader","S'",1,None,None,None),
-  ('shader -> block_list','shader',1,'p_shader','parser.py',11),
-  ('block_list -> block','block_list',1,'p_block_list','parser.py',17),
-  ('block_list -> block_list block','block_list',2,'p_block_list','parser.py',18),
-  ('block -> GLSL','block',1,'p_block_glsl','parser.py',22),
-  ('block -> technique','block',1,'p_block','parser.py',27),
-  ('block -> uniform','block',1,'p_block','parser.py',28),
-  ('block -> attribute_struct','block',1,'p_block','parser.py',29),
-  ('technique -> TECHNIQUE ID annotations_opt LBRACE pass_list RBRACE','technique',6,'p_technique','parser.py',33),
-  ('pass -> PASS ID annotations_opt LBRACE stage_list RBRACE','pass',6,'p_pass','parser.py',40),
-  ('pass_list -> pass','pass_list',1,'p_pass_list','parser.py',47),
-  ('pass_list -> pass_list pass','pass_list',2,'p_pass_list','parser.py',48),
-  ('id_list -> ID','id_list',1,'p_id_list','parser.py',52),
-  ('id_list -> id_list COMMA ID','id_list',3,'p_id_list','parser.py',53),
-  ('shader_id_list -> ID','shader_id_list',1,'p_shader_id_list','parser.py',57),
-  ('shader_id_list -> LBRACE id_list RBRACE','shader_id_list',3,'p_shader_id_list','parser.py',58),
-  ('stage_name -> VERTEXSHADER','stage_name',1,'p_stage_name','parser.py',62),
-  ('stage_name -> TESSCONTROLSHADER','stage_name',1,'p_stage_name','parser.py',63),
-  ('stage_name -> TESSEVALSHADER','stage_name',1,'p_stage_name','parser.py',64),
-  ('stage_name -> GEOMETRYSHADER','stage_name',1,'p_stage_name','parser.py',65),
-  ('stage_name -> PIXELSHADER','stage_name',1,'p_stage_name','parser.py',66),
-  ('stage_argument -> IN ID ID','stage_argument',3,'p_stage_argument','parser.py',72),
-  ('stage_argument -> OUT ID ID','stage_argument',3,'p_stage_argument','parser.py',73),
-  ('stage_argument -> IN ID','stage_argument',2,'p_stage_argument_untyped','parser.py',81),
-  ('stage_argument -> OUT ID','stage_argument',2,'p_stage_argument_untyped','parser.py',82),
-  ('stage -> stage_name LPAREN stage_argument COMMA stage_argument RPAREN EQ shader_id_list SEMI','stage',9,'p_stage','parser.py',90),
-  ('stage_list -> stage','stage_list',1,'p_stage_list','parser.py',98),
-  ('stage_list -> stage_list stage','stage_list',2,'p_stage_list','parser.py',99),
-  ('empty -> <empty>','empty',0,'p_empty','parser.py',103),
-  ('type_specifier -> FLOAT','type_specifier',1,'p_type_specifier','parser.py',107),
-  ('type_specifier -> INT','type_specifier',1,'p_type_specifier','parser.py',108),
-  ('type_specifier -> VEC2','type_specifier',1,'p_type_specifier','parser.py',109),
-  ('type_specifier -> VEC3','type_specifier',1,'p_type_specifier','parser.py',110),
-  ('type_specifier -> VEC4','type_specifier',1,'p_type_specifier','parser.py',111),
-  ('type_specifier -> MAT3','type_specifier',1,'p_type_specifier','parser.py',112),
-  ('type_specifier -> MAT4','type_specifier',1,'p_type_specifier','parser.py',113),
-  ('type_specifier -> TEXTURE2D','type_specifier',1,'p_type_specifier','parser.py',114),
-  ('type_specifier -> SAMPLER2D','type_specifier',1,'p_type_specifier','parser.py',115),
-  ('number -> INT_CONST','number',1,'p_number','parser.py',119),
-  ('number -> FLOAT_CONST','number',1,'p_number','parser.py',120),
-  ('constant_vec2 -> LBRACE number COMMA number RBRACE','constant_vec2',5,'p_constant_vec2','parser.py',124),
-  ('constant_vec3 -> LBRACE number COMMA number COMMA number RBRACE','constant_vec3',7,'p_constant_vec3','parser.py',128),
-  ('constant_vec4 -> LBRACE number COMMA number COMMA number COMMA number RBRACE','constant_vec4',9,'p_constant_vec4','parser.py',132),
-  ('sampler_state -> SAMPLER_STATE LBRACE TEXTURE EQ LT ID GT SEMI RBRACE','sampler_state',9,'p_sampler_state','parser.py',136),
-  ('constant -> number','constant',1,'p_constant','parser.py',142),
-  ('constant -> constant_vec2','constant',1,'p_constant','parser.py',143),
-  ('constant -> constant_vec3','constant',1,'p_constant','parser.py',144),
-  ('constant -> constant_vec4','constant',1,'p_constant','parser.py',145),
-  ('constant -> sampler_state','constant',1,'p_constant','parser.py',146),
-  ('annotation_constant -> number','annotation_constant',1,'p_annotation_constant','parser.py',150),
-  ('annotation_constant -> STRING_CONST','annotation_constant',1,'p_annotation_constant','parser.py',151),
-  ('annotation_constant -> BOOL_CONST','annotation_constant',1,'p_annotation_constant','parser.py',152),
-  ('annotation_constant -> constant_vec2','annotation_constant',1,'p_annotation_constant','parser.py',153),
-  ('annotation_constant -> constant_vec3','annotation_constant',1,'p_annotation_constant','parser.py',154),
-  ('annotation_constant -> constant_vec4','annotation_constant',1,'p_annotation_constant','parser.py',155),
-  ('uniform -> UNIFORM type_specifier ID annotations_opt SEMI','uniform',5,'p_uniform','parser.py',160),
-  ('uniform -> UNIFORM type_specifier ID annotations_opt EQ constant SEMI','uniform',7,'p_uniform','parser.py',161),
-  ('uniform -> UNIFORM type_specifier ID COLON ID SEMI','uniform',6,'p_uniform_with_alias','parser.py',170),
-  ('uniform -> UNIFORM type_specifier ID COLON ID EQ constant SEMI','uniform',8,'p_uniform_with_alias','parser.py',171),
-  ('input_specifier -> POSITION','input_specifier',1,'p_input_specifier','parser.py',180),
-  ('input_specifier -> NORMAL','input_specifier',1,'p_input_specifier','parser.py',181),
-  ('input_specifier -> TANGENT','input_specifier',1,'p_input_specifier','parser.py',182),
-  ('input_specifier -> BINORMAL','input_specifier',1,'p_input_specifier','parser.py',183),
-  ('input_specifier -> COLOR0','input_specifier',1,'p_input_specifier','parser.py',184),
-  ('input_specifier -> TEXCOORD0','input_specifier',1,'p_input_specifier','parser.py',185),
-  ('input_specifier -> TEXCOORD1','input_specifier',1,'p_input_specifier','parser.py',186),
-  ('input_specifier -> TEXCOORD2','input_specifier',1,'p_input_specifier','parser.py',187),
-  ('input_specifier -> TEXCOORD3','input_specifier',1,'p_input_specifier','parser.py',188),
-  ('input_specifier -> TEXCOORD4','input_specifier',1,'p_input_specifier','parser.py',189),
-  ('input_specifier -> TEXCOORD5','input_specifier',1,'p_input_specifier','parser.py',190),
-  ('input_specifier -> TEXCOORD6','input_specifier',1,'p_input_specifier','parser.py',191),
-  ('input_specifier -> TEXCOORD7','input_specifier',1,'p_input_specifier','parser.py',192),
-  ('attribute -> type_specifier ID COLON input_specifier SEMI','attribute',5,'p_attribute','parser.py',196),
-  ('attribute_list -> attribute','attribute_list',1,'p_attribute_list','parser.py',204),
-  ('attribute_list -> attribute_list attribute','attribute_list',2,'p_attribute_list','parser.py',205),
-  ('attribute_list_opt -> attribute_list','attribute_list_opt',1,'p_attribute_list_opt','parser.py',209),
-  ('attribute_list_opt -> empty','attribute_list_opt',1,'p_attribute_list_opt','parser.py',210),
-  ('attribute_struct -> ATTRIBUTE ID LBRACE attribute_list_opt RBRACE SEMI','attribute_struct',6,'p_attribute_struct','parser.py',214),
-  ('annotation_type_specifier -> STRING','annotation_type_specifier',1,'p_annotation_type_specifier','parser.py',221),
-  ('annotation_type_specifier -> INT','annotation_type_specifier',1,'p_annotation_type_specifier','parser.py',222),
-  ('annotation_type_specifier -> FLOAT','annotation_type_specifier',1,'p_annotation_type_specifier','parser.py',223),
-  ('annotation_type_specifier -> BOOL','annotation_type_specifier',1,'p_annotation_type_specifier','parser.py',224),
-  ('annotation -> annotation_type_specifier ID annotation_args_opt EQ annotation_constant SEMI','annotation',6,'p_annotation','parser.py',228),
-  ('annotation -> annotation_type_specifier ID annotation_args_opt SEMI','annotation',4,'p_annotation_no_const','parser.py',240),
-  ('annotation_list -> annotation','annotation_list',1,'p_annotation_list','parser.py',252),
-  ('annotation_list -> annotation_list annotation','annotation_list',2,'p_annotation_list','parser.py',253),
-  ('annotations_opt -> empty','annotations_opt',1,'p_annotations_opt','parser.py',257),
-  ('annotations_opt -> LT annotation_list GT','annotations_opt',3,'p_annotations_opt','parser.py',258),
-  ('annotation_ui_specifier -> COLOR','annotation_ui_specifier',1,'p_annotation_ui_specifier','parser.py',262),
-  ('annotation_ui_specifier -> RANGE LPAREN number COMMA number RPAREN','annotation_ui_specifier',6,'p_annotation_ui_specifier_range','parser.py',266),
-  ('annotation_args -> LPAREN STRING_CONST RPAREN','annotation_args',3,'p_annotation_args','parser.py',270),
-  ('annotation_args -> LPAREN STRING_CONST COMMA annotation_ui_specifier RPAREN','annotation_args',5,'p_annotation_args_with_ui_modifier','parser.py',274),
-  ('annotation_args_opt -> annotation_args','annotation_args_opt',1,'p_annotation_args_opt','parser.py',278),
-  ('annotation_args_opt -> empty','annotation_args_opt',1,'p_annotations_args_opt_empty','parser.py',282),
-]
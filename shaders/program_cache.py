@@ -0,0 +1,260 @@
+
+import os
+import time
+import struct
+import hashlib
+import numpy as np
+import bgl
+from bgl import *
+
+class ProgramCache:
+    """Persistent cache of linked program binaries on disk.
+
+    Programs are keyed by a hash of every fully preprocessed stage source,
+    the attribute bindings applied before linking, and the GL vendor,
+    renderer and version strings. Driver updates therefore produce new keys,
+    and any stored binary the driver still refuses to load is deleted and
+    treated as a miss. Stale entries age out through evict().
+
+    Each file is a small header (magic, binary format) followed by the
+    raw output of glGetProgramBinary.
+
+    The directory is only scanned by the first store() of a session, after
+    which its total size is tracked in memory. Later stores only scan it
+    again once that total goes over `max_bytes`.
+
+    Usage:
+        cache = ProgramCache()
+        key = cache.key(sources, ATTRIBUTE_LOCATIONS)
+
+        program = cache.load(key)
+        if not program:
+            program = # ... compile and link ...
+            cache.store(key, program)
+    """
+
+    MAGIC = b'SPPB'
+    HEADER = struct.Struct('<4sI')
+    EXTENSION = '.bin'
+
+    # Defaults for evict()
+    MAX_BYTES = 64 * 1024 * 1024
+    MAX_AGE = 30 * 24 * 60 * 60
+
+    def __init__(self, directory: str = None, max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE):
+        """
+        Parameters:
+            directory (str):    Where to store binaries. Defaults to `~/.cache/scratchpad/programs`
+            max_bytes (int):    Total size of stored binaries to keep
+            max_age (float):    Seconds since last use before a binary is removed
+        """
+        self.directory = directory or os.path.join(
+            os.path.expanduser('~'), '.cache', 'scratchpad', 'programs'
+        )
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._supported = None
+        self._driver = None
+        self.size = None # Total bytes stored, None until the first evict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return '<ProgramCache(directory={}, hits={}, misses={}) object at {}>'.format(
+            self.directory,
+            self.hits,
+            self.misses,
+            id(self)
+        )
+
+    @property
+    def is_supported(self) -> bool:
+        """Whether bgl exposes program binaries and the driver supports a format"""
+        if self._supported is None:
+            self._supported = False
+            if hasattr(bgl, 'glProgramBinary') and hasattr(bgl, 'glGetProgramBinary'):
+                formats = Buffer(GL_INT, 1)
+                glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS, formats)
+                self._supported = formats[0] > 0
+
+        return self._supported
+
+    def get_driver(self) -> str:
+        """Identity of the current GL implementation, included in every key"""
+        if self._driver is None:
+            self._driver = '\n'.join(
+                str(glGetString(flag)) for flag in (GL_VENDOR, GL_RENDERER, GL_VERSION)
+            )
+
+        return self._driver
+
+    def key(self, sources: tuple, attributes: dict) -> str:
+        """Hash everything that affects the linked program
+
+        Parameters:
+            sources (tuple(str)):   Preprocessed source per stage, None for unused stages
+            attributes (dict):      Attribute name -> location bound before linking
+
+        Returns:
+            str: Hex digest to use as the cache key
+        """
+        h = hashlib.sha256()
+        h.update(self.get_driver().encode('utf-8'))
+
+        for name, location in sorted(attributes.items()):
+            h.update('{}={};'.format(name, location).encode('utf-8'))
+
+        # Stage separators keep e.g. (vs + fs, None) distinct from (vs, fs)
+        for src in sources:
+            h.update(b'\0' if src is None else b'\1' + src.encode('utf-8'))
+            h.update(b'\0')
+
+        return h.hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+    def load(self, key: str) -> int:
+        """Create a program from a stored binary
+
+        Returns:
+            int: Linked GL program, or 0 on a miss
+        """
+        if not self.is_supported:
+            return 0
+
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                contents = f.read()
+        except OSError:
+            self.misses += 1
+            return 0
+
+        program = 0
+        if len(contents) > self.HEADER.size:
+            magic, binary_format = self.HEADER.unpack_from(contents)
+            if magic == self.MAGIC:
+                program = self.create_program(binary_format, contents[self.HEADER.size:])
+
+        if not program:
+            # Corrupt, or rejected by an updated driver
+            self.remove(path)
+            self.misses += 1
+            return 0
+
+        # Mark as recently used for evict()
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return program
+
+    def create_program(self, binary_format: int, binary: bytes) -> int:
+        data = np.frombuffer(binary, dtype=np.int8).copy()
+        buffer = Buffer(GL_BYTE, len(data), data)
+
+        program = glCreateProgram()
+        glProgramBinary(program, binary_format, buffer, len(data))
+
+        link_ok = Buffer(GL_INT, 1)
+        glGetProgramiv(program, GL_LINK_STATUS, link_ok)
+        if link_ok[0] != True:
+            glDeleteProgram(program)
+            return 0
+
+        return program
+
+    def prepare(self, program: int):
+        """Hint that a program's binary will be retrieved. Call before linking"""
+        if self.is_supported:
+            glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+
+    def store(self, key: str, program: int):
+        """Write the binary of a successfully linked program to disk"""
+        if not self.is_supported:
+            return
+
+        length = Buffer(GL_INT, 1)
+        glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH, length)
+        if length[0] < 1:
+            return
+
+        data = np.empty(length[0], dtype=np.int8)
+        buffer = Buffer(GL_BYTE, len(data), data)
+        written = Buffer(GL_INT, 1)
+        binary_format = Buffer(GL_INT, 1)
+        glGetProgramBinary(program, len(data), written, binary_format, buffer)
+
+        path = self.get_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Write then rename, so that a concurrent Blender
+            # session never reads a partially written file
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, binary_format[0]))
+                f.write(data[:written[0]].tobytes())
+
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print('Failed to write program cache {}: {}'.format(path, e))
+            self.remove(tmp_path)
+            return
+
+        if self.size is not None:
+            self.size += self.HEADER.size + written[0]
+
+        if self.size is None or self.size > self.max_bytes:
+            self.evict()
+
+    def remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self, now: float = None):
+        """Remove binaries unused for `max_age` seconds, then the least
+        recently used until the total size is within `max_bytes`
+
+        Lists and stats the whole directory, so store() only calls this
+        when the size tracked in memory is unknown or over budget.
+        """
+        now = time.time() if now is None else now
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        entries = []
+        for name in names:
+            if not name.endswith(self.EXTENSION):
+                continue
+
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            if now - stat.st_mtime > self.max_age:
+                self.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            self.remove(path)
+            total -= size
+
+        self.size = total
@@ -1,7 +1,7 @@
 
 import os 
 from libs.ply import yacc
-from .lexer import tokens
+from .lexer import tokens, get_lexer
 from .shader import *
 
 # First rule is starting symbol
@@ -178,9 +178,26 @@ def p_error(p):
         return
 
     for i in range(0, 10):
-        tok = parser.token()
+        tok = get_parser().token()
         if not tok: break 
         print(tok.value)
 
-# Build the parser
-parser = yacc.yacc()
+# Built on first use rather than on import
+_parser = None
+
+def get_parser():
+    """Return the shared parser, building its tables on first use"""
+    global _parser
+    if _parser is None:
+        _parser = yacc.yacc()
+    return _parser
+
+def parse(data: str) -> ScribbleShader:
+    """Parse a shader file with its own lexer"""
+    return get_parser().parse(data, lexer=get_lexer())
+
+def __getattr__(name):
+    # `parser` used to be built on import
+    if name == 'parser':
+        return get_parser()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
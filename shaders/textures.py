@@ -0,0 +1,674 @@
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import bpy
+import bgl
+from bgl import *
+
+# Optional. Images that can be read straight from disk skip
+# decoding through Blender's image buffers on the main thread
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+# Sampler state shared by textures without their own settings, as (filter, wrap)
+DEFAULT_SAMPLER = ('LINEAR', 'REPEAT')
+
+def get_sampler_parameters(sampler: tuple) -> list:
+    """GL sampler parameters for a (filter, wrap) pair
+
+    Parameters:
+        sampler (tuple(str)): Filter of `LINEAR` or `CLOSEST` and
+                              wrap of `REPEAT`, `EXTEND` or `CLIP`,
+                              matching Blender's image texture node
+
+    Returns:
+        list(tuple(int, int)): (pname, value) pairs for glSamplerParameteri
+    """
+    filter, wrap = sampler
+
+    if filter == 'CLOSEST':
+        min_filter, mag_filter = GL_NEAREST_MIPMAP_NEAREST, GL_NEAREST
+    else:
+        min_filter, mag_filter = GL_LINEAR_MIPMAP_LINEAR, GL_LINEAR
+
+    wrap = {
+        'REPEAT': GL_REPEAT,
+        'EXTEND': GL_CLAMP_TO_EDGE,
+        'CLIP': GL_CLAMP_TO_BORDER,
+    }[wrap]
+
+    return [
+        (GL_TEXTURE_MIN_FILTER, min_filter),
+        (GL_TEXTURE_MAG_FILTER, mag_filter),
+        (GL_TEXTURE_WRAP_S, wrap),
+        (GL_TEXTURE_WRAP_T, wrap),
+    ]
+
+def get_image_signature(image) -> tuple:
+    """Image state that requires a new upload when changed
+
+    Size and pixel format aren't included since reading them forces
+    Blender to decode the image. Changes to those come with a depsgraph
+    update that invalidates the texture instead.
+    """
+    return (
+        image.source,
+        image.filepath_raw,
+        image.colorspace_settings.name
+    )
+
+def get_mip_bytes(width: int, height: int, bytes_per_texel: int) -> int:
+    """Size of a texture including its full mip chain"""
+    total = 0
+    while True:
+        total += width * height * bytes_per_texel
+        if width == 1 and height == 1:
+            return total
+
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+
+def get_mip_size(width: int, height: int, level: int) -> tuple:
+    return max(1, width >> level), max(1, height >> level)
+
+class DecodedImage:
+    """Pixels of an image converted for upload
+
+    Attributes:
+        pixels (np.ndarray):        Shape (height, width * 4), bottom row first.
+                                    uint8 for 8-bit images, float16 for float images
+        width (int)
+        height (int)
+        is_float (bool)
+        placeholder (np.ndarray):   Downsampled pixels for mip `placeholder_level`,
+                                    or None if the image is already small
+        placeholder_level (int)
+    """
+    def __init__(self, pixels: np.ndarray, width: int, height: int, is_float: bool, max_placeholder_size: int):
+        self.pixels = pixels
+        self.width = width
+        self.height = height
+        self.is_float = is_float
+        self.placeholder = None
+        self.placeholder_level = 0
+
+        level = 0
+        while max(get_mip_size(width, height, level)) > max_placeholder_size:
+            level += 1
+
+        if level > 0:
+            self.placeholder_level = level
+            self.placeholder = downsample(pixels, width, height, level)
+
+    @property
+    def row_bytes(self) -> int:
+        return self.pixels.strides[0]
+
+def downsample(pixels: np.ndarray, width: int, height: int, level: int) -> np.ndarray:
+    """Box filter pixels down to the size of a mip level
+
+    Returns:
+        np.ndarray: Same dtype as `pixels`, shape (mip height, mip width * 4)
+    """
+    scale = 1 << level
+    w, h = get_mip_size(width, height, level)
+
+    # Odd edges are cropped, and scale is clamped for very thin images
+    sx = min(scale, width // w)
+    sy = min(scale, height // h)
+
+    block = pixels.reshape(height, width, 4)[:h * sy, :w * sx]
+    block = block.reshape(h, sy, w, sx, 4).astype(np.float32).mean(axis=(1, 3))
+
+    if pixels.dtype == np.uint8:
+        block += 0.5
+
+    return block.astype(pixels.dtype).reshape(h, w * 4)
+
+def convert_pixels(pixels: np.ndarray, width: int, height: int, is_float: bool, max_placeholder_size: int) -> DecodedImage:
+    """Convert float RGBA read from `bpy.types.Image.pixels` to a compact format"""
+    if is_float:
+        data = pixels.astype(np.float16)
+    else:
+        data = (np.clip(pixels, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+    return DecodedImage(data.reshape(height, width * 4), width, height, is_float, max_placeholder_size)
+
+def decode_file(filepath: str, max_placeholder_size: int) -> DecodedImage:
+    """Read an 8-bit image file directly from disk
+
+    Returns:
+        DecodedImage|None: None if the file has more than 8 bits per channel
+                           and needs Blender to decode it instead
+    """
+    with PILImage.open(filepath) as im:
+        if im.mode not in ('1', 'L', 'LA', 'P', 'PA', 'RGB', 'RGBA', 'CMYK', 'YCbCr'):
+            return None
+
+        width, height = im.size
+        rgba = np.asarray(im.convert('RGBA'), dtype=np.uint8)
+
+    # Blender and GL both expect the bottom row first
+    pixels = np.ascontiguousarray(rgba[::-1]).reshape(height, width * 4)
+    return DecodedImage(pixels, width, height, False, max_placeholder_size)
+
+def get_decode_path(image) -> str:
+    """Path to read an image from without Blender, if possible
+
+    Returns:
+        str|None
+    """
+    if PILImage is None or image.source != 'FILE' or image.packed_file or image.is_dirty:
+        return None
+
+    return bpy.path.abspath(image.filepath_raw, library=image.library)
+
+class GPUTexture:
+    """GL texture with a full mip chain owned by the TextureManager
+
+    Attributes:
+        texture_id (int)
+        width (int)
+        height (int)
+        vram (int): Estimated bytes used on the GPU, including mips
+        signature (tuple): Image state at the time of the last upload
+        last_used (int): Frame this texture was last bound for drawing
+        sampler (tuple): Sampler state applied to the texture itself,
+                         when sampler objects are unsupported
+        stream (TextureStream): Upload still in progress, if any
+        needs_blender_decode (bool): Whether the image file couldn't be read directly
+    """
+    def __init__(self):
+        buf = Buffer(GL_INT, 1)
+        glGenTextures(1, buf)
+        self.texture_id = buf[0]
+        self.width = 0
+        self.height = 0
+        self.vram = 0
+        self.signature = None
+        self.last_used = 0
+        self.sampler = None
+        self.stream = None
+        self.needs_blender_decode = False
+
+    def __repr__(self):
+        return '<GPUTexture(texture_id={}, size={}x{}, vram={}, streaming={}) object at {}>'.format(
+            self.texture_id,
+            self.width,
+            self.height,
+            self.vram,
+            self.stream is not None,
+            id(self)
+        )
+
+    def get_format(self, is_float: bool) -> tuple:
+        """(internal format, data type, Buffer type, bytes per texel) for uploads"""
+        if is_float:
+            return GL_RGBA16F, GL_HALF_FLOAT, GL_SHORT, 8
+
+        return GL_RGBA8, GL_UNSIGNED_BYTE, GL_BYTE, 4
+
+    def allocate(self, width: int, height: int, is_float: bool):
+        """Allocate storage for every mip level without uploading pixels"""
+        internal_format, data_type, buffer_type, bytes_per_texel = self.get_format(is_float)
+
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        level = 0
+        while True:
+            w, h = get_mip_size(width, height, level)
+            glTexImage2D(GL_TEXTURE_2D, level, internal_format, w, h, 0, GL_RGBA, data_type, None)
+            if w == 1 and h == 1:
+                break
+            level += 1
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        self.width = width
+        self.height = height
+        self.vram = get_mip_bytes(width, height, bytes_per_texel)
+
+    def upload_rows(self, level: int, pixels: np.ndarray, is_float: bool, first_row: int, count: int):
+        """Copy rows of an array into a mip level
+
+        Parameters:
+            level (int):            Mip level to write into
+            pixels (np.ndarray):    Shape (rows, width * 4), as in DecodedImage
+            is_float (bool)
+            first_row (int):        First row of `pixels` to copy
+            count (int):            Number of rows to copy
+        """
+        internal_format, data_type, buffer_type, bytes_per_texel = self.get_format(is_float)
+        rows = pixels[first_row:first_row + count].reshape(-1)
+        width = pixels.shape[1] // 4
+
+        buffer = Buffer(buffer_type, rows.size, rows.view(np.int16 if is_float else np.int8))
+
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glTexSubImage2D(GL_TEXTURE_2D, level, 0, first_row, width, count, GL_RGBA, data_type, buffer)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def set_base_level(self, level: int):
+        """Restrict sampling to mips from `level` down, and regenerate those below it"""
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, level)
+        glGenerateMipmap(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def upload(self, decoded: DecodedImage):
+        """Replace the texture with decoded pixels and regenerate mips"""
+        self.allocate(decoded.width, decoded.height, decoded.is_float)
+        self.upload_rows(0, decoded.pixels, decoded.is_float, 0, decoded.height)
+        self.set_base_level(0)
+
+    def destroy(self):
+        glDeleteTextures(1, Buffer(GL_INT, 1, [self.texture_id]))
+        self.texture_id = 0
+        self.vram = 0
+        self.stream = None
+
+class TextureStream:
+    """Decode and upload of an image in progress
+
+    Attributes:
+        future (concurrent.futures.Future): Resolves to a DecodedImage,
+                                            or None if Blender has to decode it
+        decoded (DecodedImage): Result of `future`, once resolved
+        next_row (int): First row of the full resolution image not yet uploaded
+    """
+    def __init__(self, future):
+        self.future = future
+        self.decoded = None
+        self.next_row = 0
+
+class TextureManager:
+    """GPU textures for every `bpy.types.Image` drawn by material shaders
+
+    Images are uploaded into textures owned by the manager, rather than
+    Blender's own bindcode, so that mips can be generated and memory
+    tracked. A texture is re-uploaded when the image is invalidated by
+    a depsgraph update or its signature (source, path, etc) changes.
+
+    In the viewport, images are streamed so that loading them never stalls
+    drawing. A worker pool decodes files directly when possible, otherwise
+    pixels are read from Blender (at most MAX_READS_PER_FRAME per frame)
+    and only converted on the pool. Pixels are kept at 8 bits or half float
+    per channel. A small placeholder mip is uploaded and sampled first, then
+    the full image is uploaded in row chunks within `upload_budget` bytes
+    per frame. Final renders upload every texture immediately instead.
+
+    Sampler states are shared sampler objects bound per texture unit.
+    Drivers without sampler objects in bgl get the same state applied
+    to each texture instead.
+
+    Textures not drawn in the current frame are deleted in least recently
+    drawn order whenever the total VRAM estimate exceeds `budget`.
+
+    Usage:
+        # Start of each frame. Streams continue uploading here
+        TEXTURE_MANAGER.begin_frame(budget, upload_budget)
+
+        # While drawing
+        TEXTURE_MANAGER.bind(unit, image, ('LINEAR', 'REPEAT'))
+
+        # After all passes
+        TEXTURE_MANAGER.unbind_samplers()
+        TEXTURE_MANAGER.evict()
+
+        if TEXTURE_MANAGER.is_streaming:
+            # ... redraw to continue uploads ...
+    """
+
+    DEFAULT_BUDGET = 1024 * 1024 * 1024
+
+    # Largest dimension of the mip uploaded while the full image streams in
+    PLACEHOLDER_SIZE = 64
+
+    # Images read through Blender on the main thread per streamed frame
+    MAX_READS_PER_FRAME = 1
+
+    DECODE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+    # Shown while an image decodes for the first time, and for images that fail
+    LOADING_COLOR = (0.5, 0.5, 0.5, 1.0)
+    ERROR_COLOR = (1.0, 0.0, 1.0, 1.0)
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        """
+        Parameters:
+            budget (int): Bytes of texture memory to keep resident
+        """
+        self.budget = budget
+        self.upload_budget = None
+        self.textures = OrderedDict() # Image pointer -> GPUTexture, least recently drawn first
+        self.samplers = {} # (filter, wrap) -> GL sampler object
+        self.bound_samplers = set() # Texture units with a sampler object bound
+        self.executor = None
+        self.frame = 0
+        self.reads = 0
+        self.vram = 0
+        self.uploads = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return '<TextureManager(textures={}, vram={}, budget={}, uploads={}, evictions={}) object at {}>'.format(
+            len(self.textures),
+            self.vram,
+            self.budget,
+            self.uploads,
+            self.evictions,
+            id(self)
+        )
+
+    @property
+    def supports_sampler_objects(self) -> bool:
+        return hasattr(bgl, 'glGenSamplers') and hasattr(bgl, 'glBindSampler')
+
+    @property
+    def is_streaming(self) -> bool:
+        """Whether any texture is still decoding or uploading"""
+        return any(t.stream is not None for t in self.textures.values())
+
+    def get_key(self, image) -> int:
+        return image.as_pointer()
+
+    def begin_frame(self, budget: int = None, upload_budget: int = None):
+        """Start tracking textures drawn in a new frame and continue streaming uploads
+
+        Parameters:
+            budget (int):           Optional new budget, in bytes
+            upload_budget (int):    Bytes to upload per frame for streamed textures.
+                                    None uploads every texture in full when first bound
+        """
+        self.frame += 1
+        self.reads = 0
+        self.upload_budget = upload_budget
+        if budget is not None:
+            self.budget = budget
+
+        self.update_streams()
+
+    def invalidate(self, image):
+        """Force a re-upload of an image the next time it is bound"""
+        texture = self.textures.get(self.get_key(image))
+        if texture:
+            texture.signature = None
+
+    def acquire(self, image) -> GPUTexture:
+        """Get a texture for an image, starting an upload if it's out of date
+
+        Parameters:
+            image (bpy.types.Image)
+
+        Returns:
+            GPUTexture: May still hold a placeholder or previous pixels while streaming
+        """
+        key = self.get_key(image)
+        texture = self.textures.get(key)
+        if texture is None:
+            texture = GPUTexture()
+            self.textures[key] = texture
+        else:
+            self.textures.move_to_end(key)
+
+        signature = get_image_signature(image)
+        is_stale = texture.signature != signature
+
+        if self.upload_budget is None:
+            # Final renders need full resolution, even if still streaming
+            if is_stale or texture.stream:
+                self.upload(texture, image)
+                texture.signature = signature
+        elif is_stale and self.start_stream(texture, image):
+            texture.signature = signature
+
+        texture.last_used = self.frame
+        return texture
+
+    def read_pixels(self, image) -> tuple:
+        """Read float RGBA pixels of an image through Blender. Main thread only
+
+        Returns:
+            tuple(np.ndarray, int, int): Pixels, width and height, or None
+                                         for images without any pixels
+        """
+        width, height = image.size
+        if width < 1 or height < 1:
+            return None
+
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        return pixels, width, height
+
+    def upload(self, texture: GPUTexture, image):
+        """Decode and upload every mip of an image immediately"""
+        texture.stream = None
+
+        decoded = None
+        path = get_decode_path(image)
+        if path:
+            try:
+                decoded = decode_file(path, self.PLACEHOLDER_SIZE)
+            except OSError:
+                pass
+
+        if decoded is None:
+            read = self.read_pixels(image)
+            if read:
+                decoded = convert_pixels(*read, image.is_float, self.PLACEHOLDER_SIZE)
+
+        self.vram -= texture.vram
+        if decoded:
+            texture.upload(decoded)
+        else:
+            self.upload_color(texture, self.ERROR_COLOR)
+        self.vram += texture.vram
+        self.uploads += 1
+
+    def upload_color(self, texture: GPUTexture, color: tuple):
+        """Fill a texture with a single texel"""
+        decoded = convert_pixels(np.array(color, dtype=np.float32), 1, 1, False, 1)
+        texture.upload(decoded)
+
+    def start_stream(self, texture: GPUTexture, image) -> bool:
+        """Begin decoding an image on the worker pool
+
+        Returns:
+            bool: False if this frame is out of main thread reads. Try again next frame
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.DECODE_WORKERS,
+                thread_name_prefix='ScratchpadTextureDecode'
+            )
+
+        path = None if texture.needs_blender_decode else get_decode_path(image)
+
+        if path:
+            future = self.executor.submit(decode_file, path, self.PLACEHOLDER_SIZE)
+        else:
+            if self.reads >= self.MAX_READS_PER_FRAME:
+                return False
+
+            self.reads += 1
+            read = self.read_pixels(image)
+            if read is None:
+                self.vram -= texture.vram
+                self.upload_color(texture, self.ERROR_COLOR)
+                self.vram += texture.vram
+                texture.stream = None
+                return True
+
+            future = self.executor.submit(
+                convert_pixels, *read, image.is_float, self.PLACEHOLDER_SIZE
+            )
+
+        # Keep sampling previous pixels on reload, or a flat color on first load
+        if texture.vram < 1:
+            self.upload_color(texture, self.LOADING_COLOR)
+            self.vram += texture.vram
+
+        texture.stream = TextureStream(future)
+        return True
+
+    def update_streams(self):
+        """Upload decoded pixels of streamed textures within `upload_budget`
+
+        At least one chunk is uploaded per frame so that textures with
+        rows larger than the whole budget still make progress.
+        """
+        remaining = self.upload_budget
+        uploaded = False
+
+        for texture in self.textures.values():
+            stream = texture.stream
+            if not stream:
+                continue
+
+            if stream.decoded is None:
+                if not stream.future.done():
+                    continue
+
+                try:
+                    decoded = stream.future.result()
+                except Exception as e:
+                    print('Failed to decode texture: {}'.format(e))
+                    self.vram -= texture.vram
+                    self.upload_color(texture, self.ERROR_COLOR)
+                    self.vram += texture.vram
+                    texture.stream = None
+                    continue
+
+                if decoded is None:
+                    # Read through Blender on the next acquire() instead
+                    texture.needs_blender_decode = True
+                    texture.stream = None
+                    texture.signature = None
+                    continue
+
+                self.begin_upload(texture, decoded)
+                stream.decoded = decoded
+
+            if remaining is not None and uploaded and remaining < 1:
+                continue
+
+            decoded = stream.decoded
+            count = decoded.height - stream.next_row
+            if remaining is not None:
+                count = min(count, max(1, remaining // decoded.row_bytes))
+                remaining -= count * decoded.row_bytes
+
+            texture.upload_rows(0, decoded.pixels, decoded.is_float, stream.next_row, count)
+            stream.next_row += count
+            uploaded = True
+
+            if stream.next_row >= decoded.height:
+                texture.set_base_level(0)
+                texture.stream = None
+                self.uploads += 1
+
+    def begin_upload(self, texture: GPUTexture, decoded: DecodedImage):
+        """Allocate a texture for decoded pixels and sample its placeholder mip until complete"""
+        self.vram -= texture.vram
+        texture.allocate(decoded.width, decoded.height, decoded.is_float)
+        self.vram += texture.vram
+
+        level = decoded.placeholder_level
+        if level > 0:
+            texture.upload_rows(level, decoded.placeholder, decoded.is_float, 0, decoded.placeholder.shape[0])
+
+        texture.set_base_level(level)
+
+    def get_sampler(self, sampler: tuple) -> int:
+        """Shared sampler object for a (filter, wrap) pair"""
+        sampler_id = self.samplers.get(sampler)
+        if sampler_id is None:
+            buf = Buffer(GL_INT, 1)
+            glGenSamplers(1, buf)
+            sampler_id = buf[0]
+            for pname, value in get_sampler_parameters(sampler):
+                glSamplerParameteri(sampler_id, pname, value)
+
+            self.samplers[sampler] = sampler_id
+
+        return sampler_id
+
+    def bind(self, unit: int, image, sampler: tuple = DEFAULT_SAMPLER):
+        """Bind an image's texture and sampler state to a texture unit
+
+        Parameters:
+            unit (int):                 Offset from GL_TEXTURE0
+            image (bpy.types.Image)
+            sampler (tuple(str)):       (filter, wrap) as accepted by get_sampler_parameters()
+        """
+        texture = self.acquire(image)
+
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, texture.texture_id)
+
+        if self.supports_sampler_objects:
+            glBindSampler(unit, self.get_sampler(sampler))
+            self.bound_samplers.add(unit)
+        elif texture.sampler != sampler:
+            for pname, value in get_sampler_parameters(sampler):
+                glTexParameteri(GL_TEXTURE_2D, pname, value)
+            texture.sampler = sampler
+
+    def unbind_samplers(self):
+        """Unbind sampler objects so they don't override the state
+        of textures bound to the same units outside of the manager"""
+        for unit in self.bound_samplers:
+            glBindSampler(unit, 0)
+
+        self.bound_samplers.clear()
+
+    def evict(self):
+        """Delete least recently drawn textures until within budget
+
+        Textures drawn this frame are kept even when over budget.
+        """
+        for key in list(self.textures.keys()):
+            if self.vram <= self.budget:
+                break
+
+            texture = self.textures[key]
+            if texture.last_used >= self.frame:
+                break
+
+            del self.textures[key]
+            self.vram -= texture.vram
+            texture.destroy()
+            self.evictions += 1
+
+    def shutdown(self):
+        """Stop decoding. Pending results are discarded"""
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+        for texture in self.textures.values():
+            if texture.stream:
+                texture.stream = None
+                texture.signature = None
+
+    def destroy(self):
+        """Delete every texture and sampler object"""
+        self.shutdown()
+
+        for texture in self.textures.values():
+            texture.destroy()
+
+        for sampler_id in self.samplers.values():
+            glDeleteSamplers(1, Buffer(GL_INT, 1, [sampler_id]))
+
+        self.textures = OrderedDict()
+        self.samplers = {}
+        self.bound_samplers = set()
+        self.vram = 0
+
+# Shared by every shader instance
+TEXTURE_MANAGER = TextureManager()
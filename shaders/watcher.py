@@ -0,0 +1,322 @@
+
+import os
+import sys
+import time
+import struct
+import select
+import weakref
+import threading
+import ctypes
+import ctypes.util
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Editors either rewrite a file in place (close) or write a temporary
+# and rename it over the original (moved to), so directories are watched
+# rather than the inodes of individual files
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct('iIII')
+
+def load_inotify():
+    """Load inotify functions from libc
+
+    Returns:
+        ctypes.CDLL|None: libc, or None if inotify is unavailable on this platform
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher:
+    """Shared watcher for every source file that shaders were compiled from
+
+    A background thread waits on inotify for writes to the directories
+    containing watched files. Where inotify is unavailable (non-Linux, or
+    out of watches) files are instead stat'd on the same thread every
+    STAT_INTERVAL seconds against their cached mtimes. Either way, nothing
+    touches the disk from the UI thread.
+
+    Changes are held until no further events arrive for DEBOUNCE_TIME
+    seconds, so that an editor writing a file in several steps results in
+    a single reload. dispatch() then flags only the shaders depending on
+    the changed files through `has_file_changes`.
+
+    Shaders are referenced weakly and drop out of the watcher once freed.
+
+    Usage:
+        FILE_WATCHER.watch(shader, ['a.vert', 'a.frag', 'common.glsl'])
+
+        # From a timer on the UI thread
+        for shader in FILE_WATCHER.dispatch():
+            # ... shader.has_file_changes is now True ...
+    """
+
+    # Seconds without events before a change is dispatched
+    DEBOUNCE_TIME = 0.1
+
+    # Seconds between stat() passes over files without inotify
+    STAT_INTERVAL = 0.5
+
+    def __init__(self, use_inotify: bool = True):
+        """
+        Parameters:
+            use_inotify (bool): Use inotify if available, rather than stat polling
+        """
+        self.lock = threading.Lock()
+        self.thread = None
+        self.is_running = False
+
+        self.files = weakref.WeakKeyDictionary() # BaseShader -> set of watched paths
+        self.dependents = {} # Path -> WeakSet of BaseShader
+        self.changes = {} # Path -> time of the most recent event
+
+        # Incremented whenever dispatch() flags any shaders
+        self.generation = 0
+
+        # inotify watch descriptors per directory containing watched files
+        self.libc = load_inotify() if use_inotify else None
+        self.fd = -1
+        self.directories = {} # Directory -> watch descriptor
+        self.descriptors = {} # Watch descriptor -> directory
+
+        # Files that could not be covered by inotify, with their last mtime
+        self.mtimes = {} # Path -> mtime, or None if missing
+
+    def __repr__(self):
+        return '<FileWatcher(files={}, directories={}, polled={}) object at {}>'.format(
+            len(self.dependents),
+            len(self.directories),
+            len(self.mtimes),
+            id(self)
+        )
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.fd > -1
+
+    def watch(self, shader, files: list):
+        """Replace the files a shader depends on
+
+        This is cheap when the files are unchanged from the previous call.
+
+        Parameters:
+            shader (BaseShader)
+            files (list[str]): Every file the shader was compiled from
+        """
+        paths = set(os.path.abspath(f) for f in files)
+
+        with self.lock:
+            previous = self.files.get(shader, set())
+            if paths == previous:
+                return
+
+            self.files[shader] = paths
+
+            for path in previous - paths:
+                dependents = self.dependents.get(path)
+                if dependents is not None:
+                    dependents.discard(shader)
+
+            for path in paths - previous:
+                if path not in self.dependents:
+                    self.dependents[path] = weakref.WeakSet()
+                    self.add_path(path)
+
+                self.dependents[path].add(shader)
+
+            self.remove_unused_paths()
+
+        self.start()
+
+    def unwatch(self, shader):
+        """Stop monitoring files for a shader"""
+        self.watch(shader, [])
+
+    def add_path(self, path: str):
+        """Start monitoring a path through inotify or, failing that, stat. Lock must be held"""
+        directory = os.path.dirname(path)
+
+        if directory not in self.directories and self.open_inotify():
+            wd = self.libc.inotify_add_watch(self.fd, directory.encode('utf-8'), WATCH_MASK)
+            if wd > -1:
+                self.directories[directory] = wd
+                self.descriptors[wd] = directory
+
+        if directory not in self.directories:
+            self.mtimes[path] = self.stat(path)
+
+    def remove_unused_paths(self):
+        """Forget paths without any live dependents. Lock must be held"""
+        unused = [path for path, dependents in self.dependents.items() if len(dependents) < 1]
+        for path in unused:
+            del self.dependents[path]
+            self.changes.pop(path, None)
+            self.mtimes.pop(path, None)
+
+        used = set(os.path.dirname(path) for path in self.dependents)
+        for directory in [d for d in self.directories if d not in used]:
+            wd = self.directories.pop(directory)
+            self.descriptors.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def open_inotify(self) -> bool:
+        if self.fd < 0 and self.libc:
+            self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self.fd < 0:
+                # Don't retry for every path
+                self.libc = None
+
+        return self.fd > -1
+
+    def stat(self, path: str):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def start(self):
+        if self.thread is None:
+            self.is_running = True
+            self.thread = threading.Thread(
+                target=self.run,
+                name='Scratchpad FileWatcher',
+                daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        """Stop the background thread and release all inotify watches"""
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        with self.lock:
+            if self.fd > -1:
+                os.close(self.fd)
+                self.fd = -1
+
+            self.directories = {}
+            self.descriptors = {}
+
+    def run(self):
+        """Background thread loop collecting changes from inotify and stat"""
+        last_stat = time.monotonic()
+
+        while self.is_running:
+            if self.uses_inotify:
+                readable, _, _ = select.select([self.fd], [], [], self.STAT_INTERVAL)
+                if readable:
+                    self.read_events()
+            else:
+                time.sleep(self.STAT_INTERVAL)
+
+            now = time.monotonic()
+            if now - last_stat >= self.STAT_INTERVAL:
+                last_stat = now
+                self.stat_polled_paths()
+
+    def read_events(self):
+        """Record changes to watched files from pending inotify events"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError:
+            return
+
+        now = time.monotonic()
+        offset = 0
+        with self.lock:
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+
+                directory = self.descriptors.get(wd)
+                if directory is None:
+                    continue
+
+                if mask & IN_IGNORED:
+                    # Directory itself was removed. Fall back to stat
+                    # for its files until something watches them again
+                    del self.descriptors[wd]
+                    del self.directories[directory]
+                    for path in self.dependents:
+                        if os.path.dirname(path) == directory:
+                            self.mtimes[path] = None
+                            self.changes[path] = now
+                    continue
+
+                path = os.path.join(directory, name)
+                if path in self.dependents:
+                    self.changes[path] = now
+
+    def stat_polled_paths(self):
+        """Record changes to files not covered by inotify"""
+        with self.lock:
+            paths = list(self.mtimes.items())
+
+        if not paths:
+            return
+
+        # Disk access happens outside of the lock so that watch()
+        # and dispatch() never wait on a slow filesystem
+        mtimes = [(path, prev, self.stat(path)) for path, prev in paths]
+
+        now = time.monotonic()
+        with self.lock:
+            for path, prev, mtime in mtimes:
+                if mtime != prev and path in self.mtimes:
+                    self.mtimes[path] = mtime
+                    self.changes[path] = now
+
+    def dispatch(self) -> set:
+        """Flag shaders depending on files that have settled since changing
+
+        Returns:
+            set[BaseShader]: Shaders newly flagged with `has_file_changes`
+        """
+        if not self.changes:
+            return set()
+
+        now = time.monotonic()
+        shaders = set()
+
+        with self.lock:
+            settled = [
+                path for path, when in self.changes.items()
+                if now - when >= self.DEBOUNCE_TIME
+            ]
+
+            for path in settled:
+                del self.changes[path]
+                shaders.update(self.dependents.get(path, ()))
+
+        for shader in shaders:
+            shader.has_file_changes = True
+
+        if shaders:
+            self.generation += 1
+
+        return shaders
+
+# Shared by every shader instance
+FILE_WATCHER = FileWatcher()
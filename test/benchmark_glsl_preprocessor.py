@@ -0,0 +1,74 @@
+
+"""Benchmark GLSLPreprocessor output against PCPP's token by token writer
+
+Run with `python -m test.benchmark_glsl_preprocessor`
+"""
+
+import io
+import os
+import sys
+import time
+
+from unittest.mock import MagicMock
+sys.modules['bgl'] = MagicMock()
+sys.modules['bpy'] = MagicMock()
+
+from libs.pcpp import Preprocessor
+from shaders.glsl.preprocessor import GLSLPreprocessor
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '../examples/URP')
+
+STAGES = ('urp.vs.glsl', 'urp.fs.glsl')
+
+ITERATIONS = 200
+
+def tokenize(filename: str):
+    """Preprocess a file without writing anything
+
+    Returns:
+        tuple(GLSLPreprocessor, list): The preprocessor and every token it produced
+    """
+    p = GLSLPreprocessor(cache=None)
+    p.add_path(os.path.dirname(os.path.abspath(filename)))
+
+    with open(filename) as f:
+        p.parse(f.read())
+
+    return p, list(p.parser)
+
+def pcpp_write(p, tokens):
+    p.parser = iter(tokens)
+    output = io.StringIO()
+    Preprocessor.write(p, output)
+    return output.getvalue()
+
+def glsl_generate(p, tokens):
+    p.parser = iter(tokens)
+    return ''.join(p.generate())
+
+def measure(writer, p, tokens) -> float:
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        writer(p, tokens)
+
+    return (time.perf_counter() - start) / ITERATIONS
+
+def main():
+    for stage in STAGES:
+        p, tokens = tokenize(os.path.join(EXAMPLES, stage))
+        size = len(glsl_generate(p, tokens)) / 1024
+
+        before = measure(pcpp_write, p, tokens)
+        after = measure(glsl_generate, p, tokens)
+
+        print('{:<12} {:>6} tokens {:>6.1f} KB   write() {:>6.3f} ms   generate() {:>6.3f} ms   {:.1f}x'.format(
+            stage,
+            len(tokens),
+            size,
+            before * 1000,
+            after * 1000,
+            before / after
+        ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import os
+import re
+import sys
+import types
+
+from unittest.mock import MagicMock
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# Every GL function and enum referenced by the add-on
+GL_NAME_PATTERN = re.compile(r'\b(gl[A-Z]\w*|GL_\w+)\b')
+
+def get_gl_names() -> list:
+    names = set()
+    for package in ('core', 'shaders'):
+        for path, dirs, files in os.walk(os.path.join(ROOT, package)):
+            for filename in files:
+                if filename.endswith('.py'):
+                    with open(os.path.join(path, filename)) as f:
+                        names.update(GL_NAME_PATTERN.findall(f.read()))
+
+    return sorted(names)
+
+# Numpy dtype per mocked GL type enum, filled by install()
+DTYPES = {}
+
+def make_buffer(type, dimensions, template=None):
+    """bgl.Buffer stand-in backed by Numpy, sharing memory with `template` like bgl does"""
+    if template is not None and isinstance(template, np.ndarray):
+        return template.reshape(dimensions)
+
+    buffer = np.zeros(dimensions, dtype=DTYPES.get(type, np.float32))
+    if template is not None:
+        buffer.reshape(-1)[:] = template
+
+    return buffer
+
+def install():
+    """Mock out Blender's modules so that core modules can be imported by tests
+
+    A MagicMock alone isn't enough for core, since `from bgl import *`
+    only imports names a module exports. The mocked bgl exports a mock
+    per GL function and a unique integer per enum instead.
+
+    The core package's __init__ imports every module, including those
+    that register with Blender, so it's replaced by a bare package
+    that imports submodules on demand.
+
+    Returns:
+        module: Mocked bgl
+    """
+    bgl = types.ModuleType('bgl')
+    bgl.__all__ = get_gl_names() + ['Buffer']
+
+    for i, name in enumerate(bgl.__all__):
+        if name.startswith('GL_'):
+            setattr(bgl, name, 0x10000 + i)
+        else:
+            setattr(bgl, name, MagicMock(name=name))
+
+    bgl.Buffer = make_buffer
+    DTYPES[bgl.GL_BYTE] = np.int8
+    DTYPES[bgl.GL_INT] = np.int32
+    DTYPES[bgl.GL_FLOAT] = np.float32
+
+    sys.modules['bgl'] = bgl
+
+    # Modules imported by other tests with a plain MagicMock for bgl
+    # are missing every GL name. Fill them in as their import would have
+    for name, module in list(sys.modules.items()):
+        if name.split('.')[0] in ('core', 'shaders') and module is not None:
+            for gl_name in bgl.__all__:
+                if not hasattr(module, gl_name) and hasattr(module, '__file__'):
+                    setattr(module, gl_name, getattr(bgl, gl_name))
+    sys.modules['bpy'] = MagicMock()
+    sys.modules['mathutils'] = MagicMock()
+
+    if 'core' not in sys.modules:
+        core = types.ModuleType('core')
+        core.__path__ = [os.path.join(ROOT, 'core')]
+        sys.modules['core'] = core
+
+    return bgl
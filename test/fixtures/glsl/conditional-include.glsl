@@ -0,0 +1,4 @@
+
+#ifdef DEBUG
+#include "include.glslv"
+#endif
@@ -0,0 +1,104 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+from .blender_mocks import install
+install()
+
+from core.animation import encode_png, linear_to_srgb, ImageWriter, StageTimings
+
+def read_png(data: bytes) -> tuple:
+    """Minimal decoder for the unfiltered RGBA8 PNGs written by encode_png()
+
+    Returns:
+        tuple(int, int, np.ndarray): width, height and top-down rows of shape (height, width, 4)
+    """
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+
+    chunks = {}
+    offset = 8
+    while offset < len(data):
+        length, tag = struct.unpack_from('>I4s', data, offset)
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack_from('>I', data, offset + 8 + length)
+        assert crc == zlib.crc32(tag + body) & 0xffffffff
+        chunks[tag] = body
+        offset += 12 + length
+
+    width, height, depth, color_type = struct.unpack_from('>IIBB', chunks[b'IHDR'])
+    assert (depth, color_type) == (8, 6)
+
+    scanlines = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8)
+    scanlines = scanlines.reshape(height, width * 4 + 1)
+    assert not scanlines[:, 0].any()
+
+    return width, height, scanlines[:, 1:].reshape(height, width, 4)
+
+class TestEncodePNG(unittest.TestCase):
+    def test_srgb_encoding(self):
+        pixels = np.array([
+            (0.0, 0.5, 1.0, 0.5),
+            (2.0, -1.0, 0.001, 1.0)
+        ], dtype=np.float32)
+
+        result = linear_to_srgb(pixels.copy())
+        np.testing.assert_array_equal(result[0], (0, 188, 255, 128))
+        np.testing.assert_array_equal(result[1], (255, 0, 3, 255))
+
+    def test_rows_are_flipped_top_down(self):
+        width, height = 3, 2
+
+        # glReadPixels order: bottom row first
+        pixels = np.zeros((width * height, 4), dtype=np.float32)
+        pixels[:width] = (1, 0, 0, 1)
+        pixels[width:] = (0, 0, 1, 1)
+
+        w, h, rows = read_png(encode_png(pixels, width, height))
+        self.assertEqual((w, h), (width, height))
+        np.testing.assert_array_equal(rows[0, 0], (0, 0, 255, 255))
+        np.testing.assert_array_equal(rows[1, 0], (255, 0, 0, 255))
+
+    def test_compress_level(self):
+        pixels = np.full((64 * 64, 4), 0.5, dtype=np.float32)
+        fast = encode_png(pixels, 64, 64, compress_level=0)
+        small = encode_png(pixels, 64, 64, compress_level=9)
+
+        self.assertLess(len(small), len(fast))
+        np.testing.assert_array_equal(read_png(fast)[2], read_png(small)[2])
+
+class TestImageWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_frames_and_recycles_buffers(self):
+        writer = ImageWriter(2, 2, StageTimings(), pool_size=2)
+        writer.start()
+
+        paths = [os.path.join(self.directory, 'frames', '{}.png'.format(i)) for i in range(4)]
+        for i, path in enumerate(paths):
+            index = writer.acquire()
+            writer.views[index][:] = i / 4
+            writer.submit(index, path)
+
+        writer.finish()
+        self.assertIsNone(writer.error)
+        self.assertFalse(writer.is_alive())
+
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                w, h, rows = read_png(f.read())
+            self.assertEqual(rows[0, 0, 3], int(i / 4 * 255 + 0.5))
+
+        # Safe to call again, e.g. from AnimationPipeline.destroy()
+        writer.finish()
+
+if __name__ == '__main__':
+    unittest.main()
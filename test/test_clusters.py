@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+from .blender_mocks import install
+install()
+
+from core.clusters import LightClusters, get_projection_depth_range
+
+def perspective(fov: float, aspect: float, near: float, far: float):
+    f = 1.0 / np.tan(fov / 2.0)
+    return np.array((
+        (f / aspect, 0, 0, 0),
+        (0, f, 0, 0),
+        (0, 0, (far + near) / (near - far), 2 * far * near / (near - far)),
+        (0, 0, -1, 0)
+    ), dtype=np.float64)
+
+class TestLightClusters(unittest.TestCase):
+    def setUp(self):
+        self.clusters = LightClusters()
+        self.clusters.update_bounds(perspective(np.radians(60), 16 / 9, 0.1, 100.0))
+
+    def get_lights(self, grid, lights, cluster: int) -> list:
+        offset, count = grid[cluster]
+        return lights[offset:offset + count].tolist()
+
+    def get_cluster_containing(self, point) -> int:
+        inside = np.all((self.clusters.mins <= point) & (point <= self.clusters.maxs), axis=1)
+        return int(np.nonzero(inside)[0][0])
+
+    def test_depth_range(self):
+        near, far = get_projection_depth_range(perspective(1.0, 1.0, 0.5, 50.0))
+        self.assertAlmostEqual(near, 0.5)
+        self.assertAlmostEqual(far, 50.0)
+
+    def test_bounds_per_cluster(self):
+        gx, gy, gz = LightClusters.GRID
+        self.assertEqual(self.clusters.mins.shape, (gx * gy * gz, 3))
+        self.assertTrue(np.all(self.clusters.mins <= self.clusters.maxs))
+
+    def test_assigns_light_to_containing_cluster(self):
+        centers = np.array([(0.5, 0.2, -10.0), (-2.0, 1.0, -30.0)])
+        grid, lights = self.clusters.assign(centers, np.array([0.5, 0.5]))
+
+        for row, center in enumerate(centers):
+            cluster = self.get_cluster_containing(center)
+            self.assertIn(row, self.get_lights(grid, lights, cluster))
+
+    def test_small_light_only_reaches_nearby_clusters(self):
+        centers = np.array([(0.0, 0.0, -10.0)])
+        grid, lights = self.clusters.assign(centers, np.array([0.1]))
+
+        self.assertGreater(len(lights), 0)
+        self.assertLess(len(lights), 16)
+
+    def test_light_behind_camera_is_not_assigned(self):
+        centers = np.array([(0.0, 0.0, 5.0)])
+        grid, lights = self.clusters.assign(centers, np.array([1.0]))
+
+        self.assertEqual(len(lights), 0)
+        self.assertFalse(grid[:, 1].any())
+
+    def test_large_light_reaches_every_cluster(self):
+        centers = np.array([(0.0, 0.0, -10.0)])
+        grid, lights = self.clusters.assign(centers, np.array([1000.0]))
+
+        self.assertTrue(np.all(grid[:, 1] == 1))
+        self.assertEqual(len(lights), len(self.clusters.mins))
+
+    def test_offsets_index_lights_grouped_by_cluster(self):
+        rng = np.random.default_rng(1)
+        count = LightClusters.BATCH_SIZE + 10
+        centers = rng.uniform((-20, -10, -60), (20, 10, -1), size=(count, 3))
+        radii = rng.uniform(0.5, 5.0, size=count)
+
+        grid, lights = self.clusters.assign(centers, radii)
+        offsets, counts = grid[:, 0], grid[:, 1]
+
+        self.assertEqual(counts.sum(), len(lights))
+        np.testing.assert_array_equal(offsets[1:], np.cumsum(counts)[:-1])
+
+        # Rows are sorted within each cluster and match a sphere-AABB test
+        for cluster in range(0, len(grid), 97):
+            rows = self.get_lights(grid, lights, cluster)
+            self.assertEqual(rows, sorted(rows))
+
+            nearest = np.clip(centers, self.clusters.mins[cluster], self.clusters.maxs[cluster])
+            expected = np.nonzero(((nearest - centers) ** 2).sum(axis=1) <= radii ** 2)[0]
+            self.assertEqual(rows, expected.tolist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import gc
+import os
+import sys
+import select
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from .blender_mocks import install
+install()
+
+from shaders.watcher import FileWatcher
+
+class FakeShader:
+    def __init__(self):
+        self.has_file_changes = False
+
+# The background thread is replaced by calling its steps directly
+@patch.object(FileWatcher, 'start', lambda self: None)
+@patch.object(FileWatcher, 'DEBOUNCE_TIME', 0)
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_file(self, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write('')
+        return path
+
+    def touch(self, path: str, mtime: float):
+        os.utime(path, (mtime, mtime))
+
+    def test_tracks_dependents_per_file(self):
+        watcher = FileWatcher(use_inotify=False)
+        common = self.make_file('common.glsl')
+        a = self.make_file('a.frag')
+        b = self.make_file('b.frag')
+
+        shader_a = FakeShader()
+        shader_b = FakeShader()
+        watcher.watch(shader_a, [a, common])
+        watcher.watch(shader_b, [b, common])
+
+        self.assertEqual(set(watcher.dependents[common]), {shader_a, shader_b})
+        self.assertEqual(set(watcher.dependents[a]), {shader_a})
+
+    def test_rewatch_replaces_dependencies(self):
+        watcher = FileWatcher(use_inotify=False)
+        a = self.make_file('a.frag')
+        include = self.make_file('include.glsl')
+
+        shader = FakeShader()
+        watcher.watch(shader, [a, include])
+        watcher.watch(shader, [a])
+
+        self.assertNotIn(include, watcher.dependents)
+        self.assertNotIn(include, watcher.mtimes)
+
+    def test_dispatch_flags_only_dependents(self):
+        watcher = FileWatcher(use_inotify=False)
+        common = self.make_file('common.glsl')
+        a = self.make_file('a.frag')
+        b = self.make_file('b.frag')
+
+        shader_a = FakeShader()
+        shader_b = FakeShader()
+        watcher.watch(shader_a, [a, common])
+        watcher.watch(shader_b, [b])
+
+        self.touch(common, 1000)
+        watcher.stat_polled_paths()
+
+        self.assertEqual(watcher.dispatch(), {shader_a})
+        self.assertTrue(shader_a.has_file_changes)
+        self.assertFalse(shader_b.has_file_changes)
+        self.assertEqual(watcher.generation, 1)
+
+        # Nothing new since
+        watcher.stat_polled_paths()
+        self.assertEqual(watcher.dispatch(), set())
+
+    def test_changes_wait_for_debounce(self):
+        watcher = FileWatcher(use_inotify=False)
+        a = self.make_file('a.frag')
+        shader = FakeShader()
+        watcher.watch(shader, [a])
+
+        self.touch(a, 1000)
+        watcher.stat_polled_paths()
+
+        with patch.object(watcher, 'DEBOUNCE_TIME', 60):
+            self.assertEqual(watcher.dispatch(), set())
+
+        self.assertEqual(watcher.dispatch(), {shader})
+
+    def test_deleted_file_is_a_change(self):
+        watcher = FileWatcher(use_inotify=False)
+        a = self.make_file('a.frag')
+        shader = FakeShader()
+        watcher.watch(shader, [a])
+
+        os.remove(a)
+        watcher.stat_polled_paths()
+        self.assertEqual(watcher.dispatch(), {shader})
+
+    def test_unwatch(self):
+        watcher = FileWatcher(use_inotify=False)
+        a = self.make_file('a.frag')
+        shader = FakeShader()
+        watcher.watch(shader, [a])
+        watcher.unwatch(shader)
+
+        self.assertEqual(watcher.dependents, {})
+        self.assertEqual(watcher.mtimes, {})
+
+    def test_freed_shaders_are_dropped(self):
+        watcher = FileWatcher(use_inotify=False)
+        a = self.make_file('a.frag')
+        b = self.make_file('b.frag')
+
+        shader = FakeShader()
+        watcher.watch(shader, [a])
+        del shader
+        gc.collect()
+
+        # Unused paths are cleaned up by the next watch()
+        watcher.watch(FakeShader(), [b])
+        self.assertNotIn(a, watcher.dependents)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is Linux only')
+    def test_inotify_events(self):
+        watcher = FileWatcher()
+        a = self.make_file('a.frag')
+        shader = FakeShader()
+        watcher.watch(shader, [a])
+
+        try:
+            if not watcher.uses_inotify:
+                self.skipTest('inotify unavailable')
+
+            self.assertIn(self.directory, watcher.directories)
+            self.assertEqual(watcher.mtimes, {})
+
+            # Editors that write a temporary file and rename it over the original
+            tmp = self.make_file('a.frag.tmp')
+            os.replace(tmp, a)
+
+            readable, _, _ = select.select([watcher.fd], [], [], 1.0)
+            self.assertTrue(readable)
+            watcher.read_events()
+
+            self.assertEqual(watcher.dispatch(), {shader})
+        finally:
+            watcher.stop()
+
+if __name__ == '__main__':
+    unittest.main()
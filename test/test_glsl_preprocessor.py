@@ -1,13 +1,16 @@
 
 import os
 import sys
+import shutil
+import tempfile
 import unittest
 
 from unittest.mock import MagicMock, patch
 sys.modules['bgl'] = MagicMock()
 sys.modules['bpy'] = MagicMock()
 
-from shaders.glsl.preprocessor import GLSLPreprocessor
+from shaders.glsl.preprocessor import GLSLPreprocessor, PreprocessCache
+from shaders.glsl.preprocess_pool import PreprocessPool, preprocess
 
 FIXTURES = os.path.join(os.path.dirname(__file__), './fixtures/glsl')
 
@@ -37,12 +40,129 @@ class TestGLSLPreprocessor(unittest.TestCase):
         self.assertRegex(p.includes[1], r'include\.glslv$')
         self.assertRegex(p.includes[2], r'include-with-guard\.glsl$')
 
+    def test_records_dependencies(self):
+        p = GLSLPreprocessor()
+        p.parse_file(FIXTURES + '/includes.glsl')
+
+        # Every file read is recorded with an absolute path
+        self.assertEqual(3, len(p.dependencies))
+        self.assertTrue(all(os.path.isabs(f) for f in p.dependencies))
+        self.assertRegex(p.dependencies[0], r'includes\.glsl$')
+        self.assertRegex(p.dependencies[1], r'include\.glslv$')
+        self.assertRegex(p.dependencies[2], r'include-with-guard\.glsl$')
+
     def test_strips_version(self):
         p = GLSLPreprocessor()
         result = p.parse_file(FIXTURES + '/version.glsl')
 
         self.assertNotRegex(result, '#version')
 
+    def test_fast_includes_match_full_preprocessing(self):
+        for name in ('includes.glsl', 'version.glsl'):
+            full = GLSLPreprocessor(cache=None)
+            fast = GLSLPreprocessor(cache=None, fast=True)
+
+            self.assertEqual(full.parse_file(FIXTURES + '/' + name), fast.parse_file(FIXTURES + '/' + name))
+            self.assertEqual(full.includes, fast.includes)
+            self.assertEqual(full.dependencies, fast.dependencies)
+
+    def test_fast_leaves_conditionals(self):
+        p = GLSLPreprocessor(cache=None, fast=True)
+        p.define('DEBUG 1')
+
+        result = p.parse_file(FIXTURES + '/preprocessors.glsl')
+        self.assertTrue(result.startswith('#define DEBUG 1\n#line 2 0\n#ifdef DEBUG\n'))
+        self.assertRegex(result, r'yes')
+        self.assertRegex(result, r'no')
+
+    def test_fast_falls_back_for_conditional_includes(self):
+        p = GLSLPreprocessor(cache=None, fast=True)
+        p.define('DEBUG 1')
+        result = p.parse_file(FIXTURES + '/conditional-include.glsl')
+        self.assertRegex(result, r'Foo')
+        self.assertNotRegex(result, r'#ifdef')
+        self.assertEqual(2, len(p.includes))
+
+        p = GLSLPreprocessor(cache=None, fast=True)
+        result = p.parse_file(FIXTURES + '/conditional-include.glsl')
+        self.assertNotRegex(result, r'Foo')
+
+    def test_cached_output_matches(self):
+        cache = PreprocessCache()
+        uncached = GLSLPreprocessor(cache=None).parse_file(FIXTURES + '/includes.glsl')
+
+        first = GLSLPreprocessor(cache=cache)
+        self.assertEqual(uncached, first.parse_file(FIXTURES + '/includes.glsl'))
+        self.assertEqual(0, cache.hits)
+
+        second = GLSLPreprocessor(cache=cache)
+        self.assertEqual(uncached, second.parse_file(FIXTURES + '/includes.glsl'))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(first.includes, second.includes)
+        self.assertEqual(first.dependencies, second.dependencies)
+
+        # Macro state is part of the key
+        third = GLSLPreprocessor(cache=cache)
+        third.define('DEBUG 1')
+        third.parse_file(FIXTURES + '/includes.glsl')
+        self.assertEqual(1, cache.hits)
+
+    def test_cache_keyed_by_output_settings(self):
+        cache = PreprocessCache()
+        filename = FIXTURES + '/includes.glsl'
+
+        with_lines = GLSLPreprocessor(cache=cache).parse_file(filename)
+
+        p = GLSLPreprocessor(cache=cache)
+        p.line_directive = None
+        without_lines = p.parse_file(filename)
+
+        self.assertEqual(0, cache.hits)
+        self.assertRegex(with_lines, '#line')
+        self.assertNotRegex(without_lines, '#line')
+
+    def test_cache_invalidated_by_included_file(self):
+        cache = PreprocessCache()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        shutil.copy(FIXTURES + '/includes.glsl', directory)
+        shutil.copy(FIXTURES + '/include.glslv', directory)
+        shutil.copy(FIXTURES + '/include-with-guard.glsl', directory)
+        filename = os.path.join(directory, 'includes.glsl')
+
+        before = GLSLPreprocessor(cache=cache).parse_file(filename)
+
+        with open(os.path.join(directory, 'include.glslv'), 'a') as f:
+            f.write('float changed;\n')
+
+        after = GLSLPreprocessor(cache=cache).parse_file(filename)
+        self.assertEqual(0, cache.hits)
+        self.assertNotEqual(before, after)
+        self.assertRegex(after, 'float changed;')
+        self.assertEqual(after, GLSLPreprocessor(cache=None).parse_file(filename))
+
+    @unittest.skipUnless(PreprocessPool().is_supported, 'Process pool requires fork')
+    def test_pool_matches_in_process(self):
+        pool = PreprocessPool()
+        try:
+            jobs = [
+                (FIXTURES + '/includes.glsl', ()),
+                (FIXTURES + '/preprocessors.glsl', ('DEBUG',)),
+                (FIXTURES + '/includes.glsl', ())
+            ]
+            futures = pool.submit(jobs)
+            self.assertEqual(2, len(futures))
+
+            for job, future in futures.items():
+                expected = preprocess(*job)
+                result = future.result()
+                self.assertEqual(expected.result, result.result)
+                self.assertEqual(expected.includes, result.includes)
+                self.assertEqual(expected.dependencies, result.dependencies)
+        finally:
+            pool.shutdown()
+
 if __name__ == '__main__':
     unittest.main()
 
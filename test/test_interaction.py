@@ -0,0 +1,106 @@
+import unittest
+
+from .blender_mocks import install
+install()
+
+from core.interaction import InteractionScheduler
+
+class FakeMesh:
+    def __init__(self, is_interactive: bool = False):
+        self.is_interactive = is_interactive
+        self.last_rebuild = 0.0
+
+class TestInteractionScheduler(unittest.TestCase):
+    def touch_quickly(self, scheduler, name: str, count: int, start: float = 0.0) -> bool:
+        interactive = False
+        for i in range(count):
+            interactive = scheduler.touch(name, now=start + i * 0.05)
+        return interactive
+
+    def test_single_update_is_not_interactive(self):
+        scheduler = InteractionScheduler()
+        self.assertFalse(scheduler.touch('Cube', now=0.0))
+        self.assertFalse(scheduler.is_active)
+
+    def test_quick_updates_become_interactive(self):
+        scheduler = InteractionScheduler()
+        count = InteractionScheduler.CONTINUOUS_UPDATES
+
+        self.assertFalse(self.touch_quickly(scheduler, 'Cube', count - 1))
+        self.assertTrue(scheduler.touch('Cube', now=(count - 1) * 0.05))
+        self.assertTrue(scheduler.is_active)
+
+    def test_slow_updates_reset_streak(self):
+        scheduler = InteractionScheduler()
+        interval = InteractionScheduler.CONTINUOUS_INTERVAL * 2
+
+        for i in range(InteractionScheduler.CONTINUOUS_UPDATES * 2):
+            self.assertFalse(scheduler.touch('Cube', now=i * interval))
+
+    def test_settles_after_updates_stop(self):
+        scheduler = InteractionScheduler()
+        self.touch_quickly(scheduler, 'Cube', InteractionScheduler.CONTINUOUS_UPDATES)
+        self.touch_quickly(scheduler, 'Sphere', InteractionScheduler.CONTINUOUS_UPDATES, start=1.0)
+        last = 1.0 + (InteractionScheduler.CONTINUOUS_UPDATES - 1) * 0.05
+
+        self.assertFalse(scheduler.has_settled(now=0.11))
+        self.assertEqual(scheduler.pop_settled(now=0.11), [])
+
+        now = last + InteractionScheduler.SETTLE_TIME / 2
+        self.assertTrue(scheduler.has_settled(now=now))
+        self.assertEqual(scheduler.pop_settled(now=now), ['Cube'])
+        self.assertTrue(scheduler.is_active)
+
+        now = last + InteractionScheduler.SETTLE_TIME
+        self.assertEqual(scheduler.pop_settled(now=now), ['Sphere'])
+        self.assertFalse(scheduler.is_active)
+
+    def test_settled_object_needs_a_new_streak(self):
+        scheduler = InteractionScheduler()
+        self.touch_quickly(scheduler, 'Cube', InteractionScheduler.CONTINUOUS_UPDATES)
+        scheduler.pop_settled(now=10.0)
+
+        self.assertFalse(scheduler.touch('Cube', now=10.05))
+
+    def test_interactive_rebuilds_are_rate_limited(self):
+        scheduler = InteractionScheduler()
+        scheduler.begin_frame()
+        mesh = FakeMesh(is_interactive=True)
+        interval = 1.0 / InteractionScheduler.INTERACTIVE_RATE
+
+        self.assertTrue(scheduler.can_rebuild(mesh, now=1.0))
+        scheduler.spend(mesh, 0.001, now=1.0)
+
+        self.assertFalse(scheduler.can_rebuild(mesh, now=1.0 + interval / 2))
+        self.assertTrue(scheduler.deferred)
+        self.assertTrue(scheduler.can_rebuild(mesh, now=1.0 + interval))
+
+    def test_budget_defers_after_first_rebuild(self):
+        scheduler = InteractionScheduler()
+        scheduler.begin_frame(0.008)
+        a, b = FakeMesh(), FakeMesh()
+
+        # Always allow one rebuild, even over budget
+        self.assertTrue(scheduler.can_rebuild(a, now=0.0))
+        scheduler.spend(a, 0.010, now=0.0)
+
+        self.assertFalse(scheduler.can_rebuild(b, now=0.0))
+        self.assertTrue(scheduler.deferred)
+
+        scheduler.begin_frame(0.008)
+        self.assertFalse(scheduler.deferred)
+        self.assertTrue(scheduler.can_rebuild(b, now=0.0))
+
+    def test_unlimited_budget(self):
+        scheduler = InteractionScheduler()
+        scheduler.begin_frame(None)
+        mesh = FakeMesh()
+
+        for i in range(10):
+            self.assertTrue(scheduler.can_rebuild(mesh, now=0.0))
+            scheduler.spend(mesh, 1.0, now=0.0)
+
+        self.assertFalse(scheduler.deferred)
+
+if __name__ == '__main__':
+    unittest.main()
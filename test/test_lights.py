@@ -0,0 +1,120 @@
+import unittest
+
+import numpy as np
+
+from .blender_mocks import install
+install()
+
+from core.lights import LightTable
+
+class FakeQuaternion:
+    def __matmul__(self, other):
+        return (0, 0, -1)
+
+class FakeMatrix:
+    def __init__(self, position):
+        self.position = position
+
+    def to_translation(self):
+        return self.position
+
+    def to_quaternion(self):
+        return FakeQuaternion()
+
+class FakeSettings:
+    intensity = 2.0
+    distance = 10.0
+
+class FakeLight:
+    type = 'POINT'
+    color = (1.0, 0.5, 0.25)
+    scratchpad = FakeSettings()
+
+class FakeLightObject:
+    def __init__(self, name: str, position=(0, 0, 0)):
+        self.name = name
+        self.matrix_world = FakeMatrix(position)
+        self.data = FakeLight()
+
+class TestLightTable(unittest.TestCase):
+    def test_add_assigns_rows_in_order(self):
+        table = LightTable()
+        for name in ('A', 'B', 'C'):
+            table.update(FakeLightObject(name))
+
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.count, 3)
+        self.assertEqual([table.slots[n] for n in ('A', 'B', 'C')], [0, 1, 2])
+
+    def test_update_writes_row(self):
+        table = LightTable()
+        table.update(FakeLightObject('A', (1, 2, 3)))
+
+        np.testing.assert_allclose(table.positions[0], (1, 2, 3, 1))
+        np.testing.assert_allclose(table.directions[0], (0, 0, -1, 0))
+        np.testing.assert_allclose(table.colors[0], (1, 0.5, 0.25, 2))
+
+    def test_update_keeps_row(self):
+        table = LightTable()
+        table.update(FakeLightObject('A'))
+        table.update(FakeLightObject('B'))
+        table.update(FakeLightObject('A', (5, 0, 0)))
+
+        self.assertEqual(table.slots['A'], 0)
+        self.assertEqual(table.count, 2)
+        self.assertEqual(table.positions[0, 0], 5)
+
+    def test_remove_leaves_zeroed_hole(self):
+        table = LightTable()
+        for name in ('A', 'B', 'C'):
+            table.update(FakeLightObject(name))
+
+        table.remove('B')
+        self.assertNotIn('B', table)
+        self.assertEqual(table.count, 3)
+        self.assertFalse(table.colors[1].any())
+        self.assertFalse(table.positions[1].any())
+
+    def test_hole_is_reused(self):
+        table = LightTable()
+        for name in ('A', 'B', 'C'):
+            table.update(FakeLightObject(name))
+
+        table.remove('B')
+        table.update(FakeLightObject('D'))
+        self.assertEqual(table.slots['D'], 1)
+        self.assertEqual(table.count, 3)
+
+    def test_trailing_holes_are_trimmed(self):
+        table = LightTable()
+        for name in ('A', 'B', 'C'):
+            table.update(FakeLightObject(name))
+
+        table.remove('B')
+        table.remove('C')
+        self.assertEqual(table.count, 1)
+        self.assertEqual(table.free, [])
+
+        table.update(FakeLightObject('D'))
+        self.assertEqual(table.slots['D'], 1)
+
+    def test_grows_past_capacity(self):
+        table = LightTable(capacity=2)
+        for i in range(5):
+            table.update(FakeLightObject(str(i), (i, 0, 0)))
+
+        self.assertGreaterEqual(len(table.positions), 5)
+        np.testing.assert_allclose(table.positions[:5, 0], range(5))
+
+    def test_clear(self):
+        table = LightTable()
+        table.update(FakeLightObject('A'))
+        table.update(FakeLightObject('B'))
+        table.clear()
+
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.count, 0)
+        self.assertEqual(table.names(), set())
+
+if __name__ == '__main__':
+    unittest.main()
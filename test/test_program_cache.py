@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from .blender_mocks import install, make_buffer
+install()
+
+import shaders.program_cache as program_cache
+from shaders.program_cache import ProgramCache
+
+BINARY_LENGTH = 100
+
+def get_program_iv(program, flag, buffer):
+    buffer[0] = BINARY_LENGTH
+
+def get_program_binary(program, size, written, binary_format, buffer):
+    written[0] = BINARY_LENGTH
+    binary_format[0] = 1
+    buffer[:BINARY_LENGTH] = 7
+
+@patch.multiple(
+    program_cache,
+    Buffer=make_buffer,
+    glGetString=MagicMock(return_value='driver'),
+    glGetProgramiv=get_program_iv,
+    glGetProgramBinary=get_program_binary,
+    create=True
+)
+class TestProgramCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, **kwargs):
+        cache = ProgramCache(self.directory, **kwargs)
+        cache._supported = True
+        return cache
+
+    def write_entry(self, name: str, size: int, mtime: float) -> str:
+        path = os.path.join(self.directory, name + ProgramCache.EXTENSION)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_key_is_stable(self):
+        cache = self.make_cache()
+        sources = ('vs', 'fs', None, None, None)
+        self.assertEqual(
+            cache.key(sources, {'Position': 0}),
+            cache.key(sources, {'Position': 0})
+        )
+
+    def test_key_changes_with_inputs(self):
+        cache = self.make_cache()
+        base = cache.key(('vs', 'fs', None), {'Position': 0})
+
+        self.assertNotEqual(base, cache.key(('vs', 'fs2', None), {'Position': 0}))
+        self.assertNotEqual(base, cache.key(('vs', 'fs', None), {'Position': 1}))
+        self.assertNotEqual(base, cache.key(('vs', 'fs', None), {}))
+
+        # Stage boundaries are part of the key
+        self.assertNotEqual(
+            cache.key(('vsfs', None), {}),
+            cache.key(('vs', 'fs'), {})
+        )
+
+        cache._driver = 'other driver'
+        self.assertNotEqual(base, cache.key(('vs', 'fs', None), {'Position': 0}))
+
+    def test_evict_removes_expired(self):
+        cache = self.make_cache(max_age=100)
+        old = self.write_entry('old', 10, 1000)
+        new = self.write_entry('new', 10, 1950)
+
+        cache.evict(now=2000)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+        self.assertEqual(cache.size, 10)
+
+    def test_evict_removes_least_recently_used_over_budget(self):
+        cache = self.make_cache(max_bytes=25)
+        oldest = self.write_entry('a', 10, 1000)
+        middle = self.write_entry('b', 10, 1001)
+        newest = self.write_entry('c', 10, 1002)
+
+        cache.evict(now=1003)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(middle))
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual(cache.size, 20)
+
+    def test_store_tracks_size_without_scanning(self):
+        cache = self.make_cache()
+        entry_size = ProgramCache.HEADER.size + BINARY_LENGTH
+
+        with patch.object(cache, 'evict', wraps=cache.evict) as evict:
+            cache.store('a', 1)
+            cache.store('b', 1)
+            cache.store('c', 1)
+
+        # Only the first store scans the directory
+        self.assertEqual(evict.call_count, 1)
+        self.assertEqual(cache.size, entry_size * 3)
+        self.assertTrue(os.path.isfile(cache.get_path('c')))
+
+    def test_store_evicts_over_budget(self):
+        entry_size = ProgramCache.HEADER.size + BINARY_LENGTH
+        cache = self.make_cache(max_bytes=entry_size * 2)
+
+        for i, key in enumerate(('a', 'b', 'c')):
+            cache.store(key, 1)
+            os.utime(cache.get_path(key), (1000 + i, 1000 + i))
+
+        cache.store('d', 1)
+        self.assertFalse(os.path.exists(cache.get_path('a')))
+        self.assertTrue(os.path.exists(cache.get_path('d')))
+        self.assertLessEqual(cache.size, cache.max_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+
+import numpy as np
+
+from .blender_mocks import install
+install()
+
+from core.render_queue import RenderQueue
+
+class FakeShader:
+    def __init__(self, program: int, textures: tuple = ()):
+        self.base_program = program
+        self.program = program
+        self.textures = textures
+        self.declared_keywords = set()
+
+    def get_textures(self):
+        return self.textures
+
+    def get_variant_key(self, keywords):
+        return tuple(sorted(set(keywords) & self.declared_keywords))
+
+class FakeVAO:
+    def __init__(self, vao_id: int):
+        self.vao_id = vao_id
+        self.total_indices = 3
+
+class FakeMatrix:
+    def __init__(self, z: float):
+        self.translation = (0, 0, z)
+
+class FakeRenderable:
+    def __init__(self, name: str, z: float, vao_id: int = 1):
+        self.name = name
+        self.model_matrix = FakeMatrix(z)
+        self.vao = FakeVAO(vao_id)
+
+# Camera at the origin looking down -Z, so depth is -z
+VIEW_MATRIX = np.identity(4)
+
+class TestRenderQueue(unittest.TestCase):
+    def get_order(self, queue):
+        return [queue.commands[i].renderable.name for i in queue.order]
+
+    def test_opaque_front_to_back(self):
+        queue = RenderQueue()
+        shader = FakeShader(1)
+        queue.add(shader, FakeRenderable('far', -10), 2000)
+        queue.add(shader, FakeRenderable('near', -1), 2000)
+        queue.add(shader, FakeRenderable('middle', -5), 2000)
+
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(self.get_order(queue), ['near', 'middle', 'far'])
+        self.assertFalse(queue.has_transparent)
+
+    def test_transparent_back_to_front(self):
+        queue = RenderQueue()
+        shader = FakeShader(1)
+        queue.add(shader, FakeRenderable('near', -1), 3000)
+        queue.add(shader, FakeRenderable('far', -10), 3000)
+        queue.add(shader, FakeRenderable('middle', -5), 3000)
+
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(self.get_order(queue), ['far', 'middle', 'near'])
+        self.assertTrue(queue.has_transparent)
+
+    def test_priority_before_depth(self):
+        queue = RenderQueue()
+        shader = FakeShader(1)
+        queue.add(shader, FakeRenderable('transparent', -1), 3000)
+        queue.add(shader, FakeRenderable('late', -1), 2500)
+        queue.add(shader, FakeRenderable('early', -10), -100)
+
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(self.get_order(queue), ['early', 'late', 'transparent'])
+
+    def test_opaque_groups_by_program_before_depth(self):
+        queue = RenderQueue()
+        a = FakeShader(1)
+        b = FakeShader(2)
+        queue.add(a, FakeRenderable('a-near', -1), 2000)
+        queue.add(b, FakeRenderable('b-near', -2), 2000)
+        queue.add(a, FakeRenderable('a-far', -10), 2000)
+        queue.add(b, FakeRenderable('b-far', -20), 2000)
+
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(self.get_order(queue), ['a-near', 'a-far', 'b-near', 'b-far'])
+
+    def test_groups_by_variant(self):
+        queue = RenderQueue()
+        shader = FakeShader(1)
+        shader.declared_keywords = {'NORMAL_MAP'}
+        queue.add(shader, FakeRenderable('base', -1), 2000)
+        queue.add(shader, FakeRenderable('variant', -2), 2000, ('NORMAL_MAP',))
+        queue.add(shader, FakeRenderable('base-far', -3), 2000)
+
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(self.get_order(queue), ['base', 'base-far', 'variant'])
+
+    def test_empty(self):
+        queue = RenderQueue()
+        queue.sort(VIEW_MATRIX)
+        self.assertEqual(queue.order, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,8 @@ from unittest.mock import MagicMock, patch
 sys.modules['bgl'] = MagicMock()
 sys.modules['bpy'] = MagicMock()
 
-from shaders.scribble.parser import parser
+from shaders.scribble.lexer import get_lexer
+from shaders.scribble.parser import parse
 from shaders.scribble.shader import ScribbleShader
 
 FIXTURES = os.path.join(os.path.dirname(__file__), './fixtures/scribble')
@@ -20,7 +21,7 @@ class TestScribbleParser(unittest.TestCase):
         with open(FIXTURES + '/structure.glsl') as f:
             data = f.read()
 
-        shader = parser.parse(data)
+        shader = parse(data)
         self.assertIsInstance(shader, ScribbleShader)
         
         # Techniques
@@ -36,6 +37,29 @@ class TestScribbleParser(unittest.TestCase):
 
         self.assertEqual(['Common', 'MockVS'], p.stages[0].source_names)
 
+    def test_glsl_block_skips_braces_in_comments_and_strings(self):
+        """Test capturing a GLSL block whole with correct line numbers"""
+        code = (
+            '\n'
+            '    #include "}"\n'
+            '    // }\n'
+            '    /* { */\n'
+            '    void main() { if (x) { y(); } }\n'
+        )
+        data = 'Shader "Test" {\n    GLSL Common\n    {' + code + '}\n    Pass\n}\n'
+
+        lexer = get_lexer()
+        lexer.input(data)
+        tokens = list(iter(lexer.token, None))
+
+        glsl = tokens[3]
+        self.assertEqual('GLSL', glsl.type)
+        self.assertEqual(('Common', code), glsl.value)
+        self.assertEqual(3, glsl.lineno)
+
+        self.assertEqual(['PASS', 'RBRACE'], [t.type for t in tokens[4:]])
+        self.assertEqual(9, tokens[4].lineno)
+
 # def repr_shader(result):
 #     print('Shader {}'.format(result.name))
 #     for t in result.techniques:
@@ -0,0 +1,133 @@
+import sys
+import unittest
+
+from unittest.mock import MagicMock, patch
+sys.modules['bgl'] = MagicMock()
+sys.modules['bpy'] = MagicMock()
+
+import shaders.base as base
+from shaders.base import BaseShader
+
+class FakePendingProgram:
+    """Stand-in for a driver compile that completes when told to"""
+    programs = iter(range(100, 1000))
+
+    def __init__(self, vs, fs, tcs=None, tes=None, gs=None):
+        self.sources = (vs, fs, tcs, tes, gs)
+        self.program = next(self.programs)
+        self.complete = False
+        self.discarded = False
+
+    def is_complete(self):
+        return self.complete
+
+    def finish(self):
+        if 'ERROR' in self.sources[0]:
+            raise base.CompileError('failed')
+        return self.program
+
+    def discard(self):
+        self.discarded = True
+
+class KeywordShader(BaseShader):
+    def __init__(self):
+        super(KeywordShader, self).__init__()
+        self.variant_sources = []
+        self.declare_keywords('_', 'NORMAL_MAP')
+        self.declare_keywords('_', 'ERROR')
+
+    def get_variant_sources(self, key, preprocessed=None):
+        self.variant_sources.append(key)
+        return (' '.join(key), 'fs', None, None, None)
+
+@patch.multiple(
+    base,
+    PendingProgram=FakePendingProgram,
+    glDeleteProgram=MagicMock(),
+    reflect_program=MagicMock(return_value=({}, {})),
+    bind_uniform_blocks=MagicMock(return_value=set()),
+    bind_shared_samplers=MagicMock(return_value=set()),
+    compile_program=MagicMock(return_value=50),
+    create=True
+)
+class TestShaderVariants(unittest.TestCase):
+    def make_shader(self):
+        shader = KeywordShader()
+        shader.program = 10
+        return shader
+
+    def test_select_draws_base_until_compiled(self):
+        shader = self.make_shader()
+
+        shader.select_variant(('NORMAL_MAP',))
+        self.assertEqual(shader.program, 10)
+        self.assertEqual(shader.requested_variants, [('NORMAL_MAP',)])
+        self.assertEqual(shader.variant_sources, [])
+
+        # Repeated binds don't request again
+        shader.select_variant(('NORMAL_MAP',))
+        self.assertEqual(shader.requested_variants, [('NORMAL_MAP',)])
+
+        for key in shader.take_requested_variants():
+            shader.compile_variant_async(key)
+
+        pending = shader.pending_variants[('NORMAL_MAP',)]
+        self.assertFalse(shader.poll_variants())
+
+        pending.complete = True
+        self.assertTrue(shader.poll_variants())
+        self.assertEqual(shader.pending_variants, {})
+
+        shader.select_variant(('NORMAL_MAP',))
+        self.assertEqual(shader.program, pending.program)
+        self.assertEqual(shader.base_program, 10)
+
+    def test_undeclared_keywords_use_base(self):
+        shader = self.make_shader()
+        shader.select_variant(('UNKNOWN',))
+        self.assertEqual(shader.requested_variants, [])
+        self.assertEqual(shader.program, 10)
+
+    def test_failed_variant_is_not_requested_again(self):
+        shader = self.make_shader()
+        shader.request_variant(('ERROR',))
+        for key in shader.take_requested_variants():
+            shader.compile_variant_async(key)
+
+        self.assertFalse(shader.poll_variants(block=True))
+        self.assertIn(('ERROR',), shader.failed_variants)
+
+        shader.select_variant(('ERROR',))
+        self.assertEqual(shader.requested_variants, [])
+        self.assertEqual(shader.program, 10)
+
+    def test_recompile_discards_pending_variants(self):
+        shader = self.make_shader()
+        shader.request_variant(('NORMAL_MAP',))
+        for key in shader.take_requested_variants():
+            shader.compile_variant_async(key)
+
+        pending = shader.pending_variants[('NORMAL_MAP',)]
+        generation = shader.variant_generation
+
+        shader.program = 20
+        self.assertTrue(pending.discarded)
+        self.assertEqual(shader.pending_variants, {})
+        self.assertNotEqual(shader.variant_generation, generation)
+
+    def test_prewarm_requests_every_combination(self):
+        shader = self.make_shader()
+        shader.prewarm()
+        self.assertEqual(
+            sorted(shader.requested_variants),
+            [('ERROR',), ('ERROR', 'NORMAL_MAP'), ('NORMAL_MAP',)]
+        )
+
+    def test_compile_variant_waits_on_driver(self):
+        shader = self.make_shader()
+        variant = shader.compile_variant(('NORMAL_MAP',))
+        self.assertEqual(variant.program, 50)
+        self.assertIn(('NORMAL_MAP',), shader.variants)
+
+if __name__ == '__main__':
+    unittest.main()
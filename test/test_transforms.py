@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+
+from .blender_mocks import install
+install()
+
+from core.transforms import ObjectTransforms
+
+class FakeRenderable:
+    def __init__(self, model_matrix):
+        self.model_matrix = model_matrix
+
+def translation(x: float, y: float, z: float):
+    m = np.identity(4, dtype=np.float32)
+    m[:3, 3] = (x, y, z)
+    return m
+
+class TestObjectTransforms(unittest.TestCase):
+    def test_shapes(self):
+        transforms = ObjectTransforms()
+        renderables = [FakeRenderable(translation(i, 0, 0)) for i in range(3)]
+        transforms.update(renderables, np.identity(4), np.identity(4))
+
+        self.assertEqual(transforms.count, 3)
+        self.assertEqual(transforms.data.shape, (3, 3, 16))
+        self.assertEqual(np.shape(transforms.buffer), (3, 3, 16))
+        self.assertEqual(np.shape(transforms.buffer[1]), (3, 16))
+
+    def test_column_major_matrices(self):
+        transforms = ObjectTransforms()
+        model = translation(1, 2, 3)
+        view = translation(0, 0, -5)
+        projection = np.diag([2, 2, 1, 1]).astype(np.float32)
+
+        transforms.update([FakeRenderable(model)], view, projection)
+        matrices = transforms.data[0].reshape(3, 4, 4)
+
+        # Stored transposed, so translation is the last row
+        np.testing.assert_allclose(matrices[ObjectTransforms.MODEL], model.T)
+        np.testing.assert_allclose(matrices[ObjectTransforms.MODEL_VIEW], (view @ model).T)
+        np.testing.assert_allclose(
+            matrices[ObjectTransforms.MODEL_VIEW_PROJECTION],
+            (projection @ view @ model).T
+        )
+        np.testing.assert_allclose(matrices[ObjectTransforms.MODEL_VIEW][3, :3], (1, 2, -2))
+
+    def test_reuses_storage_for_same_count(self):
+        transforms = ObjectTransforms()
+        renderables = [FakeRenderable(translation(0, 0, 0))]
+        transforms.update(renderables, np.identity(4), np.identity(4))
+        data = transforms.data
+
+        renderables[0].model_matrix = translation(4, 0, 0)
+        transforms.update(renderables, np.identity(4), np.identity(4))
+        self.assertIs(transforms.data, data)
+        self.assertEqual(transforms.data[0, ObjectTransforms.MODEL, 12], 4)
+
+    def test_empty(self):
+        transforms = ObjectTransforms()
+        transforms.update([], np.identity(4), np.identity(4))
+        self.assertEqual(transforms.count, 0)
+        self.assertIsNone(transforms.buffer)
+
+if __name__ == '__main__':
+    unittest.main()